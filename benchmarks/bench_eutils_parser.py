@@ -0,0 +1,85 @@
+"""Time and peak memory of the EUtils XML parsers
+
+A PubMed EFetch result is built by repeating an article and converted with
+xmltodict (the parser used before 1.8.0 for retmode="dict"), with
+:class:`EUtilsParser` (from an easyXML tree, as before 1.8.0, and
+incrementally from the document) and with the incremental parsers of
+:mod:`bioservices.xmltools` (:func:`xml2dict` and :func:`iter_records`).
+Peak memory is measured with tracemalloc (memory allocated by lxml itself
+is not traced). Usage::
+
+    python benchmarks/bench_eutils_parser.py [number of articles]
+
+"""
+import sys
+import time
+import tracemalloc
+
+import xmltodict
+
+from bioservices.eutils import EUtilsParser
+from bioservices.xmltools import easyXML, xml2dict, iter_records
+
+
+article = """<PubmedArticle>
+  <MedlineCitation Status="MEDLINE" Owner="NLM">
+    <PMID Version="1">%s</PMID>
+    <Article PubModel="Print">
+      <Journal>
+        <ISSN IssnType="Electronic">1367-4811</ISSN>
+        <Title>Bioinformatics (Oxford, England)</Title>
+      </Journal>
+      <ArticleTitle>BioServices: a common Python package to access biological Web Services programmatically.</ArticleTitle>
+      <Abstract>
+        <AbstractText Label="SUMMARY">Web interfaces provide access to numerous biological databases. Many can be accessed to in a programmatic way thanks to Web Services. Building applications that combine several of them would benefit from a single framework.</AbstractText>
+        <AbstractText Label="AVAILABILITY">BioServices is available under the GPLv3 license.</AbstractText>
+      </Abstract>
+      <AuthorList CompleteYN="Y">
+        <Author ValidYN="Y"><LastName>Cokelaer</LastName><ForeName>Thomas</ForeName><Initials>T</Initials></Author>
+        <Author ValidYN="Y"><LastName>Pultz</LastName><ForeName>Dennis</ForeName><Initials>D</Initials></Author>
+        <Author ValidYN="Y"><LastName>Harder</LastName><ForeName>Lea M</ForeName><Initials>LM</Initials></Author>
+        <Author ValidYN="Y"><LastName>Serra-Musach</LastName><ForeName>Jordi</ForeName><Initials>J</Initials></Author>
+        <Author ValidYN="Y"><LastName>Saez-Rodriguez</LastName><ForeName>Julio</ForeName><Initials>J</Initials></Author>
+      </AuthorList>
+    </Article>
+  </MedlineCitation>
+  <PubmedData>
+    <ArticleIdList>
+      <ArticleId IdType="pubmed">%s</ArticleId>
+      <ArticleId IdType="doi">10.1093/bioinformatics/btt547</ArticleId>
+    </ArticleIdList>
+  </PubmedData>
+</PubmedArticle>
+"""
+
+
+def _run(name, func, data):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    count = func(data)
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1] / 1024. ** 2
+    tracemalloc.stop()
+    print("{:<14} {} articles in {:.2f}s, peak memory {:.1f} Mb".format(
+        name, count, elapsed, peak))
+
+
+def main(N=20000):
+    data = "<PubmedArticleSet>%s</PubmedArticleSet>" % "".join(
+        article % (i, i) for i in range(N))
+    data = data.encode("utf-8")
+    print("document: {:.1f} Mb".format(len(data) / 1024. ** 2))
+
+    _run("xmltodict", lambda x: len(
+        xmltodict.parse(x)["PubmedArticleSet"]["PubmedArticle"]), data)
+    _run("easyXML", lambda x: len(
+        EUtilsParser(easyXML(x))["PubmedArticleSet"]["PubmedArticle"]), data)
+    _run("EUtilsParser", lambda x: len(
+        EUtilsParser(x)["PubmedArticleSet"]["PubmedArticle"]), data)
+    _run("xml2dict", lambda x: len(
+        xml2dict(x)["PubmedArticleSet"]["PubmedArticle"]), data)
+    _run("iter_records", lambda x: sum(1 for _ in iter_records(x)), data)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
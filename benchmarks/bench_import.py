@@ -0,0 +1,35 @@
+"""Cold-start benchmark of ``import bioservices``
+
+Each statement is timed in a fresh interpreter so that nothing is cached in
+sys.modules. Usage::
+
+    python benchmarks/bench_import.py [repeat]
+
+"""
+import sys
+import subprocess
+
+
+statements = [
+    ("import bioservices", "import bioservices"),
+    ("from bioservices import KEGG", "from bioservices import KEGG"),
+    ("from bioservices import * (eager)", "from bioservices import *"),
+]
+
+
+def cold_start(statement, repeat=5):
+    code = ("import time; t0 = time.perf_counter(); {}; "
+        "print(time.perf_counter() - t0)".format(statement))
+    timings = []
+    for i in range(repeat):
+        output = subprocess.check_output([sys.executable, "-c", code],
+            stderr=subprocess.DEVNULL)
+        timings.append(float(output.decode().strip().split()[-1]))
+    return min(timings)
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print("{:40} {:>10}".format("statement", "best (ms)"))
+    for label, statement in statements:
+        print("{:40} {:10.1f}".format(label, 1000 * cold_start(statement, repeat)))
@@ -0,0 +1,86 @@
+"""Throughput of the KEGG flat file parser
+
+A multi-megabyte flat file is built by repeating a gene entry and parsed
+with :meth:`KEGGParser.iter_parse` (streaming from a file) and with
+:meth:`KEGGParser.parse` (one string per entry, as returned by KEGG.get).
+Usage::
+
+    python benchmarks/bench_kegg_parser.py [number of entries]
+
+"""
+import os
+import sys
+import time
+import tempfile
+
+from bioservices.kegg import KEGGParser
+
+
+entry = """ENTRY       %s              CDS       T01001
+NAME        ZAP70, SRK, STCD, STD, TZK, ZAP-70
+DEFINITION  (RefSeq) zeta chain of T cell receptor associated protein kinase 70
+ORTHOLOGY   K07360  tyrosine-protein kinase ZAP-70 [EC:2.7.10.2]
+ORGANISM    hsa  Homo sapiens (human)
+PATHWAY     hsa04014  Ras signaling pathway
+            hsa04064  NF-kappa B signaling pathway
+            hsa04650  Natural killer cell mediated cytotoxicity
+            hsa04660  T cell receptor signaling pathway
+            hsa05340  Primary immunodeficiency
+BRITE       KEGG Orthology (KO) [BR:hsa00001]
+             09130 Environmental Information Processing
+              09132 Signal transduction
+               04014 Ras signaling pathway
+POSITION    2q11.2
+MOTIF       Pfam: Pkinase_Tyr Pkinase SH2
+DBLINKS     NCBI-GeneID: 7535
+            NCBI-ProteinID: NP_001070
+            OMIM: 176947
+            HGNC: 12858
+            Ensembl: ENSG00000115085
+            UniProt: P43403 A0A024R4K8
+STRUCTURE   PDB: 1FBV 1M61 1U59 2CBL 2OQ1 2OZO 2Y1N 3ZNI 3ZNV 4A4B 4A4C 4K2R
+                 4XZ0 4XZ1
+AASEQ       619
+            MPDPAAHLPFFYGSISRAEAEEHLKLAGMADGLFLLRQCLRSLGGYVLSLVHDVRFHHFP
+            IERQLNGTYAIAGGKAHCGPAELCEFYSRDPDGLPCNLRKPCNRPSGLEPQPGVFDCLRD
+            AMVRDYVRQTWKLEGEALEQAIISQAPQVEKLIATTAHERMPWYHSSLTREEAERKLYSG
+            AQTDGKFLLRPRKEQGTYALSLIYGKTVYHYLISQDKAGKYCIPEGTKFDTLWQLVEYLK
+            LKADGLIYCLKEACPNSSASNASGAAAPTLPAHPSTLTHPQRRIDTLNSDGYTPEPARIT
+NTSEQ       1860
+            atgccagaccccgcggcgcacctgcccttcttctacggcagcatctcgcgtgccgaggcc
+            gaggagcacctgaagctggcgggcatggcggacgggctcttcctgctgcgccagtgcctg
+            cgctcgctgggcggctatgtgctgtcgctcgtgcacgatgtgcgcttccaccactttccc
+            atcgagcgccagctcaacggcacctacgccattgccggcggcaaagcgcactgtggaccg
+///
+"""
+
+
+def main(N=10000):
+    parser = KEGGParser()
+    fd, filename = tempfile.mkstemp(suffix=".txt")
+    with os.fdopen(fd, "w") as fout:
+        for i in range(N):
+            fout.write(entry % i)
+    size = os.path.getsize(filename) / 1024. ** 2
+
+    try:
+        t0 = time.perf_counter()
+        with open(filename) as fin:
+            count = sum(1 for x in parser.iter_parse(fin))
+        elapsed = time.perf_counter() - t0
+        print("iter_parse: {} entries ({:.1f} Mb) in {:.2f}s: {:.0f} records/sec".format(
+            count, size, elapsed, count / elapsed))
+
+        entries = [entry % i for i in range(N)]
+        t0 = time.perf_counter()
+        for this in entries:
+            parser.parse(this)
+        elapsed = time.perf_counter() - t0
+        print("parse:      {} entries in {:.2f}s: {:.0f} records/sec".format(
+            N, elapsed, N / elapsed))
+    finally:
+        os.remove(filename)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
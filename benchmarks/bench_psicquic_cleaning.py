@@ -0,0 +1,48 @@
+"""Time of the PSICQUIC post-processing on a large interactome
+
+Builds a synthetic MITAB result (interactions between a few thousand
+proteins, with identifiers from several databases) and times
+:meth:`PSICQUIC.convert` (knownName and mappingOneDB) followed by
+:meth:`PSICQUIC.postCleaning`, as done by :class:`AppsPPI`. The UniProt
+mapping is replaced by a local dictionary so that no request is sent.
+Usage::
+
+    python benchmarks/bench_psicquic_cleaning.py [number of interactions]
+
+"""
+import sys
+import time
+import random
+
+from bioservices.psicquic import PSICQUIC
+
+
+class FakeUniProt(object):
+    def mapping(self, fr, to, query):
+        return dict((x, ["%s_%s" % (x, "HUMAN" if i % 4 else "MOUSE")])
+            for i, x in enumerate(query) if i % 10)
+
+
+def main(N=1000000):
+    random.seed(0)
+    dbs = ["uniprotkb", "refseq", "intact", "chebi", "unknown"]
+    proteins = ["|".join("%s:%s%s" % (db, db[:2].upper(), random.randint(0, 20000))
+        for db in random.sample(dbs, random.randint(1, 3)))
+        for i in range(10000)]
+    data = [[random.choice(proteins), random.choice(proteins)] +
+        ["-"] * 6 + ["pubmed:%s" % (i % 5000), "-", "-", "psi-mi:MI:0915",
+         "-", "-", "score:0.%s" % (i % 10)] for i in range(N)]
+
+    s = PSICQUIC(verbose=False)
+    s.uniprot = FakeUniProt()
+    t0 = time.perf_counter()
+    res = s.convert(data, "synthetic")
+    t1 = time.perf_counter()
+    res = s.postCleaning(res, verbose=False)
+    t2 = time.perf_counter()
+    print("convert:      {} interactions in {:.2f}s".format(N, t1 - t0))
+    print("postCleaning: {} interactions kept in {:.2f}s".format(len(res), t2 - t1))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
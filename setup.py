@@ -57,10 +57,10 @@ on_rtd = os.environ.get('READTHEDOCS', None) == 'True'
 
 # sphinx-gallery and numpydoc are used for the doc only.
 # Could have a if on_rtd
-install_requires = ["grequests", "requests",
-        "requests_cache", "easydev>=0.9.36", "beautifulsoup4", "xmltodict",
+install_requires = ["requests",
+        "easydev>=0.9.36", "beautifulsoup4", "xmltodict",
         "lxml",
-        "suds-jurko", "appdirs", 'wrapt', "pandas", "colorlog"],
+        "suds-jurko", "appdirs", 'wrapt', "pandas>=0.24", "colorlog"],
 
 
 setup(
@@ -13,159 +13,114 @@ from __future__ import print_function
 from __future__ import division
 import sys
 
-import pkg_resources
-
-from easydev import CustomConfig
+import importlib
 
 __version__ = "1.6.0"
 try:
-    version = pkg_resources.require("bioservices")[0].version
+    from importlib.metadata import version as _get_version
+    version = _get_version("bioservices")
     __version__ = version
-except:
+except Exception:
     version = __version__
 
 import colorlog
 logger = colorlog.getLogger("bioservices")
 
 
-# Initialise the config directory if not already done
-configuration = CustomConfig("bioservices", verbose=False)
-bspath = configuration.user_config_dir
-
-# Add bioservices.uniprot to sys.modules to prevent cycles in our imports
-#import bioservices.uniprot
-#bioservices.uniprot  # Stop flake8 error
-
-from . import settings
-from .settings import *
-
-from . import services
-from .services import *
-
-from . import biodbnet
-from .biodbnet import *
-
-from . import biocarta
-from .biocarta import *
-
-from . import biomodels
-from .biomodels import *
-
-from . import chebi
-from .chebi import *
-
-from . import ena
-from .ena import ENA
-
-from . import eva
-from .eva import *
-
-from . import ensembl
-from .ensembl import *
-
-# moved to attic in bioservices v1.6
-#from . import geneprof
-#from .geneprof import *
-
-from . import kegg
-from .kegg import *
-
-from . import hgnc
-from .hgnc import *
-
-from . import intact
-from .intact import *
-
-from . import pubchem
-from .pubchem import *
-
-from . import pfam
-from .pfam import *
-
-from . import rhea
-from .rhea import *
-
-from . import xmltools
-from .xmltools import *
-
-from . import wikipathway
-from .wikipathway import *
-
-from . import omnipath
-from .omnipath import *
-
-from . import pdb
-from .pdb import *
-
-from . import pdbe
-from .pdbe import *
-
-from . import pride
-from .pride import *
-
-from . import uniprot
-from .uniprot import *
-
-from . import unichem
-from .unichem import *
-
-from . import rnaseq_ebi
-from .rnaseq_ebi import RNASEQ_EBI
-
-from . import reactome
-from .reactome import *
-
-from . import quickgo
-from .quickgo import *
-
-
-from . import chembl
-from .chembl import *
-
-#from . import picr
-#from .picr import *
-
-from . import psicquic
-from .psicquic import *
-
-from . import ncbiblast
-from .ncbiblast import *
-
-#from . import readseq
-#from .readseq import *
-
-from . import biogrid
-from .biogrid import *
-
-from . import arrayexpress
-from .arrayexpress import *
-
-from . import biomart
-from .biomart import *
-
-from . import eutils
-from .eutils import *
-
-from . import pathwaycommons
-from .pathwaycommons import *
-
-from . import muscle
-from .muscle import *
-
-from . import dbfetch
-from .dbfetch import *
-
-from . import bigg
-from .bigg import BiGG
-
-from . import omicsdi
-from .omicsdi import OmicsDI
-
-# sub packages inside bioservices.
-
-#import mapping
-from . import apps
-#import dev
-
-from . import clinvitae
-from .clinvitae import Clinvitae
+# Services and their dependencies (pandas, bs4, lxml, suds, easydev,
+# requests...) are imported on first access (PEP 562) so that
+# "import bioservices" or "from bioservices import KEGG" only loads what is
+# needed. Keys are the public names, values the module that defines them.
+_lazy_names = {
+    "defaultParams": "settings",
+    "BioServicesConfig": "settings",
+    "Service": "services",
+    "WSDLService": "services",
+    "BioServicesError": "services",
+    "REST": "services",
+    "ArrayExpress": "arrayexpress",
+    "BiGG": "bigg",
+    "BioCarta": "biocarta",
+    "BioDBNet": "biodbnet",
+    "BioGRID": "biogrid",
+    "BioMart": "biomart",
+    "BioModels": "biomodels",
+    "ChEBI": "chebi",
+    "ChEMBL": "chembl",
+    "Clinvitae": "clinvitae",
+    "DBFetch": "dbfetch",
+    "ENA": "ena",
+    "EUtils": "eutils",
+    "EUtilsParser": "eutils",
+    "EVA": "eva",
+    "Ensembl": "ensembl",
+    "HGNC": "hgnc",
+    "HGNCDeprecated": "hgnc",
+    "IntactComplex": "intact",
+    "KEGG": "kegg",
+    "KEGGParser": "kegg",
+    "MUSCLE": "muscle",
+    "NCBIblast": "ncbiblast",
+    "OmicsDI": "omicsdi",
+    "OmniPath": "omnipath",
+    "to_list": "omnipath",
+    "PDB": "pdb",
+    "PDBe": "pdbe",
+    "PRIDE": "pride",
+    "PSICQUIC": "psicquic",
+    "PathwayCommons": "pathwaycommons",
+    "Pfam": "pfam",
+    "PubChem": "pubchem",
+    "QuickGO": "quickgo",
+    "RNASEQ_EBI": "rnaseq_ebi",
+    "Reactome": "reactome",
+    "ReactomeAnalysis": "reactome",
+    "ReactomeOld": "reactome",
+    "Rhea": "rhea",
+    "UniChem": "unichem",
+    "UniProt": "uniprot",
+    "WikiPathways": "wikipathway",
+    "easyXML": "xmltools",
+    "readXML": "xmltools",
+}
+
+# sub modules and sub packages inside bioservices.
+# geneprof moved to the attic in bioservices v1.6; picr, readseq, mapping and
+# dev are not exposed.
+_submodules = ["settings", "services", "ratelimit", "idmapping", "util",
+    "arrayexpress", "bigg", "biocarta", "biodbnet", "biogrid", "biomart",
+    "biomodels", "chebi", "chembl", "clinvitae", "dbfetch", "ena", "eutils",
+    "eva", "ensembl", "hgnc", "intact", "kegg", "muscle", "ncbiblast",
+    "omicsdi", "omnipath", "pathwaycommons", "pdb", "pdbe", "pfam", "pride",
+    "psicquic", "pubchem", "quickgo", "reactome", "rhea", "rnaseq_ebi",
+    "unichem", "uniprot", "wikipathway", "xmltools", "apps"]
+
+__all__ = sorted(_lazy_names) + _submodules + ["logger", "version",
+    "configuration", "bspath"]
+
+
+def _get_configuration():
+    # Initialise the config directory if not already done
+    from easydev import CustomConfig
+    return CustomConfig("bioservices", verbose=False)
+
+
+def __getattr__(name):
+    if name in _lazy_names:
+        module = importlib.import_module("." + _lazy_names[name], __name__)
+        value = getattr(module, name)
+    elif name in _submodules:
+        value = importlib.import_module("." + name, __name__)
+    elif name == "configuration":
+        value = _get_configuration()
+    elif name == "bspath":
+        value = __getattr__("configuration").user_config_dir
+    else:
+        raise AttributeError("module {!r} has no attribute {!r}".format(
+            __name__, name))
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -98,11 +98,15 @@ class BioDBNet(REST):
         inputResult = self.getInputs()
         #getOutputsForInput method
         outputResult = self.getOutputsForInput(input_db)
-        outputResult = [this.lower().replace(" ", "") for this in outputResult]
+        outputResult = dict((this.lower().replace(" ", ""), this)
+            for this in outputResult)
+        names = []
         for output in outputs.split(","):
             if output.lower().replace(" ", "") not in outputResult:
                 raise ValueError(output + " not found")
-        return outputs
+            names.append(outputResult[output.lower().replace(" ", "")])
+        # databases as spelt by BioDBNet (and in its results)
+        return ",".join(names)
 
     def _check_db(self, value):
         def convert(value):
@@ -137,14 +141,10 @@ class BioDBNet(REST):
         # This also check that the outputs exist and are compatible with the
         # input.
         outputs = self._interpret_output_db(input_db, output_db)
-
-        url = self.url + "?method=db2db"
-        url += "&input={}".format(input_db)
-        url += "&outputs={}".format(outputs)
-        url += "&inputValues={}".format(self._list_to_string(input_values))
-        url += "&taxonId={}".format(taxon)
-        url += "&format={}".format("row")
-        request = self.http_get(url)
+        if self.mapping_store is not None:
+            request = self._db2db_stored(input_db, outputs, input_values, taxon)
+        else:
+            request = self._db2db_request(input_db, outputs, input_values, taxon)
         try: # TODO can be removed in v2
             df = pd.DataFrame(request)
             df.set_index("InputValue", inplace=True)
@@ -154,6 +154,55 @@ class BioDBNet(REST):
             self.logging.error(err)
             return request
 
+    def _db2db_request(self, input_db, outputs, input_values, taxon):
+        url = self.url + "?method=db2db"
+        url += "&input={}".format(input_db)
+        url += "&outputs={}".format(outputs)
+        url += "&inputValues={}".format(self._list_to_string(input_values))
+        url += "&taxonId={}".format(taxon)
+        url += "&format={}".format("row")
+        return self.http_get(url)
+
+    def _db2db_stored(self, input_db, outputs, input_values, taxon):
+        # db2db() using the mapping store: only the identifiers missing for
+        # one of the outputs are sent. Returns the rows of the db2db request.
+        def convert(value):
+            return value.lower().replace(" ", "")
+        store = self.mapping_store
+        if isinstance(input_values, str):
+            input_values = input_values.split(",")
+        input_values = list(dict.fromkeys(x.strip() for x in input_values))
+        names = outputs.split(",")
+        source = "BioDBNet:%s" % convert(input_db)
+        targets = ["BioDBNet:%s:%s" % (convert(name), taxon) for name in names]
+
+        known, missing = [], set()
+        for target in targets:
+            found, this = store.get_many(source, target, input_values)
+            known.append(found)
+            missing.update(this)
+
+        if missing:
+            missing = [x for x in input_values if x in missing]
+            request = self._db2db_request(input_db, outputs, missing, taxon)
+            if not isinstance(request, list):
+                return request
+            rows = dict((row["InputValue"], row) for row in request)
+            for name, target, found in zip(names, targets, known):
+                mapping = dict((x, [rows[x][name]]) for x in missing
+                    if x in rows and name in rows[x])
+                store.set_many(source, target, mapping,
+                    [x for x in missing if x not in mapping])
+                found.update(mapping)
+
+        result = []
+        for value in input_values:
+            row = {"InputValue": value}
+            for name, found in zip(names, known):
+                row[name] = found[value][0] if found.get(value) else "-"
+            result.append(row)
+        return result
+
     def dbFind(self, output_db, input_values, taxon="9606"):
         """dbFind method
 
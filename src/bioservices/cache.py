@@ -0,0 +1,452 @@
+# -*- python -*-
+#
+#  This file is part of bioservices software
+#
+#  Copyright (c) 2013-2014 - EBI-EMBL
+#
+#  File author(s):
+#      https://github.com/cokelaer/bioservices
+#
+#  Distributed under the GPLv3 License.
+#  See accompanying file LICENSE.txt or copy at
+#      http://www.gnu.org/licenses/gpl-3.0.html
+#
+#  source: http://github.com/cokelaer/bioservices
+#  documentation: http://packages.python.org/bioservices
+#
+##############################################################################
+"""Response cache used by the :class:`~bioservices.services.REST` services
+
+The cache is owned by each REST instance (nothing is patched globally in the
+requests package). Responses are stored in a backend:
+
+* :class:`MemoryCache`: in-memory LRU
+* :class:`SQLiteCache`: single SQLite file (default)
+* :class:`FileCache`: on-disk content-addressed store (one file per distinct
+  content, identical responses are stored once)
+
+All backends evict the least recently used entries once their size exceeds
+``max_size`` bytes. The time-to-live of an entry depends on its URL (see
+:class:`ResponseCache`), which allows e.g. KEGG to keep list/ queries for a
+day and get/ queries for a week::
+
+    from bioservices import KEGG
+    from bioservices.cache import MemoryCache
+    k = KEGG(cache=True)              # backend from the configuration file
+    k = KEGG(cache=MemoryCache())     # or any backend instance
+    k.get("hsa:7535")
+    k.cache.stats
+
+"""
+import os
+import re
+import time
+import json
+import pickle
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+
+__all__ = ["CacheBackend", "MemoryCache", "SQLiteCache", "FileCache",
+    "ResponseCache", "get_backend"]
+
+
+class CacheBackend(object):
+    """Base class of the cache backends
+
+    Backends store bytes by key with the time they were stored. Subclasses
+    implement :meth:`get`, :meth:`set`, :meth:`delete`, :meth:`clear`,
+    :meth:`__len__` and the :attr:`size` property (in bytes).
+    """
+    def __init__(self, max_size=None):
+        self.max_size = max_size
+        self._lock = threading.RLock()
+
+    def get(self, key):
+        """Returns a tuple (timestamp, value) or None if key is not cached"""
+        raise NotImplementedError
+
+    def set(self, key, value):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def _get_size(self):
+        raise NotImplementedError
+    size = property(lambda self: self._get_size(), doc="size of the cache in bytes")
+
+
+class MemoryCache(CacheBackend):
+    """In-memory LRU cache
+
+    :param int max_size: maximum size in bytes (default 100Mb)
+    """
+    def __init__(self, max_size=100 * 1024 ** 2):
+        super(MemoryCache, self).__init__(max_size)
+        self._data = OrderedDict()
+        self._size = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                self._data.move_to_end(key)
+            return item
+
+    def set(self, key, value):
+        with self._lock:
+            self.delete(key)
+            self._data[key] = (time.time(), value)
+            self._size += len(value)
+            while self.max_size and self._size > self.max_size and len(self._data) > 1:
+                oldest = next(iter(self._data))
+                self.delete(oldest)
+
+    def delete(self, key):
+        with self._lock:
+            item = self._data.pop(key, None)
+            if item is not None:
+                self._size -= len(item[1])
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def _get_size(self):
+        return self._size
+
+
+class SQLiteCache(CacheBackend):
+    """Cache stored in a SQLite database
+
+    :param str filename: the database filename
+    :param int max_size: maximum size in bytes (default 500Mb)
+    """
+    _columns = ["key", "timestamp", "accessed", "size", "value"]
+
+    def __init__(self, filename, max_size=500 * 1024 ** 2):
+        super(SQLiteCache, self).__init__(max_size)
+        self.filename = filename
+        self._connection = None
+
+    def _get_connection(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.filename,
+                check_same_thread=False)
+            # a responses table with another layout (e.g. written by
+            # requests_cache in bioservices < 1.8) cannot be reused
+            columns = [row[1] for row in self._connection.execute(
+                "PRAGMA table_info(responses)")]
+            if columns and columns != self._columns:
+                self._connection.execute("DROP TABLE responses")
+            self._connection.execute("""CREATE TABLE IF NOT EXISTS responses
+                (key TEXT PRIMARY KEY, timestamp REAL, accessed REAL,
+                 size INTEGER, value BLOB)""")
+            self._connection.execute("""CREATE INDEX IF NOT EXISTS
+                responses_accessed ON responses (accessed)""")
+            self._connection.commit()
+        return self._connection
+    connection = property(_get_connection)
+
+    def get(self, key):
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT timestamp, value FROM responses WHERE key=?",
+                (key,)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute(
+                "UPDATE responses SET accessed=? WHERE key=?", (time.time(), key))
+            self.connection.commit()
+            return row[0], bytes(row[1])
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self.connection.execute("""INSERT OR REPLACE INTO responses
+                (key, timestamp, accessed, size, value) VALUES (?, ?, ?, ?, ?)""",
+                (key, now, now, len(value), sqlite3.Binary(value)))
+            if self.max_size:
+                self._evict()
+            self.connection.commit()
+
+    def _evict(self):
+        size = self.size
+        if size <= self.max_size:
+            return
+        rows = self.connection.execute(
+            "SELECT key, size FROM responses ORDER BY accessed").fetchall()
+        # always keep the last stored entry
+        for key, this in rows[:-1]:
+            self.connection.execute("DELETE FROM responses WHERE key=?", (key,))
+            size -= this
+            if size <= self.max_size:
+                break
+
+    def delete(self, key):
+        with self._lock:
+            self.connection.execute("DELETE FROM responses WHERE key=?", (key,))
+            self.connection.commit()
+
+    def clear(self):
+        with self._lock:
+            self.connection.execute("DELETE FROM responses")
+            self.connection.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def _get_size(self):
+        with self._lock:
+            size = self.connection.execute(
+                "SELECT SUM(size) FROM responses").fetchone()[0]
+        return size or 0
+
+
+class FileCache(CacheBackend):
+    """On-disk content-addressed cache
+
+    :param str directory: where to store the files
+    :param int max_size: maximum size in bytes (default 1Gb)
+
+    Contents are stored once in the *objects* sub-directory under the SHA-256
+    of the content. Each key is a small file in the *keys* sub-directory that
+    points to its content; its modification time records the last access.
+    Contents that are not referenced anymore are removed when the cache
+    exceeds its maximum size.
+    """
+    def __init__(self, directory, max_size=1024 ** 3):
+        super(FileCache, self).__init__(max_size)
+        self.directory = directory
+        self._keys = os.path.join(directory, "keys")
+        self._objects = os.path.join(directory, "objects")
+        for path in (self._keys, self._objects):
+            if not os.path.isdir(path):
+                os.makedirs(path)
+        self._size = None
+
+    def _key_path(self, key):
+        return os.path.join(self._keys, hashlib.sha256(key.encode()).hexdigest())
+
+    def _read_meta(self, path):
+        try:
+            with open(path) as fh:
+                return json.load(fh)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def get(self, key):
+        path = self._key_path(key)
+        with self._lock:
+            meta = self._read_meta(path)
+            if meta is None:
+                return None
+            try:
+                with open(os.path.join(self._objects, meta["digest"]), "rb") as fh:
+                    value = fh.read()
+            except (IOError, OSError):
+                return None
+            os.utime(path, None)
+            return meta["timestamp"], value
+
+    def set(self, key, value):
+        digest = hashlib.sha256(value).hexdigest()
+        path = self._key_path(key)
+        with self._lock:
+            obj = os.path.join(self._objects, digest)
+            if not os.path.exists(obj):
+                size = self.size
+                with open(obj + ".tmp", "wb") as fh:
+                    fh.write(value)
+                os.replace(obj + ".tmp", obj)
+                self._size = size + len(value)
+            with open(path + ".tmp", "w") as fh:
+                json.dump({"digest": digest, "timestamp": time.time()}, fh)
+            os.replace(path + ".tmp", path)
+            if self.max_size and self.size > self.max_size:
+                self._evict(keep=path)
+
+    def _sweep(self):
+        # removes the contents that are not referenced by any key
+        referenced = set()
+        for name in os.listdir(self._keys):
+            meta = self._read_meta(os.path.join(self._keys, name))
+            if meta:
+                referenced.add(meta["digest"])
+        for name in os.listdir(self._objects):
+            if name not in referenced:
+                os.remove(os.path.join(self._objects, name))
+        self._size = None
+
+    def _evict(self, keep=None):
+        self._sweep()
+        if self.size <= self.max_size:
+            return
+        keys = [os.path.join(self._keys, name) for name in os.listdir(self._keys)]
+        keys.sort(key=os.path.getmtime)
+        # remove 10% of the least recently used keys at a time
+        step = max(1, len(keys) // 10)
+        while keys and self.size > self.max_size:
+            for path in keys[:step]:
+                if path != keep:
+                    os.remove(path)
+            keys = keys[step:]
+            self._sweep()
+
+    def delete(self, key):
+        with self._lock:
+            try:
+                os.remove(self._key_path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            for path in (self._keys, self._objects):
+                for name in os.listdir(path):
+                    os.remove(os.path.join(path, name))
+            self._size = 0
+
+    def __len__(self):
+        return len(os.listdir(self._keys))
+
+    def _get_size(self):
+        if self._size is None:
+            self._size = sum(os.path.getsize(os.path.join(self._objects, name))
+                for name in os.listdir(self._objects))
+        return self._size
+
+
+def get_backend(name, path, max_size=None):
+    """Returns a backend given its name (memory, sqlite or file)
+
+    :param str name: name of the backend
+    :param str path: base name of the file (sqlite) or directory (file)
+    :param int max_size: maximum size in bytes (default of the backend if None)
+    """
+    kwargs = {} if max_size is None else {"max_size": max_size}
+    if name == "memory":
+        return MemoryCache(**kwargs)
+    elif name == "sqlite":
+        return SQLiteCache(path + ".sqlite", **kwargs)
+    elif name == "file":
+        return FileCache(path, **kwargs)
+    raise ValueError("Unknown cache backend {}. Use memory, sqlite or file".format(name))
+
+
+class ResponseCache(object):
+    """Caches the responses of GET requests in a :class:`CacheBackend`
+
+    :param backend: a :class:`CacheBackend` instance
+    :param expire_after: default time-to-live in seconds (None means no expiry)
+    :param policies: list of (pattern, ttl) tuples. The first regular
+        expression pattern found in the URL sets the time-to-live of the
+        entry. A ttl of 0 disables the caching of these URLs, a ttl of None
+        means no expiry.
+
+    Only successful responses are cached. Hits, misses and expired entries
+    are counted in :attr:`stats`.
+    """
+    def __init__(self, backend, expire_after=None, policies=None):
+        self.backend = backend
+        self.expire_after = expire_after
+        self.policies = [(re.compile(pattern), ttl) for pattern, ttl in (policies or [])]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def get_ttl(self, url):
+        """Returns the time-to-live of a URL according to the policies"""
+        for pattern, ttl in self.policies:
+            if pattern.search(url):
+                return ttl
+        return self.expire_after
+
+    def create_key(self, url, params=None, headers=None):
+        """Key made of the URL, the sorted parameters and the Accept header"""
+        params = sorted((params or {}).items())
+        accept = (headers or {}).get("Accept", "")
+        return json.dumps([url, params, accept], default=str)
+
+    def get_response(self, url, params=None, headers=None):
+        """Returns the cached :class:`requests.Response` or None"""
+        ttl = self.get_ttl(url)
+        if ttl == 0:
+            return None
+        key = self.create_key(url, params, headers)
+        item = self.backend.get(key)
+        if item is not None and ttl is not None and time.time() - item[0] > ttl:
+            self.backend.delete(key)
+            with self._lock:
+                self.expired += 1
+            item = None
+        with self._lock:
+            if item is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if item is None:
+            return None
+        return self._loads(item[1])
+
+    def save_response(self, response, params=None, headers=None, url=None):
+        """Stores a successful response. url is the requested URL"""
+        url = url or response.url
+        if not response.ok or self.get_ttl(url) == 0:
+            return
+        key = self.create_key(url, params, headers)
+        self.backend.set(key, self._dumps(response))
+
+    def _dumps(self, response):
+        return pickle.dumps({"status_code": response.status_code,
+            "reason": response.reason, "url": response.url,
+            "encoding": response.encoding, "headers": dict(response.headers),
+            "content": response.content}, protocol=2)
+
+    def _loads(self, value):
+        data = pickle.loads(value)
+        response = Response()
+        response.status_code = data["status_code"]
+        response.reason = data["reason"]
+        response.url = data["url"]
+        response.encoding = data["encoding"]
+        response.headers = CaseInsensitiveDict(data["headers"])
+        response._content = data["content"]
+        response.from_cache = True
+        return response
+
+    def clear(self):
+        self.backend.clear()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.expired = 0
+
+    def _get_stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                "expired": self.expired, "entries": len(self.backend),
+                "size": self.backend.size}
+    stats = property(_get_stats, doc="hits, misses, expired entries and size of the cache")
@@ -36,7 +36,7 @@
 
 """
 import os
-from bioservices.services import REST
+from bioservices.services import REST, BioServicesError
 import webbrowser
 from bioservices import logger
 logger.name == __name__
@@ -362,10 +362,22 @@ class ChEMBL(REST):
         self.format = 'json'
 
 
-    def _get_data(self, name, params):
-
-        # keep the number of events we want and original offset
+    def _get_count(self, params, total):
+        # number of records to retrieve given the limit and offset parameters
+        # and the total number of records
         max_data = params['limit']
+        if max_data == -1 or max_data > total:
+            max_data = total
+        return max(0, min(max_data, total - params['offset']))
+
+    def _iter_pages(self, name, params):
+        """Yields the records of a resource page by page
+
+        The first page provides the total number of records. The offsets of
+        the other pages are then known and pages are fetched concurrently
+        (general.async_concurrent pages at a time, subject to the rate
+        limiter) while still being yielded in order.
+        """
         offset = params['offset']
 
         # I noticed that
@@ -380,12 +392,10 @@ class ChEMBL(REST):
         # no such issues.
 
         # So, the best is to constraint limit to 1000
-        params['limit'] = 1000  # for the first call
-
-        # The limit used in all other calls
         limit = 1000
+        query = dict(params, limit=limit)
 
-        res = self.http_get("{}".format(name), params=params)
+        res = self.http_get("{}".format(name), params=query)
         self._check_request(res)
 
         # get rid of page_meta key/value
@@ -394,39 +404,104 @@ class ChEMBL(REST):
         keys.remove('page_meta')
         names = keys[0]  # the parameter name in plural form
 
-        # keep first chunk of data
-        data = res[names]
-
-        if max_data == -1:
-            max_data = res['page_meta']['total_count']
-        elif max_data > res['page_meta']['total_count']:
-            max_data = res['page_meta']['total_count']
+        N = self._get_count(params, self.page_meta['total_count'])
+        page = res[names][0:N]
+        count = len(page)
+        yield page
+
+        offsets = [offset + limit * i for i in range(1, (N - 1) // limit + 1)]
+        window = max(1, self.settings.CONCURRENT)
+        for i in range(0, len(offsets), window):
+            chunk = offsets[i:i + window]
+            results = self._get_async([name] * len(chunk),
+                [dict(query, offset=x) for x in chunk])
+            for res in results:
+                self.page_meta = res['page_meta']
+                page = res[names][0:N - count]
+                count += len(page)
+                yield page
+
+        if self.page_meta['next'] and offset + count < self.page_meta['total_count']:
+            total = self.page_meta['total_count'] - count - offset
+            self.logging.warning('More data available ({}). rerun with higher'
+                    'limit and/or offset {}. Check content of page_meta'
+                    ' attribute'.format(total, offset + count))
+
+    def _get_async(self, keys, params):
+        # get_async with one params dictionary per key. Failed queries (errors
+        # are logged by get_async) are tried once more.
+        results = self.get_async(keys, params=params)
+        for i, res in enumerate(results):
+            if not isinstance(res, dict):
+                res = self.http_get(keys[i], params=params[i])
+                self._check_request(res)
+                if not isinstance(res, dict):
+                    raise BioServicesError("Could not retrieve {} ({})".format(
+                        keys[i], res))
+                results[i] = res
+        return results
+
+    def _get_many(self, name, queries):
+        """Retrieves all records of a resource for several queries
+
+        :param list queries: list of parameters (e.g. filters), one per query
+        :return: list with the records of each query
+
+        The first page of all queries is fetched concurrently, then all the
+        remaining pages of all queries.
+        """
+        limit = 1000
+        todo = [(i, dict(query, limit=limit, offset=0, format=self.format))
+            for i, query in enumerate(queries)]
+        results = [[] for query in queries]
+        first = True
+        while todo:
+            pages = self._get_async([name] * len(todo), [x[1] for x in todo])
+            remaining = []
+            for (i, query), res in zip(todo, pages):
+                names = [x for x in res.keys() if x != 'page_meta'][0]
+                results[i] += res[names]
+                if first:
+                    remaining += [(i, dict(query, offset=offset)) for offset in
+                        range(limit, res['page_meta']['total_count'], limit)]
+            todo = remaining
+            first = False
+        return results
 
-        N = max_data
+    def _get_data(self, name, params):
         from easydev import Progress
-        pb = Progress(N)
-        count = 1
-
-        while res["page_meta"]['next'] and len(data)<max_data:
-            params['limit'] = limit
-            params['offset'] = limit * count + offset
-            res = self.http_get("{}".format(name), params=params)
-            data += res[names]
-            count += 1
+        pages = self._iter_pages(name, params)
+
+        # keep first chunk of data
+        data = next(pages)
+        pb = Progress(self._get_count(params, self.page_meta['total_count']))
+        for page in pages:
+            data += page
             pb.animate(len(data))
-            self.page_meta = res['page_meta']
+        return data
 
-        if self.page_meta['next']:
-            offset = self.page_meta['offset']
-            total = self.page_meta['total_count'] - len(data) - int(offset)
-            self.logging.warning('More data available ({}). rerun with higher'
-                    'limit and/or offset {}. Check content of page_meta'
-                    ' attribute'.format(total, offset))
+    def _iter_this_service(self, name, params):
+        self._set_filters(params)
+        params['format'] = self.format
+        for page in self._iter_pages(name, params):
+            for record in page:
+                yield record
 
-        if len(data) > max_data:
-            return data[0:max_data]
+    def _set_filters(self, params):
+        # look at any filters provided by the user
+        if params['filters'] is None:
+            del params['filters']
+        elif isinstance(params['filters'], list):
+            for filter in params['filters']:
+                assert filter.count("=") == 1
+                key, value = filter.split('=')
+                params[key] = value
+            del params['filters']
         else:
-            return data
+            assert params['filters'].count("=") == 1
+            k,v = params['filters'].split('=')
+            del params['filters']
+            params[k] = v
 
     def _check_request(self, res):
         # If there is no output because of wrong query, a 404 is returned.
@@ -455,20 +530,7 @@ class ChEMBL(REST):
 
         """
 
-        # look at any filters provided by the user
-        if params['filters'] is None:
-            del params['filters']
-        elif isinstance(params['filters'], list):
-            for filter in params['filters']:
-                assert filter.count("=") == 1
-                key, value = filter.split('=')
-                params[key] = value
-            del params['filters']
-        else:
-            assert params['filters'].count("=") == 1
-            k,v = params['filters'].split('=')
-            del params['filters']
-            params[k] = v
+        self._set_filters(params)
 
         params['format'] = self.format
         # Here, we will switch between several ways of using each
@@ -524,6 +586,20 @@ class ChEMBL(REST):
         params = {"limit":limit, "offset":offset, 'filters':filters}
         return self._get_this_service("activity", query, params=params)
 
+    def iter_activity(self, limit=-1, offset=0, filters=None):
+        """Activity values recorded in an Assay, one record at a time
+
+        Generator version of :meth:`get_activity` (without query). Pages of 1000
+        records are fetched concurrently and records are yielded as pages
+        arrive so that large results need not be stored in memory::
+
+            for activity in c.iter_activity(filters="target_chembl_id=CHEMBL240"):
+                ...
+
+        """
+        params = {"limit":limit, "offset":offset, 'filters':filters}
+        return self._iter_this_service("activity", params=params)
+
     def search_assay(self, query, limit=20, offset=0):
         """Assay details as reported in source document"""
         params = {"limit":limit, "offset":offset}
@@ -539,6 +615,20 @@ class ChEMBL(REST):
         params = {"limit":limit, "offset":offset, 'filters':filters}
         return self._get_this_service("assay", query, params=params)
 
+    def iter_assay(self, limit=-1, offset=0, filters=None):
+        """Assay details as reported in source Document/Dataset, one record at a time
+
+        Generator version of :meth:`get_assay` (without query). Pages of 1000
+        records are fetched concurrently and records are yielded as pages
+        arrive so that large results need not be stored in memory::
+
+            for activity in c.iter_assay(filters="target_chembl_id=CHEMBL240"):
+                ...
+
+        """
+        params = {"limit":limit, "offset":offset, 'filters':filters}
+        return self._iter_this_service("assay", params=params)
+
     def get_ATC(self, limit=20, offset=0, filters=None):
         """WHO ATC Classification for drugs
 
@@ -627,6 +717,20 @@ class ChEMBL(REST):
         params = {"limit":limit, "offset":offset, 'filters':filters}
         return self._get_this_service("document", query, params=params)
 
+    def iter_document(self, limit=-1, offset=0, filters=None):
+        """Document/Dataset from which Assays have been extracted, one record at a time
+
+        Generator version of :meth:`get_document` (without query). Pages of 1000
+        records are fetched concurrently and records are yielded as pages
+        arrive so that large results need not be stored in memory::
+
+            for activity in c.iter_document(filters="target_chembl_id=CHEMBL240"):
+                ...
+
+        """
+        params = {"limit":limit, "offset":offset, 'filters':filters}
+        return self._iter_this_service("document", params=params)
+
     def get_document_similarity(self, query=None, limit=20, offset=0, filters=None):
         """Provides documents similar to a given one
 
@@ -708,6 +812,20 @@ class ChEMBL(REST):
         params = {"limit":limit, "offset":offset, 'filters':filters}
         return self._get_this_service("molecule", query, params=params)
 
+    def iter_molecule(self, limit=-1, offset=0, filters=None):
+        """Molecules (compounds), one record at a time
+
+        Generator version of :meth:`get_molecule` (without query). Pages of 1000
+        records are fetched concurrently and records are yielded as pages
+        arrive so that large results need not be stored in memory::
+
+            for activity in c.iter_molecule(filters="target_chembl_id=CHEMBL240"):
+                ...
+
+        """
+        params = {"limit":limit, "offset":offset, 'filters':filters}
+        return self._iter_this_service("molecule", params=params)
+
     def get_molecule_form(self, query=None, limit=20, offset=0, filters=None):
         """Relationships between molecule parents and salts
 
@@ -865,6 +983,20 @@ class ChEMBL(REST):
         params = {"limit":limit, "offset":offset, 'filters':filters}
         return self._get_this_service("target", query, params=params)
 
+    def iter_target(self, limit=-1, offset=0, filters=None):
+        """Targets (protein and non-protein) defined in Assay, one record at a time
+
+        Generator version of :meth:`get_target` (without query). Pages of 1000
+        records are fetched concurrently and records are yielded as pages
+        arrive so that large results need not be stored in memory::
+
+            for activity in c.iter_target(filters="target_chembl_id=CHEMBL240"):
+                ...
+
+        """
+        params = {"limit":limit, "offset":offset, 'filters':filters}
+        return self._iter_this_service("target", params=params)
+
     def get_target_component(self, query=None, limit=20, offset=0, filters=None):
         """Target sequence information (A Target may have 1 or more sequences)
 
@@ -1054,7 +1186,7 @@ class ChEMBL(REST):
             raise NotImplementedError("""Please submit a issue on https://github.com/cokelaer/bioservices to allow this level or ordering together will your code example.""")
         return data
 
-    def compounds2accession(self, compounds):
+    def compounds2accession(self, compounds, batch_size=100):
         """For each compound, identifies the target and corresponding UniProt
         accession number
 
@@ -1072,6 +1204,14 @@ class ChEMBL(REST):
 
             c.compounds2accession(IDs)
 
+        Activities are retrieved for *batch_size* compounds per request
+        (requests being sent concurrently) and only the targets found in these
+        activities are then retrieved.
+
+        :param compounds: a ChEMBL identifier or a list of identifiers
+        :param int batch_size: number of compounds (or targets) per request
+        :return: a dictionary with the set of UniProt accessions of each
+            compound found in the activities.
         """
         # we jump from compounds to targets through activities
         # Here this is a one to many mapping so we initialise a default
@@ -1079,43 +1219,39 @@ class ChEMBL(REST):
         from collections import defaultdict
         compound2target = defaultdict(set)
 
-        filter = "molecule_chembl_id__in={}"
-        from easydev import Progress
-
-        if isinstance(compounds, list):
-            pass
+        if isinstance(compounds, str):
+            compounds = [compounds]
         else:
             compounds = list(compounds)
 
-        pb = Progress(len(compounds))
-        for i in range(0, len(compounds)):
-            # FIXME could get activities by bunch using
-            # ",".join(compounds[i:i+10) for example
-            activities = self.get_activity(filters=filter.format(compounds[i]))
+        # activities of many compounds are retrieved at once (only the fields
+        # we need)
+        queries = [{"molecule_chembl_id__in": ",".join(compounds[i:i+batch_size]),
+                    "only": "molecule_chembl_id,target_chembl_id"}
+                    for i in range(0, len(compounds), batch_size)]
+        for activities in self._get_many("activity", queries):
             # get target ChEMBL IDs from activities
             for act in activities:
                 compound2target[act['molecule_chembl_id']].add(act['target_chembl_id'])
-            pb.animate(i+1)
 
-        # What we need is to get targets for all targets found in the previous
-        # step. For each compound/drug there are hundreds of targets though. And
-        # we will call the get_target for each list of hundreds targets. This
-        # will take forever. Instead, because there are *only* 12,000 targets,
-        # let us download all of them ! This took about 4 minutes on this test but
-        # if you use the cache, next time it will be much much quicker. This is
-        # not down at the activities level because there are too many entries
-        targets = self.get_target(limit=-1)
-
-        # identifies all target chembl id to easily retrieve the entry later on
-        target_names = [target['target_chembl_id'] for target in targets]
+        # retrieve only the targets found in the previous step using the
+        # set/ endpoint and index their accessions by target ChEMBL ID
+        targets = sorted(set().union(*compound2target.values()))
+        keys = ["target/set/{}".format(";".join(targets[i:i+batch_size]))
+                for i in range(0, len(targets), batch_size)]
+        params = {"format": self.format, "limit": 1000}
+        accessions = {}
+        for res in self._get_async(keys, [params] * len(keys)):
+            if res.get('not_found'):
+                self.logging.warning('Some entries were not found: {}'.format(
+                    res['not_found']))
+            for target in res.get('targets', []):
+                accessions[target['target_chembl_id']] = [comp['accession']
+                    for comp in target['target_components']]
 
         # retrieve all uniprot accessions for all targets of each compound
         for compound, targs in compound2target.items():
-            accessions = set()
-            for target in targs:
-                index = target_names.index(target)
-                accessions = accessions.union([comp['accession']
-                    for comp in targets[index]['target_components']])
-            compound2target[compound] = accessions
+            compound2target[compound] = set().union(*[accessions.get(target, [])
+                for target in targs])
 
         return compound2target
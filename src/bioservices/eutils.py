@@ -31,10 +31,13 @@
        -- from http://www.ncbi.nlm.nih.gov/books/NBK25497/, March 2013
 
 """
+import os
 import json
-from bioservices import REST
+import hashlib
+from bioservices import REST, BioServicesError
 from bioservices import __version__
 from bioservices import logger
+from bioservices.xmltools import xml2dict, iter_records, _iter_children
 logger.name = __name__
 
 
@@ -99,10 +102,29 @@ class EUtils(REST):
 
     """
     def __init__(self, verbose=False, email="unknown", cache=False,
-                xmlparser="EUtilsParser"):
+                xmlparser="EUtilsParser", api_key=None):
+        """.. rubric:: Constructor
+
+        :param str email: your email (see warning above)
+        :param str api_key: NCBI API key. Requests are limited to 10 per
+            second with a key and 3 per second otherwise. If not provided,
+            the key is read from the eutils.api_key option of the
+            configuration file or the NCBI_API_KEY environment variable.
+        """
         url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+        if api_key is None:
+            from bioservices.settings import BioServicesConfig
+            api_key = BioServicesConfig().params['eutils.api_key'][0] or \
+                os.environ.get("NCBI_API_KEY")
         super(EUtils, self).__init__(name="EUtils", verbose=verbose, url=url,
-            cache=cache, requests_per_sec=3)
+            cache=cache, requests_per_sec=10 if api_key else 3)
+
+        #: NCBI API key sent with all requests
+        self.api_key = api_key
+        if api_key:
+            # the limit applies per key, not per IP address
+            self.rate_limit_key = "eutils.ncbi.nlm.nih.gov[api_key %s]" % (
+                hashlib.sha1(api_key.encode()).hexdigest()[0:8])
 
         warning = """
 
@@ -115,7 +137,8 @@ class EUtils(REST):
         developers if NCBI observes requests that violate our policies, and we
         will attempt such contact prior to blocking access.  For more details
         see http://www.ncbi.nlm.nih.gov/books/NBK25497/#chapter2.chapter2_table1
-        BioServices limits requests to 3 per seconds for this services.
+        BioServices limits requests to 3 per seconds for this services
+        (10 per seconds with an API key, see the api_key parameter).
         If you choose to set to a higher rate, this will be the user
         responsability. Within
         BioServices, we fill the parameter **tool** and **email**, however,
@@ -157,7 +180,7 @@ class EUtils(REST):
         # Let us use the REST services instead of WSDL, which fails sometimes
         # and for sure since version Sept 2015
         if self._databases is None:
-            res = self.http_get('einfo.fcgi', params={'retmode':'json'})
+            res = self.http_get('einfo.fcgi', params=dict(self._get_params(), retmode='json'))
             databases = res['einforesult']['dblist']
 
             self._databases = sorted(databases)
@@ -176,6 +199,8 @@ class EUtils(REST):
     def _get_params(self, keys=[], **kargs):
         # could use a defaultdict from collections.
         params = {'tool': self.tool, 'email': self.email}
+        if self.api_key:
+            params['api_key'] = self.api_key
         # fill the structure with None
         for this in keys:
             params[this] = None
@@ -344,6 +369,10 @@ class EUtils(REST):
             instead of "xml", retmode can now be set to dict, in which case an
             XML is retrieved and converted to a dictionary if possible.
 
+        The conversion is incremental (see :meth:`parse_xml`). To iterate
+        over the records of a large result, retrieve the XML and use
+        ``parse_xml(ret, "records")`` or use :meth:`fetch_all`.
+
         """
         _retmode = retmode[:]
 
@@ -431,18 +460,38 @@ class EUtils(REST):
             return ret
 
     def parse_xml(self, ret, method=None):
+        """Converts the XML returned by EFetch, ESummary or ELink
+
+        :param ret: the XML document (string or bytes)
+        :param str method: EUtilsParser (default), objectify, dict or
+            records.
+        :return: with **dict**, a dictionary (same as xmltodict.parse);
+            with **records**, a generator of dictionaries, one per child of
+            the root element (e.g., PubmedArticle, DocSum or LinkSet).
+
+        **EUtilsParser**, **dict** and **records** parse the document
+        incrementally (see :func:`~bioservices.xmltools.xml2dict` and
+        :func:`~bioservices.xmltools.iter_records`); **records** should be
+        preferred for large results since one record is kept in memory at
+        a time::
+
+            >>> ret = s.EFetch("pubmed", "20210808,20210809", retmode="xml")
+            >>> for record in s.parse_xml(ret, "records"):
+            ...     print(record['PubmedArticle']['MedlineCitation']['PMID'])
+
+        """
         if method is None:
             method = self._xmlparser
 
         if method == 'EUtilsParser':
-            ret = self.easyXML(ret)
             return EUtilsParser(ret)
         elif method == 'objectify': # used in docstrings
             from bioservices.xmltools import XMLObjectify
             return XMLObjectify(ret)
         elif method == 'dict':
-            import xmltodict
-            return xmltodict.parse(ret)
+            return xml2dict(ret)
+        elif method == 'records':
+            return iter_records(ret)
 
     def ESummary(self, db, id=None,  **kargs):
         """Returns document summaries for a list of input UIDs
@@ -635,6 +684,8 @@ class EUtils(REST):
         # Fixes https://github.com/cokelaer/bioservices/issues/169
         from urllib.parse import unquote
         params = {'bdata': unquote(bdata), "retmode": "xml"}
+        if self.api_key:
+            params['api_key'] = self.api_key
 
         # note here, we use .cgi not .fcgi
         query = "ecitmatch.cgi?db=pubmed&retmode=xml"
@@ -759,6 +810,110 @@ class EUtils(REST):
                 webenv = item.text
         return {'WebEnv':webenv, 'QueryKey':query_key}
 
+    def _post_history(self, db, ids=None, term=None):
+        # stores the identifiers (or the result of a search) on the History
+        # server and returns the WebEnv, query_key and number of records
+        if term is not None:
+            ret = self.ESearch(db, term, usehistory="y", retmax=0)
+            try:
+                return ret['webenv'], ret['querykey'], int(ret['count'])
+            except (KeyError, TypeError):
+                raise BioServicesError("ESearch failed ({})".format(ret))
+
+        ids = [str(x).strip() for x in ids]
+        # identifiers are posted in the body of the request so that there is
+        # no limit on the number of identifiers (unlike EPost)
+        data = self._get_epost_params()
+        data.update({'db': db, 'id': ",".join(ids)})
+        ret = self.http_post("epost.fcgi", data=data, frmt="xml")
+        webenv, query_key = None, None
+        if isinstance(ret, str):
+            for item in self.easyXML(ret).getchildren():
+                if item.tag == 'QueryKey':
+                    query_key = item.text
+                elif item.tag == 'WebEnv':
+                    webenv = item.text
+        if webenv is None or query_key is None:
+            raise BioServicesError("EPost failed ({})".format(ret))
+        return webenv, query_key, len(ids)
+
+    def fetch_all(self, db, ids=None, term=None, rettype=None, retmode="xml",
+                  batch_size=500, method="efetch"):
+        """Retrieves many records using the History server
+
+        :param str db: a valid database
+        :param ids: list of identifiers. They are posted once on the History
+            server (no limit on the number of identifiers).
+        :param str term: an Entrez query used instead of **ids**. The search
+            is stored on the History server (ESearch with usehistory).
+        :param str rettype: see :meth:`EFetch`
+        :param str retmode: see :meth:`EFetch` (not used by ESummary). With
+            **dict**, the XML of each batch is parsed incrementally and the
+            records (e.g. PubmedArticle) are yielded one by one as
+            dictionaries (see :func:`~bioservices.xmltools.iter_records`).
+        :param int batch_size: number of records per request
+        :param str method: efetch or esummary
+        :return: a generator. With efetch, the output of EFetch for each
+            batch of records (in order); with esummary, the summary of each
+            record (a dictionary).
+
+        Batches are requested concurrently (general.async_concurrent at a
+        time) within the rate limit of the service and yielded as they
+        arrive::
+
+            >>> e = EUtils()
+            >>> for batch in e.fetch_all("pubmed", term="bioservices",
+            ...                          retmode="xml"):
+            ...     print(len(batch))
+            >>> summaries = list(e.fetch_all("protein", ids=ids,
+            ...     method="esummary"))
+
+        """
+        self._check_db(db)
+        self.devtools.check_param_in_list(method, ["efetch", "esummary"])
+        if (ids is None) == (term is None):
+            raise ValueError("Provide either ids or term")
+
+        webenv, query_key, count = self._post_history(db, ids, term)
+
+        as_records = retmode == "dict"
+        if as_records:
+            retmode = "xml"
+        if method == "efetch":
+            query = "efetch.fcgi"
+            params = self._get_efetch_params(retmode=retmode, rettype=rettype)
+            frmt = "txt"
+        else:
+            query = "esummary.fcgi"
+            params = self._get_esummary_params(retmode="json")
+            frmt = "json"
+        params.update({'db': db, 'WebEnv': webenv, 'query_key': query_key,
+                       'retmax': batch_size})
+
+        starts = list(range(0, count, batch_size))
+        window = max(1, self.settings.CONCURRENT)
+        for i in range(0, len(starts), window):
+            chunk = starts[i:i + window]
+            results = self.get_async([query] * len(chunk), frmt=frmt,
+                params=[dict(params, retstart=x) for x in chunk])
+            for start, ret in zip(chunk, results):
+                if isinstance(ret, Exception) or isinstance(ret, int):
+                    # try once more before giving up
+                    ret = self.http_get(query, frmt=frmt,
+                        params=dict(params, retstart=start))
+                if ret is None or isinstance(ret, int):
+                    raise BioServicesError("{} failed for records {} to {}".format(
+                        method, start, start + batch_size))
+
+                if method == "efetch" and as_records:
+                    for record in iter_records(ret):
+                        yield record
+                elif method == "efetch":
+                    yield ret
+                else:
+                    result = ret['result']
+                    for uid in result['uids']:
+                        yield result[uid]
 
 
 class AttrDict(dict):
@@ -771,43 +926,55 @@ class EUtilsParser(AttrDict):
     """Convert xml returned by EUtils into a structure easier to manipulate
 
     Used by :meth:`EUtils.EGQuery`, :meth:`EUtils.ELink`.
+
+    The XML document (string or bytes) is parsed incrementally: each child
+    of the root element is converted once parsed and then released (see
+    :func:`~bioservices.xmltools.iter_records`), so that the XML tree of the
+    whole document is never kept in memory. An :class:`easyXML` instance or
+    an element is also accepted.
     """
-    def __init__(self, xml):
+    def __init__(self, xml=None):
         super(EUtilsParser, self).__init__()
-
-        try:
-            name = xml.root.tag
-            self[name] = EUtilsParser(xml.root)
-            children = []
-            #children = xml.root.getchildren()[0].getchildren()
-            #self.__name = xml.root.getchildren()[0].tag
-        except:
-            children = [x for x in xml]
-            if len(children) == 0:
+        if xml is None:
+            return
+
+        if isinstance(xml, (str, bytes)):
+            children = _iter_children(xml)
+            root = next(children, None)
+            if root is None:
+                raise ValueError("empty XML document")
+            self[root.tag] = EUtilsParser._from_children(root, children)
+        elif hasattr(xml, "root"):
+            self[xml.root.tag] = EUtilsParser._from_children(xml.root, iter(xml.root))
+        else:
+            for child in xml:
+                self._add_child(child)
+            if len(self) == 0:
                 self[xml.tag] = xml.text
 
-        for i, child in enumerate(children):
-            if len([x for x in child]) == 0:
-                if child.tag in self.keys():
-                    try:
-                        self[child.tag].append(child.text)
-                    except:
-                        self[child.tag] = [self[child.tag]]
-                        self[child.tag].append(child.text)
-                else:
-                    self[child.tag] = child.text
-            else:
-                # This is probably a list then
-                e = EUtilsParser(child)
-                if child.tag not in self.keys():
-                    self[child.tag] = e
-                else:
-                    try:
-                        self[child.tag].append(e)
-                    except:
-                        self[child.tag] = [self[child.tag]]
-                        self[child.tag].append(e)
-
+    @classmethod
+    def _from_children(cls, element, children):
+        # children are converted as they are iterated so that they can be
+        # released by the incremental parser
+        result = cls()
+        for child in children:
+            result._add_child(child)
+        if len(result) == 0:
+            result[element.tag] = element.text
+        return result
+
+    def _add_child(self, child):
+        if len(child) == 0:
+            value = child.text
+        else:
+            value = EUtilsParser._from_children(child, iter(child))
+        # repeated tags are stored in a list
+        if child.tag not in self:
+            self[child.tag] = value
+        elif isinstance(self[child.tag], list):
+            self[child.tag].append(value)
+        else:
+            self[child.tag] = [self[child.tag], value]
 
     def __str__(self):
         name = self._EUtilsParser__name
@@ -36,8 +36,9 @@
 
 
 """
+import os
 from bioservices import REST
-from bioservices.xmltools import bs4
+import bs4
 import easydev
 from bioservices import logger
 logger.name = __name__
@@ -45,8 +46,10 @@ logger.name = __name__
 
 try:
     from urllib.error import HTTPError
+    from urllib.parse import urlencode
 except:
     from urllib2 import HTTPError
+    from urllib import urlencode
 
 
 __all__ = ["HGNC", 'HGNCDeprecated']
@@ -200,7 +203,8 @@ class HGNCDeprecated(REST):
     """
     def __init__(self, verbose=False, cache=False):
         url = "http://www.avatar.se/HGNC/wr/"
-        super(HGNC, self).__init__("HGNC", url=url, verbose=verbose, cache=cache)
+        super(HGNCDeprecated, self).__init__("HGNC", url=url, verbose=verbose,
+            cache=cache)
         self.logging.warning("Service unavailable when testing (Aug 2014). May not work")
 
         self._always_return_list = False
@@ -237,10 +241,10 @@ class HGNCDeprecated(REST):
         """
         try:
             if ";" in gene:
-                res = self.services.http_get("genes/%s" % gene)
+                res = self.http_get("genes/%s" % gene, frmt="xml")
             else:
-                res = self.services.http_get("gene/%s.xml" % gene)
-                res = self.easyXML(res)
+                res = self.http_get("gene/%s.xml" % gene, frmt="xml")
+            res = self.easyXML(res)
             #res = bs4.BeautifulSoup(res)
         except HTTPError:
             self.logging.critical("!!BioServices HTTPError caught in HGNC. Probably an invalid gene name")
@@ -352,7 +356,7 @@ class HGNCDeprecated(REST):
         """
         params = {'search': 'symbol', 'value':pattern}
         # note the extra s before ;index.xml
-        xml = self.services.http_get("s;index.xml?" + self.urlencode(params))
+        xml = self.http_get("s;index.xml?" + urlencode(params), frmt="xml")
         xml = self.easyXML(xml)
         res = [x.attrs for x in xml.findAll("gene")]
         return res
@@ -380,54 +384,175 @@ class HGNCDeprecated(REST):
         .. seealso:: :meth:`mapping_all`
         """
 
-        xml = self.services.http_get("s;index.xml?" + self.urlencode({'search': 'xref', 'value':value}))
+        xml = self.http_get("s;index.xml?" + urlencode({'search': 'xref',
+            'value': value}), frmt="xml")
         xml = self.easyXML(xml)
         genes = xml.findAll("gene")
         res = [g.attrs for g in genes]
         return res
 
-    def mapping_all(self, entries=None):
+    def mapping_all(self, entries=None, filename=None, chunk_size=300):
         """Retrieves cross references for more than one entry
 
         :param entries: list of values entries (e.g., returned by the :meth:`lookfor` method.)
             if not provided, this method looks for all entries.
+        :param str filename: if provided, the cross references are also
+            saved in this file (see :meth:`read_table`). The file is written
+            only if all entries could be fetched.
+        :param int chunk_size: number of names sent per request
         :returns: list of dictionaries with keys being all entry names. Values is a
             dictionary of cross references.
 
-        .. warning:: takes 10 minutes
+        The entries are fetched with :meth:`iter_mapping_all`.
 
+        .. versionchanged:: 1.8.0 chunks are fetched concurrently and parsed
+            incrementally. New filename parameter.
         """
-        from math import ceil
-        results = {}
+        failed = []
+        genes = self._iter_mapping_all(entries, chunk_size, failed)
+        if filename:
+            genes = self._write_table(genes, filename, failed)
+        return dict(genes)
 
-        if entries is None:
-            print("First, get all entries")
-            entries = self.lookfor('*')
+    def iter_mapping_all(self, entries=None, chunk_size=300):
+        """Generator version of :meth:`mapping_all`
 
-        names = [entry['xlink:title'] for entry in entries]
-        N = len(names)
-
-        # split query in sets of 300 names
-
-        dn = 300
-        N = len(names)
-        n = int(ceil(N/float(dn)))
-        for i in range(0, n):
-            print("Completed ", i+1, "/", n)
-            query  = ";".join(names[i*dn:(i+1)*dn])
-            xml = self.get_xml(query)
-            genes = xml.findAll("gene")
-            for gene in genes:
-                res = self._get_xref(gene, None)
-                #acc = gene.attrs['acc'] not needed. can be access from ['HGNC']['xkey']
-                name = gene.attrs['symbol']
-                results[name] = res.copy()
-        return results
+        :return: tuples made of a gene symbol and its cross references
+            (a dictionary keyed by database)
+
+        Names are sent in chunks of *chunk_size* names. Several chunks
+        (general.async_concurrent) are requested concurrently within the
+        rate limit of the service and the genes of each chunk are parsed as
+        a stream and yielded in the order of the chunks::
 
+            for symbol, xrefs in s.iter_mapping_all():
+                print(symbol, xrefs['UniProt']['xkey'])
 
+        Chunks that cannot be fetched are skipped with a warning.
+        """
+        return self._iter_mapping_all(entries, chunk_size, [])
 
+    def _iter_mapping_all(self, entries, chunk_size, failed):
+        # names of the chunks that could not be fetched are added to failed
+        from itertools import islice
+        from bioservices.services import get_executor
 
+        if entries is None:
+            self.logging.info("First, get all entries")
+            entries = self.lookfor('*')
+        names = iter([entry['xlink:title'] for entry in entries])
+        window = max(1, self.settings.CONCURRENT)
+        executor = get_executor()
+
+        count = 0
+        while True:
+            chunks = [list(islice(names, chunk_size)) for i in range(window)]
+            chunks = [chunk for chunk in chunks if chunk]
+            if not chunks:
+                break
+            futures = [executor.submit(self.http_get,
+                "genes/%s" % ";".join(chunk), frmt="xml") for chunk in chunks]
+            try:
+                for chunk, future in zip(chunks, futures):
+                    try:
+                        xml = future.result()
+                        genes = list(self._iter_genes(xml)) \
+                            if isinstance(xml, bytes) else None
+                    except Exception as err:
+                        xml, genes = err, None
+                    if genes is None:
+                        self.logging.warning("Could not fetch {} genes ({})".format(
+                            len(chunk), xml))
+                        failed.extend(chunk)
+                        continue
+                    for gene in genes:
+                        yield gene
+                    count += len(chunk)
+            finally:
+                # requests not started yet are dropped if the caller stops
+                for future in futures:
+                    future.cancel()
+            self.logging.info("Completed {} names".format(count))
+
+    def _iter_genes(self, xml):
+        # streaming version of _get_xref(gene, None) for each gene
+        from bioservices.xmltools import iterparse
+        for gene in iterparse(xml, tag="{*}gene"):
+            xrefs = {}
+            for xref in gene.iter("{*}xref"):
+                attrs = _get_attrs(xref)
+                attrs['link'] = []
+                xrefs[attrs['xdb']] = attrs
+            yield gene.get("symbol"), xrefs
+
+    def _write_table(self, genes, filename, failed):
+        # writes the genes as they go through in a temporary file, which
+        # replaces filename only if all names were fetched, so that an
+        # interrupted or incomplete run never leaves a partial table
+        columns = ["symbol", "xdb", "xkey"]
+        temp = filename + ".tmp"
+        try:
+            if filename.endswith(".parquet"):
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                rows = []
+                for symbol, xrefs in genes:
+                    rows.extend((symbol, db, xref.get('xkey'))
+                        for db, xref in xrefs.items())
+                    yield symbol, xrefs
+                values = list(zip(*rows)) if rows else [[]] * len(columns)
+                pq.write_table(pa.table(dict((name, list(values[i]))
+                    for i, name in enumerate(columns))), temp)
+            else:
+                with open(temp, "w") as fout:
+                    fout.write("\t".join(columns) + "\n")
+                    for symbol, xrefs in genes:
+                        for db, xref in xrefs.items():
+                            fout.write("%s\t%s\t%s\n" % (symbol, db,
+                                xref.get('xkey') or ""))
+                        yield symbol, xrefs
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+        if failed:
+            os.remove(temp)
+            self.logging.warning("{} not saved: {} names could not be "
+                "fetched".format(filename, len(failed)))
+        else:
+            os.replace(temp, filename)
 
+    @staticmethod
+    def read_table(filename):
+        """Reads the cross references saved by :meth:`mapping_all`
 
+        :param str filename: a TSV file or a Parquet file (.parquet)
+        :return: a dictionary keyed by gene symbol. Values are dictionaries
+            keyed by database with the identifier under the xkey key (as
+            returned by :meth:`mapping_all`, without the other attributes).
+        """
+        if filename.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            table = pq.read_table(filename).to_pydict()
+            rows = zip(table["symbol"], table["xdb"], table["xkey"])
+        else:
+            with open(filename) as fin:
+                next(fin)
+                rows = [line.rstrip("\n").split("\t") for line in fin]
+        results = {}
+        for symbol, db, xkey in rows:
+            results.setdefault(symbol, {})[db] = {'xkey': xkey}
+        return results
 
 
+def _get_attrs(element):
+    # attributes with namespaces prefixed as in the document (xlink:href)
+    prefixes = dict((v, k) for k, v in element.nsmap.items() if k)
+    attrs = {}
+    for key, value in element.attrib.items():
+        if key[0] == "{":
+            namespace, key = key[1:].split("}", 1)
+            if namespace in prefixes:
+                key = "%s:%s" % (prefixes[namespace], key)
+        attrs[key] = value
+    return attrs
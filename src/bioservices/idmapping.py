@@ -0,0 +1,380 @@
+# -*- python -*-
+#
+#  This file is part of bioservices software
+#
+#  Copyright (c) 2013-2014 - EBI-EMBL
+#
+#  File author(s):
+#      https://github.com/cokelaer/bioservices
+#
+#  Distributed under the GPLv3 License.
+#  See accompanying file LICENSE.txt or copy at
+#      http://www.gnu.org/licenses/gpl-3.0.html
+#
+#  source: http://github.com/cokelaer/bioservices
+#  documentation: http://packages.python.org/bioservices
+#
+##############################################################################
+"""Local store of identifier mappings
+
+Identifier conversions (:meth:`UniProt.mapping`, :meth:`KEGG.conv`,
+:meth:`BioDBNet.db2db`, :meth:`UniChem.get_mapping`) are slow, rate-limited
+and mostly return the same answers from one run to the next. When the
+``idmapping.on`` option is set (or when a store is given to the
+:attr:`~bioservices.services.REST.mapping_store` attribute of a service),
+these methods look up the identifiers in an :class:`IDMappingStore` first
+and only send the identifiers that are not known (or too old) to the
+service. Identifiers that the service could not map are recorded as well so
+that they are not requested again.
+
+The store is a SQLite table indexed by (source, target, identifier). Sources
+and targets are prefixed by the name of the service (e.g. ``UniProt:ACC``)
+since the same database may have different names in different services.
+Complete conversions (*dumps*) can be imported in bulk, e.g. the UniProt
+idmapping files::
+
+    from bioservices import UniProt
+    from bioservices.idmapping import IDMappingStore, import_uniprot_idmapping
+    store = IDMappingStore("idmapping.sqlite")
+    import_uniprot_idmapping(store, "HUMAN_9606_idmapping.dat.gz",
+        types=["KEGG", "GeneID"])
+    u = UniProt()
+    u.mapping_store = store
+    u.mapping("ACC", "KEGG_ID", "P43403")   # no request sent
+
+"""
+import gzip
+import time
+import sqlite3
+import threading
+
+
+__all__ = ["IDMappingStore", "get_mapping_store", "import_uniprot_idmapping",
+    "import_kegg_conv"]
+
+
+class IDMappingStore(object):
+    """Identifier mappings stored in a SQLite database
+
+    :param str filename: the database filename (default is an in-memory
+        database)
+    :param expire_after: time-to-live of the mappings in seconds (None for
+        no expiry). Mappings older than that are ignored by :meth:`get_many`
+        and :meth:`get_dump` so that they are requested again.
+
+    Each identifier has one row per mapped identifier. An identifier stored
+    without any value is known to be unmapped. The store can be shared by
+    several services and threads.
+    """
+    def __init__(self, filename=":memory:", expire_after=None):
+        self.filename = filename
+        self.expire_after = expire_after
+        self._connection = None
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get_connection(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.filename,
+                check_same_thread=False)
+            self._connection.execute("""CREATE TABLE IF NOT EXISTS mappings
+                (source TEXT, target TEXT, id TEXT, value TEXT,
+                 timestamp REAL, dump TEXT)""")
+            self._connection.execute("""CREATE INDEX IF NOT EXISTS
+                mappings_id ON mappings (source, target, id)""")
+            self._connection.execute("""CREATE INDEX IF NOT EXISTS
+                mappings_dump ON mappings (source, target, dump)""")
+            self._connection.execute("""CREATE TABLE IF NOT EXISTS dumps
+                (source TEXT, target TEXT, name TEXT, timestamp REAL,
+                 size INTEGER, PRIMARY KEY (source, target, name))""")
+            self._connection.commit()
+        return self._connection
+    connection = property(_get_connection)
+
+    def _get_oldest(self, expire_after):
+        if expire_after is None:
+            expire_after = self.expire_after
+        if expire_after is None:
+            return 0
+        return time.time() - expire_after
+
+    def get_many(self, source, target, ids, expire_after=None):
+        """Looks up identifiers
+
+        :param str source: the source database
+        :param str target: the target database
+        :param ids: a list of identifiers
+        :param expire_after: overwrites the time-to-live of the store
+        :return: a tuple with a dictionary and a list. The dictionary contains
+            the identifiers found in the store and their mapped identifiers
+            (an empty list for identifiers known to be unmapped). The list
+            contains the identifiers that are not in the store (or expired),
+            in the order of *ids*.
+        """
+        oldest = self._get_oldest(expire_after)
+        ids = list(dict.fromkeys(ids))
+        found = {}
+        with self._lock:
+            # SQLite limits the number of parameters of a query
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i+500]
+                rows = self.connection.execute("""SELECT id, value FROM mappings
+                    WHERE source=? AND target=? AND timestamp>=? AND id IN (%s)
+                    ORDER BY rowid""" % ",".join("?" * len(chunk)),
+                    [source, target, oldest] + chunk)
+                for key, value in rows:
+                    # rows of a dump and of a request may overlap
+                    values = found.setdefault(key, [])
+                    if value is not None and value not in values:
+                        values.append(value)
+            missing = [x for x in ids if x not in found]
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def set_many(self, source, target, mapping, unmapped=()):
+        """Stores the identifiers returned by a service
+
+        :param str source: the source database
+        :param str target: the target database
+        :param dict mapping: identifiers and their mapped identifier (or list
+            of identifiers)
+        :param unmapped: identifiers that the service could not map
+
+        Previous values of these identifiers are replaced.
+        """
+        now = time.time()
+        rows = []
+        for key, values in mapping.items():
+            if isinstance(values, str):
+                values = [values]
+            rows.extend((source, target, key, value, now) for value in values)
+            if not values:
+                rows.append((source, target, key, None, now))
+        rows.extend((source, target, key, None, now) for key in unmapped)
+        keys = [(source, target, row[2]) for row in rows]
+        with self._lock:
+            self.connection.executemany("""DELETE FROM mappings
+                WHERE source=? AND target=? AND id=?""", set(keys))
+            self.connection.executemany("""INSERT INTO mappings
+                (source, target, id, value, timestamp) VALUES (?, ?, ?, ?, ?)""",
+                rows)
+            self.connection.commit()
+
+    def import_rows(self, rows, name="", batch_size=100000):
+        """Imports complete conversions from an iterable
+
+        :param rows: iterable of tuples (source, target, identifier, value)
+        :param str name: the name of the dump (e.g. the source database if
+            the conversions of several databases share the same source).
+        :param int batch_size: number of rows inserted at once
+        :return: dictionary with the number of rows imported per (source,
+            target)
+
+        The rows previously imported with the same name and the same source
+        and target are replaced. Once imported, a conversion can be retrieved
+        at once with :meth:`get_dump`.
+        """
+        now = time.time()
+        sizes = {}
+        with self._lock:
+            connection = self.connection
+            batch = []
+            for source, target, key, value in rows:
+                if (source, target) not in sizes:
+                    connection.execute("""DELETE FROM mappings WHERE source=?
+                        AND target=? AND dump=?""", (source, target, name))
+                    sizes[(source, target)] = 0
+                sizes[(source, target)] += 1
+                batch.append((source, target, key, value, now, name))
+                if len(batch) >= batch_size:
+                    self._insert(batch)
+                    batch = []
+            self._insert(batch)
+            connection.executemany("""INSERT OR REPLACE INTO dumps
+                (source, target, name, timestamp, size) VALUES (?, ?, ?, ?, ?)""",
+                [(source, target, name, now, size)
+                 for (source, target), size in sizes.items()])
+            connection.commit()
+        return sizes
+
+    def _insert(self, batch):
+        self.connection.executemany("""INSERT INTO mappings
+            (source, target, id, value, timestamp, dump)
+            VALUES (?, ?, ?, ?, ?, ?)""", batch)
+
+    def import_dump(self, source, target, pairs, name=""):
+        """Imports a complete conversion between two databases
+
+        :param str source: the source database
+        :param str target: the target database
+        :param pairs: iterable of tuples (identifier, mapped identifier) or a
+            dictionary (values may be lists)
+        :param str name: the name of the dump (see :meth:`import_rows`)
+        :return: number of rows imported
+        """
+        if isinstance(pairs, dict):
+            pairs = ((key, value) for key, values in pairs.items()
+                for value in ([values] if isinstance(values, str) else values))
+        sizes = self.import_rows(((source, target, key, value)
+            for key, value in pairs), name=name)
+        if not sizes:
+            # an empty conversion is still a conversion
+            self.import_rows([(source, target, None, None)], name=name)
+            return 0
+        return sizes[(source, target)]
+
+    def get_dump(self, source, target, name="", expire_after=None):
+        """Returns a conversion imported with :meth:`import_dump`
+
+        :return: a dictionary with identifiers and the list of mapped
+            identifiers or None if the conversion was not imported or is
+            expired.
+        """
+        oldest = self._get_oldest(expire_after)
+        with self._lock:
+            row = self.connection.execute("""SELECT timestamp FROM dumps
+                WHERE source=? AND target=? AND name=?""",
+                (source, target, name)).fetchone()
+            if row is None or row[0] < oldest:
+                self.misses += 1
+                return None
+            self.hits += 1
+            mapping = {}
+            for key, value in self.connection.execute("""SELECT id, value
+                    FROM mappings WHERE source=? AND target=? AND dump=?
+                    AND id IS NOT NULL ORDER BY rowid""", (source, target, name)):
+                values = mapping.setdefault(key, [])
+                if value is not None:
+                    values.append(value)
+        return mapping
+
+    def delete(self, source, target=None):
+        """Removes the mappings of a source database (to a target database)"""
+        where, args = "source=?", [source]
+        if target is not None:
+            where, args = "source=? AND target=?", [source, target]
+        with self._lock:
+            self.connection.execute("DELETE FROM mappings WHERE " + where, args)
+            self.connection.execute("DELETE FROM dumps WHERE " + where, args)
+            self.connection.commit()
+
+    def purge(self, expire_after=None):
+        """Removes the expired mappings"""
+        oldest = self._get_oldest(expire_after)
+        with self._lock:
+            self.connection.execute("DELETE FROM mappings WHERE timestamp<?",
+                (oldest,))
+            self.connection.execute("DELETE FROM dumps WHERE timestamp<?",
+                (oldest,))
+            self.connection.commit()
+
+    def clear(self):
+        with self._lock:
+            self.connection.execute("DELETE FROM mappings")
+            self.connection.execute("DELETE FROM dumps")
+            self.connection.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM mappings").fetchone()[0]
+
+    def _get_stats(self):
+        with self._lock:
+            dumps = self.connection.execute(
+                "SELECT COUNT(*) FROM dumps").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "rows": len(self),
+            "dumps": dumps}
+    stats = property(_get_stats,
+        doc="number of identifiers found (hits) or not (misses) in the store")
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_mapping_store(filename, expire_after=None):
+    """Returns the :class:`IDMappingStore` shared by all services using this file"""
+    with _stores_lock:
+        store = _stores.get(filename)
+        if store is None:
+            store = IDMappingStore(filename, expire_after=expire_after)
+            _stores[filename] = store
+        store.expire_after = expire_after
+        return store
+
+
+def _open(filename):
+    if filename.endswith(".gz"):
+        return gzip.open(filename, "rt")
+    return open(filename)
+
+
+# names of the idmapping files that differ from the names used by
+# UniProt.mapping (see bioservices.uniprot.mapping)
+_uniprot_idmapping_names = {
+    "UniProtKB-ID": "ID", "GeneID": "P_ENTREZGENEID", "KEGG": "KEGG_ID",
+    "RefSeq": "P_REFSEQ_AC", "RefSeq_NT": "REFSEQ_NT_ID", "GI": "P_GI",
+    "PDB": "PDB_ID", "EMBL": "EMBL_ID", "EMBL-CDS": "EMBL",
+    "Ensembl": "ENSEMBL_ID", "Ensembl_PRO": "ENSEMBL_PRO_ID",
+    "Ensembl_TRS": "ENSEMBL_TRS_ID", "STRING": "STRING_ID",
+    "UniParc": "UPARC", "UniRef50": "NF50", "UniRef90": "NF90",
+    "UniRef100": "NF100", "UniGene": "UNIGENE_ID", "MIM": "MIM_ID",
+    "HGNC": "HGNC_ID", "ChEMBL": "CHEMBL_ID", "DrugBank": "DRUGBANK_ID",
+    "Reactome": "REACTOME_ID", "BioCyc": "BIOCYC_ID", "eggNOG": "EGGNOG_ID",
+    "KO": "KO_ID", "OMA": "OMA_ID", "OrthoDB": "ORTHODB_ID"}
+
+
+def import_uniprot_idmapping(store, filename, types=None):
+    """Imports a UniProt idmapping file
+
+    :param store: an :class:`IDMappingStore`
+    :param str filename: an idmapping.dat file (possibly gzipped) from
+        ftp://ftp.uniprot.org/pub/databases/uniprot/current_release/knowledgebase/idmapping/
+        (three columns: accession, type of identifier and identifier)
+    :param types: types of identifiers to import (e.g. ["KEGG", "GeneID"]).
+        All types are imported by default.
+    :return: dictionary with the number of rows imported per (source, target)
+
+    Identifiers are stored as conversions from UniProt accessions (ACC) to
+    the databases used by :meth:`UniProt.mapping` (e.g. KEGG_ID).
+    """
+    types = set(types) if types else None
+
+    def rows():
+        with _open(filename) as fin:
+            for line in fin:
+                acc, kind, value = line.rstrip("\n").split("\t")
+                if types is None or kind in types:
+                    yield ("UniProt:ACC", "UniProt:%s" %
+                        _uniprot_idmapping_names.get(kind, kind), acc, value)
+    return store.import_rows(rows(), name="idmapping")
+
+
+def import_kegg_conv(store, filename, target, source):
+    """Imports a KEGG conversion file
+
+    :param store: an :class:`IDMappingStore`
+    :param str filename: output of the KEGG conv/target/source query (two
+        tab-separated columns, possibly gzipped)
+    :param str target: the target database or organism (e.g. uniprot)
+    :param str source: the source database or organism (e.g. hsa)
+    :return: number of rows imported
+
+    The conversion is then used by :meth:`KEGG.conv` for the whole source
+    database or for some of its entries.
+    """
+    def pairs():
+        with _open(filename) as fin:
+            for line in fin:
+                if "\t" in line:
+                    yield line.rstrip("\n").split("\t")[:2]
+    return store.import_dump("KEGG", "KEGG:%s" % target, pairs(), name=source)
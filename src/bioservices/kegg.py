@@ -158,14 +158,25 @@ except:
     pass
 from bioservices.services import REST, BioServicesError
 import webbrowser
+import os
+import re
 import copy
+import json
+import time
+from collections import Counter
+from itertools import islice
 from bioservices import logger
 logger.name = __name__
 
 
 from easydev.logging_tools import Logging
 
-__all__ = ["KEGG",  "KEGGParser"]
+__all__ = ["KEGG",  "KEGGParser", "KGMLPathway"]
+
+
+# continuation lines of the STRUCTURE/MOTIF and DBLINKS fields
+_identifiers_continuation = re.compile("\n {6,20}")
+_dblinks_continuation = re.compile("\n {12,12+1}")
 
 
 class KEGG(REST):
@@ -225,6 +236,9 @@ class KEGG(REST):
 
     _docIds = "\n\n.. seealso:: :meth:`list`\n"
 
+    #: cached list/ queries expire after a day and get/ queries after a week
+    cache_policies = [("/list/", 86400), ("/get/", 7 * 86400)]
+
     def __init__(self, verbose=False, cache=False):
         """.. rubric:: Constructor
 
@@ -544,6 +558,98 @@ class KEGG(REST):
 
         return res
 
+    def get_many(self, ids, option=None, parse=False):
+        """Retrieves many database entries, 10 per request, concurrently
+
+        :param ids: an iterable of database entries (see :meth:`get`)
+        :param str option: None (flat files) or one of aaseq, ntseq
+        :param bool parse: if True, flat files are parsed with :meth:`parse`
+        :return: a generator of (identifier, entry) tuples in the order of the
+            input identifiers. The entry is None if KEGG did not return it.
+
+        KEGG accepts up to 10 entries per :meth:`get` request. The identifiers
+        are split into chunks of 10 entries and the requests are sent
+        concurrently (up to the general.async_concurrent setting at a time,
+        within the rate limit of the service). The concatenated entries are
+        then split back into one result per identifier. Since only a window
+        of requests is kept in memory, whole genomes can be retrieved::
+
+            from bioservices import KEGG
+            k = KEGG()
+            genes = [x.split("\t")[0] for x in k.list("hsa").strip().split("\n")]
+            for gene, entry in k.get_many(genes, parse=True):
+                print(gene, entry['NAME'])
+
+        """
+        if option not in [None, "aaseq", "ntseq"]:
+            raise ValueError("option must be aaseq or ntseq. Other options "
+                "return one entry per request: use get() instead")
+
+        ids = iter(ids)
+        window = max(1, self.settings.CONCURRENT)
+        while True:
+            chunks = []
+            for i in range(window):
+                chunk = list(islice(ids, 10))
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            if not chunks:
+                break
+
+            queries = ["get/" + "+".join(chunk) for chunk in chunks]
+            if option:
+                queries = [query + "/" + option for query in queries]
+            results = self.get_async(queries, frmt="txt")
+
+            for chunk, res in zip(chunks, results):
+                if not isinstance(res, str):
+                    # an exception or an HTTP status code (e.g. 404 if none
+                    # of the entries exists)
+                    self.logging.warning("Could not retrieve {}: {}".format(
+                        "+".join(chunk), res))
+                    res = ""
+                entries = self._split_entries(res, chunk, option)
+                for identifier in chunk:
+                    entry = entries.get(identifier)
+                    if entry is not None and parse is True:
+                        entry = self.parse(entry)
+                    yield identifier, entry
+
+    def _split_entries(self, res, ids, option=None):
+        # split the output of a get() request made of several entries into a
+        # dictionary keyed by the requested identifiers
+        if option is None:
+            records = [x + "///\n" for x in res.split("///\n") if x.strip()]
+            keys = [self._entry_name(record) for record in records]
+        else:
+            records = [">" + x.lstrip(">").rstrip("\n") + "\n"
+                for x in res.split("\n>") if x.strip()]
+            keys = [record[1:].split(None, 1)[0] for record in records]
+
+        # KEGG returns the entries in the input order, unless some are missing
+        if len(records) == len(ids):
+            return dict(zip(ids, records))
+
+        found = dict((key.lower(), record) for key, record in zip(keys, records))
+        entries = {}
+        for identifier in ids:
+            name = identifier.lower()
+            record = found.get(name, found.get(name.split(":", 1)[-1]))
+            if record is not None:
+                entries[identifier] = record
+        return entries
+
+    def _entry_name(self, record):
+        # the name of an entry is the first word on the ENTRY line (except for
+        # enzymes, e.g., ENTRY  EC 1.1.1.1  Enzyme)
+        fields = record.split("\n", 1)[0].split()
+        if len(fields) < 2:
+            return ""
+        if fields[1] == "EC" and len(fields) > 2:
+            return fields[2]
+        return fields[1]
+
     def conv(self, target, source):
         """convert KEGG identifiers to/from outside identifiers
 
@@ -640,6 +746,9 @@ class KEGG(REST):
         else:
             self.logging.info("arguments not checked")
         """
+        if self.mapping_store is not None:
+            return self._conv_stored(target, source)
+
         url = "conv/"+ target + '/' + source
         res = self.http_get(url, frmt="txt")
 
@@ -650,6 +759,52 @@ class KEGG(REST):
         except:
             return res
 
+    def _conv_stored(self, target, source):
+        # conv() using the mapping store. KEGG entries are prefixed by their
+        # database so they are all stored with the same source. A conversion
+        # of a whole database is stored as a dump named after that database
+        # and is also used for conversions of its entries.
+        store = self.mapping_store
+        target_key = "KEGG:%s" % target
+        if ":" not in source:
+            mapping = store.get_dump("KEGG", target_key, name=source)
+            if mapping is None:
+                res = self.http_get("conv/%s/%s" % (target, source), frmt="txt")
+                pairs = self._parse_conv(res)
+                if pairs is None:
+                    return res
+                store.import_dump("KEGG", target_key, pairs, name=source)
+                return dict(pairs)
+            return dict((key, values[-1]) for key, values in mapping.items()
+                if values)
+
+        entries = [x for x in source.split("+") if x]
+        mapping, missing = store.get_many("KEGG", target_key, entries)
+        if missing:
+            res = self.http_get("conv/%s/%s" % (target, "+".join(missing)),
+                frmt="txt")
+            pairs = self._parse_conv(res)
+            if pairs is None:
+                return res
+            found = {}
+            for key, value in pairs:
+                found.setdefault(key, []).append(value)
+            store.set_many("KEGG", target_key, found,
+                [x for x in missing if x not in found])
+            mapping.update(found)
+        return dict((key, mapping[key][-1]) for key in entries
+            if mapping.get(key))
+
+    def _parse_conv(self, res):
+        # list of (source, target) identifiers or None if res is not a
+        # conversion (e.g. an error code)
+        if not isinstance(res, str):
+            return None
+        pairs = [x.split("\t")[:2] for x in res.strip().split("\n") if x]
+        if any(len(x) != 2 for x in pairs):
+            return None
+        return [tuple(x) for x in pairs]
+
     def link(self, target, source):
         """Find related entries by using database cross-references
 
@@ -939,7 +1094,8 @@ class KEGG(REST):
         :param str pathwayId: a valid pathwayId e.g. hsa04660
         :param str res: if you already have the output of the query
             get(pathwayId), you can provide it, otherwise it is queried.
-        :return: a dictionary with relations and entries as keys. Values
+        :return: a :class:`KGMLPathway` instance, that is a dictionary with
+            relations and entries as keys. Values
             of relations is a list of relations, each relation being
             dictionary with entry1, entry2, link, value, name. The
             list os entries is a list of dictionary as well.
@@ -963,48 +1119,20 @@ class KEGG(REST):
 
             >>> # get information about an entry :
             >>> res['entries'][4]
+            >>> # or by identifier
+            >>> res.entries_by_id['15']
+            >>> # relations starting from entry 15
+            >>> res.adjacency['PPrel']['15']
 
 
         .. seealso:: `KEGG API <http://www.kegg.jp/kegg/xml/docs/>`_
+        .. versionchanged:: 1.8.0 the document is parsed with lxml and the
+            output is indexed (see :class:`KGMLPathway`).
         """
-        output = {'relations':[], 'entries':[]}
         # Fixing bug #24 assembla
         if res is None:
-            res = self.easyXML(self.get(pathwayId, "kgml"))
-        else:
-            res = self.easyXML(res)
-
-        # read and parse the entries
-        entries = [x for x in res.findAll("entry")]
-        for entry in entries:
-            output['entries'].append({
-                'id': entry.get("id"),
-                'name': entry.get("name"),
-                'type': entry.get("type"),
-                'link': entry.get("link"),
-                'gene_names': entry.find("graphics").get("name")
-                })
-
-        relations = [(x.get("entry1"), x.get("entry2"), x.get("type")) for x in res.findAll("relation")]
-        subtypes = [x.findAll("subtype") for x in res.findAll("relation")]
-
-        assert len(subtypes) == len(relations)
-
-        for relation, subtype in zip(relations, subtypes):
-            if len(subtype)==0: # nothing to do with the species ??? TODO
-                pass
-            else:
-                for this in subtype:
-                    value = this.get("value")
-                    name = this.get("name")
-                    output['relations'].append({
-                        'entry1':relation[0],
-                        'entry2':relation[1],
-                        'link':relation[2],
-                       'value':value,
-                        'name':name})
-        # we need to map back to KEgg IDs...
-        return output
+            res = self.get(pathwayId, "kgml")
+        return KGMLPathway.from_kgml(res)
 
     def pathway2sif(self, pathwayId, uniprot=True):
         """Extract protein-protein interaction from KEGG pathway to a SIF format
@@ -1017,64 +1145,56 @@ class KEGG(REST):
         :return: a list of relations (A 1 B) for activation and (A -1 B) for
             inhibitions
 
-        This is longish due to the conversion from KEGGIds to UniProt.
+        KEGG identifiers are converted to UniProt with bulk calls to
+        :meth:`conv` (100 identifiers per call). Relations involving a gene
+        without UniProt identifier are skipped.
 
         This method can be useful to provide prior knowledge network to software
         such as CellNOpt (see http://www.cellnopt.org)
         """
         res = self.parse_kgml_pathway(pathwayId)
-        sif = []
+        signs = {'activation': 1, 'inhibition': -1}
+        edges = []
         for rel in res['relations']:
             # types can be PPrel (protein-protein interaction only
-            if rel['link'] != 'PPrel':
+            if rel['link'] != 'PPrel' or rel['name'] not in signs:
                 continue
-            if rel['name'] == 'activation':
-                Id1 = rel['entry1']
-                Id2 = rel['entry2']
-                name1 = res['entries'][[x['id'] for x in res['entries']].index(Id1)]['name']
-                name2 = res['entries'][[x['id'] for x in res['entries']].index(Id2)]['name']
-                type1 = res['entries'][[x['id'] for x in res['entries']].index(Id1)]['type']
-                type2 = res['entries'][[x['id'] for x in res['entries']].index(Id2)]['type']
-                #print("names:", rel, name1, name2)
-                #print(type1, type2)
-                if type1!='gene' or type2!='gene':
-                    continue
-                if uniprot:
-                    try:
-                        # FIXME  sometimes, there are more than one name
-                        name1 = name1.split()[0]
-                        name2 = name2.split()[0]
-                        name1 = self.conv("uniprot", name1)[name1]
-                        name2 = self.conv("uniprot", name2)[name2]
-                    except Exception:
-                        self.logging.info(name1)
-                        self.logging.info(name2)
-                        raise Exception
-                #print(name1, 1, name2)
-                sif.append([name1, 1, name2])
-            elif  rel['name'] == 'inhibition':
-                Id1 = rel['entry1']
-                Id2 = rel['entry2']
-                name1 = res['entries'][[x['id'] for x in res['entries']].index(Id1)]['name']
-                name2 = res['entries'][[x['id'] for x in res['entries']].index(Id2)]['name']
-                type1 = res['entries'][[x['id'] for x in res['entries']].index(Id1)]['type']
-                type2 = res['entries'][[x['id'] for x in res['entries']].index(Id2)]['type']
-                #print("names:", rel, name1, name2)
-                #print(type1, type2)
-                if type1!='gene' or type2!='gene':
-                    continue
-                if uniprot:
-                    name1 = name1.split()[0]
-                    name2 = name2.split()[0]
-                    name1 = self.conv("uniprot", name1)[name1]
-                    name2 = self.conv("uniprot", name2)[name2]
-                #print(name1, -1, name2)
-                sif.append([name1, -1, name2])
+            entry1 = res.entries_by_id[rel['entry1']]
+            entry2 = res.entries_by_id[rel['entry2']]
+            if entry1['type'] != 'gene' or entry2['type'] != 'gene':
+                continue
+            if uniprot:
+                # FIXME  sometimes, there are more than one name
+                name1 = entry1['name'].split()[0]
+                name2 = entry2['name'].split()[0]
             else:
-                pass
-                #print("#", rel['entry1'], rel['name'], rel['entry2'])
-
-        return sif
+                name1 = entry1['name']
+                name2 = entry2['name']
+            edges.append([name1, signs[rel['name']], name2])
+
+        if uniprot:
+            mapping = self._conv_many("uniprot",
+                set(x[0] for x in edges) | set(x[2] for x in edges))
+            sif = []
+            for name1, sign, name2 in edges:
+                if name1 in mapping and name2 in mapping:
+                    sif.append([mapping[name1], sign, mapping[name2]])
+                else:
+                    self.logging.warning("No UniProt identifier for %s or %s" % (
+                        name1, name2))
+            return sif
+        return edges
+
+    def _conv_many(self, target, identifiers, chunk_size=100):
+        # conv accepts dbentries (identifiers joined with +). Send a few
+        # requests with many identifiers rather than one per identifier
+        identifiers = sorted(identifiers)
+        mapping = {}
+        for i in range(0, len(identifiers), chunk_size):
+            res = self.conv(target, "+".join(identifiers[i:i+chunk_size]))
+            if isinstance(res, dict):
+                mapping.update(res)
+        return mapping
 
     def parse(self, entry):
         """See :class:`KEGGParser` for details
@@ -1098,6 +1218,76 @@ class KEGG(REST):
         return parse
 
 
+class KGMLPathway(dict):
+    """Pathway returned by :meth:`KEGG.parse_kgml_pathway`
+
+    This is a dictionary with the list of *entries* and *relations* (see
+    :meth:`KEGG.parse_kgml_pathway`) indexed for fast lookup:
+
+    * :attr:`entries_by_id`: entries keyed by their identifier
+    * :attr:`adjacency`: relations keyed by link type (e.g. PPrel) and then by
+      source entry (entry1)
+
+    ::
+
+        >>> res = k.parse_kgml_pathway("hsa04660")
+        >>> res.entries_by_id['15']['name']
+        >>> [x['entry2'] for x in res.adjacency['PPrel']['15']]
+
+    """
+    def __init__(self, entries=None, relations=None):
+        super(KGMLPathway, self).__init__()
+        self['entries'] = []
+        self['relations'] = []
+        self.entries_by_id = {}
+        self.adjacency = {}
+        for entry in entries or []:
+            self.add_entry(entry)
+        for relation in relations or []:
+            self.add_relation(relation)
+
+    def add_entry(self, entry):
+        self['entries'].append(entry)
+        self.entries_by_id[entry['id']] = entry
+
+    def add_relation(self, relation):
+        self['relations'].append(relation)
+        self.adjacency.setdefault(relation['link'], {}).setdefault(
+            relation['entry1'], []).append(relation)
+
+    @classmethod
+    def from_kgml(cls, kgml):
+        """Builds the pathway from a KGML document (a string)"""
+        from lxml import etree
+        if not isinstance(kgml, bytes):
+            # lxml refuses unicode strings with an encoding declaration
+            kgml = kgml.encode("utf-8")
+        root = etree.fromstring(kgml, etree.XMLParser(resolve_entities=False,
+            no_network=True, huge_tree=True))
+
+        pathway = cls()
+        for element in root:
+            if element.tag == "entry":
+                graphics = element.find("graphics")
+                pathway.add_entry({
+                    'id': element.get("id"),
+                    'name': element.get("name"),
+                    'type': element.get("type"),
+                    'link': element.get("link"),
+                    'gene_names': graphics.get("name") if graphics is not None else None
+                    })
+            elif element.tag == "relation":
+                # relations without subtype are ignored
+                for subtype in element.iter("subtype"):
+                    pathway.add_relation({
+                        'entry1': element.get("entry1"),
+                        'entry2': element.get("entry2"),
+                        'link': element.get("type"),
+                        'value': subtype.get("value"),
+                        'name': subtype.get("name")})
+        return pathway
+
+
 class KEGGParser(object):
     """This is an extension of the :class:`KEGG` class to ease parsing of dbentries
 
@@ -1196,7 +1386,7 @@ class KEGGParser(object):
             raise ValueError("Unexpected input, unable to parse data of type %s" % type(res))
 
         if res[:5] == "ENTRY":
-            dbentry = res.split("\n")[0].split(None, 2)[2]
+            dbentry = res.split("\n", 1)[0].split(None, 2)[2]
         else:
             raise ValueError("Unable to parse data, it does not comform to the expected KEGG format")
 
@@ -1208,218 +1398,248 @@ class KEGGParser(object):
 
         return parser
 
+    def iter_parse(self, source):
+        """Parses a KEGG flat file made of several entries, one entry at a time
+
+        :param source: a string, a file-like object or any iterator of lines
+            (e.g., a file opened in text mode) made of entries terminated by
+            a "///" line.
+        :return: a generator of dictionaries (see :meth:`parse`), one per
+            entry. Entries that cannot be parsed are returned as empty
+            dictionaries.
+
+        The source is read line by line so that large files (e.g., results
+        of :meth:`KEGG.get_many` saved on disk) can be parsed without loading
+        them in memory::
+
+            from bioservices import KEGGParser
+            parser = KEGGParser()
+            with open("hsa_genes.txt") as fin:
+                for entry in parser.iter_parse(fin):
+                    print(entry['ENTRY'])
+
+        """
+        if isinstance(source, str):
+            source = source.split("\n")
+        for blocks in self._iter_records(source):
+            try:
+                yield self._parse_blocks(blocks)
+            except Exception as err:
+                self.logging.warning("Could not parse the entry %s correctly" %
+                    blocks[0][0])
+                self.logging.warning(err)
+                yield {}
+
     def _parse(self, res):
-        keys = [x.split(" ")[0] for x in res.split("\n") if len(x) and x[0]!=" "
-                and x!="///"]
-        # let us go line by to not forget anything and know which entries are
-        # found in the RHS. We may have duplicated once as can be found in th
-        # keys variable as well.
-        entries = []
-        entry = ""
-        start = True
-        for line in res.split("\n"):
-            if line == '///':
-                entries.append(entry)
+        for blocks in self._iter_records(res.split("\n")):
+            return self._parse_blocks(blocks)
+        return {}
+
+    def _iter_records(self, lines):
+        # Single pass over the lines. A record is a list of blocks, each block
+        # being the list of lines of a field (a non indented line followed by
+        # indented lines). Records are terminated by ///
+        blocks = []
+        block = None
+        for line in lines:
+            line = line.rstrip("\n")
+            if line == "///":
+                if block is not None:
+                    blocks.append(block)
+                if blocks:
+                    yield blocks
+                blocks = []
+                block = None
             elif len(line) == 0:
                 pass
             elif line[0] != " ":
-                if start == True:
-                    start = False
-                else:
-                    entries.append(entry)
-                entry = line[:]
-            else:
-                entry+= "\n"+line[:]
-
-        # we can now look at each entry and create a dictionary.
+                if block is not None:
+                    blocks.append(block)
+                block = [line]
+            elif block is not None:
+                block.append(line)
+        if block is not None:
+            blocks.append(block)
+        if blocks:
+            yield blocks
+
+    def _parse_blocks(self, blocks):
+        # We look at each block and create a dictionary.
         # The dictionary will contain as key the name found in the LHS
         # e.g., REACTION and the value will be either the entry content
         # as a string or a list of strings if the key is not unique
         # e.g., for references. This could be a bit annoying since
         # for example References could appear only once if some cases.
         # This can be tested though by checking the type
+        counts = Counter(block[0].split(" ")[0] for block in blocks)
         output = {}
-        for entry in entries:
-            name = entry.split("\n")[0].split()[0]
-            if keys.count(name) == 1:
-                output[name] = entry[:]
+        for block in blocks:
+            name = block[0].split()[0]
+            entry = "\n".join(block)
+            if counts[name] == 1:
+                output[name] = entry
+            elif name in output:
+                output[name].append(entry)
             else:
-                if name in output.keys():
-                    output[name].append(entry[:])
-                else:
-                    output[name] = [entry[:]]
+                output[name] = [entry]
         # remove name that are now the keys of the dictionary anyway
         # if the values is not a list
         for k, v in output.items():
-            if k in ['CHROMOSOME', 'TAXONOMY']:
+            if k in ['CHROMOSOME', 'TAXONOMY'] or isinstance(v, list):
                 continue
-            try:
-                output[k] = output[k].strip().replace(k, '', 1).strip()
-            except: # skip the lists
-                pass
-
+            output[k] = v.strip().replace(k, '', 1).strip()
 
         # Now, let us do the real stuff.
         # This is tricky since format is not consistent with the names e,g
         # REACTIONS could be sometimes a list of names and sometimes list
         # of reactions with their description.
-        self.raw_parsing = copy.deepcopy(output)
+        self.raw_parsing = dict((k, list(v) if isinstance(v, list) else v)
+            for k, v in output.items())
 
         for key, value in output.items():
-            # convert to a dict
-            if key == 'STATISTICS':
-                data = [x.split(":",1) for x in output[key].split("\n")]
-                data = dict([(x[0].strip(), float(x[1].strip())) for x in data])
-                output[key] = data
-            # strip only: expecting a single line (string)
-            elif key in ['POSITION', 'DESCRIPTION', 'ENTRY', 'ORGANISM',
-                    'CLASS', 'FORMULA', 'KEYWORDS', 'CATEGORY', 'ANNOTATION', 
-                    'DATA_SOURCE', 'MASS', 'COMPOSITION', 'DEFINITION',
-                    'KO_PATHWAY', 'EQUATION', 'TYPE', 'RCLASS', 'SYSNAME', "HISTORY",
-                    "REL_PATHWAY"]:
-                # get rid of \n
-
-                if "\n" in value:
-                    # happens in description path:hsa04915
-                    value = value.replace("\n", " ")
-                # nothing to do here except strip
-                output[key] = value.strip()
-            # list : set of lines. Could be split by ; character but we use the
-            # \n instead to be sure
-            # COMMENT is sometimes on several lines
-            elif key in ['NAME', 'REMARK', 'ACTIVITY', 'COMMENT', 'ORIGINAL_DB',
-                "SUBSTRATE", "PRODUCT", "ENV_FACTOR", "PATHOGEN"]:
-                output[key] = [x.strip() for x in value.split("\n")]
-            # list: long string splitted into items and therefore converted to a list
-            elif key in ['ENZYME', 'REACTION',  'RPAIR', 'RELATEDPAIR',
-                  "ALL_REAC"]:
-                # RPAIR/rn:R00005 should be a dict if "_" found
-                # REACTION/md:hsa_M00554 should be a dict if '->' found
-                if '->' in value or "_" in value:
-                    kp = {}
-                    for line in value.split("\n"):
-                        try:
-                            k,v = line.strip().split(None,1)
-                        except:
-                            #self.logging.warning("empty line in %s %s" % (key, line))
-                            k = line.strip()
-                            v = ''
-                        kp[k] = v
-                    output[key] = kp.copy()
-                else:
-                    output[key] = [x.strip() for x in value.split()]
-            # transform to dictionary by splitting line and then split on ";"
-            elif key in "GENE":
-                kp = {}
-                for i, line in enumerate(value.split("\n")):
-                    try:
-                        k, v = line.strip().split(None, 1)
-                    except:
-                        #self.logging.warning("empty line in %s %s" % (key, line))
-                        k = line.strip()
-                        v = ''
-                    kp[k] = v
-                output[key] = kp.copy()
-
-            elif key in ['DRUG', 'ORTHOLOGY', 'COMPOUND', 'RMODULE',
-                    'DISEASE', 'PATHWAY_MAP', 'STR_MAP', 'OTHER_MAP',
-                    'PATHWAY', 'MODULE', 'GENES']:
-                kp = {}
-                for line in value.split("\n"):
-                    try: # empty orthology in rc:RC00004
-                        k,v = line.strip().split(None,1)
-                    except:
-                        #self.logging.warning("empty line in %s %s" % (key, line))
-                        k = line.strip()
-                        v = ''
-                    if k.endswith(":"):
-                        k = k.strip().rstrip(":")
-                    kp[k] = v
-                output[key] = kp.copy()
-            # list of dictionaries
-            elif key == 'REFERENCE':
-                # transform to a list since you may have several entries
-                newvalue = [self._interpret_references(this)
-                        for this in self._tolist(value)]
-                output[key] = newvalue
-            # list of dictionaries
-            elif key == 'PLASMID':
-                newvalue = [self._interpret_plasmid(this)
-                        for this in self._tolist(value)]
-                output[key] = newvalue
-            # list of dictionaries
-            elif key == 'CHROMOSOME':
-                newvalue = [self._interpret_chromosome(this)
-                    for this in self._tolist(value)]
-                output[key] = newvalue
-            # list of dictionaries
-            elif key == 'TAXONOMY':
-                newvalue = [self._interpret_taxonomy(this)
-                    for this in self._tolist(value)]
-                output[key] = newvalue
-            elif key == "SEQUENCE":
-                newvalue = [self._interpret_sequence(this)
-                    for this in self._tolist(value)]
-                output[key] = newvalue
-
-            # dictionary, interpreted as follows
-            # on each line, there is an identifier followed by : character
-            # looks like there is just one line...
-            elif key in ['DRUG_TARGET', 'STRUCTURE', 'MOTIF']:
-                # STRUCTURE PDB can be long and span over several lines. e.g.,
-                # hsa:1525
-                new = {}
-                import re
-                value = re.sub("\n {6,20}", " ", value)
-                for line in value.split("\n"):
-                    thiskey, content = line.split(None, 1)
-                    if thiskey.endswith(":"):
-                        new[thiskey[:-1]] = content
-                    else:
-                        self.logging.warning("Could not fully interpret %s " % key )
-                output[key] = new
-            elif key in ['DBLINKS', 'INTERACTION', 'METABOLISM']:
-                # D01441 for metabolism
-                # DBLINKS for C00624 should work out of the box
-                new = {}
-                import re
-                value = re.sub("\n {12,12+1}", "\n", value)
-                # Sometimes (e.g. INTERACTION in D00136) values are empty
-                # see issue #85
-                if len(value):
-                    for line in value.split("\n"):
-                        thiskey, content = line.strip().split(":", 1)
-                        new[thiskey] = content.strip()
-                    output[key] = new
-                else:
-                    output[key] = value
-            # floats
-            elif key in ['EXACT_MASS', 'MOL_WEIGHT']:
-                output[key] = float(value)
-            # get rid of the length
-            elif key in ['AASEQ', 'NTSEQ']:
-                output[key] = value.split("\n", 1)[1].replace("\n","")
-            elif key.startswith("ENTRY"):
-                newvalue = self._interpret_entry(value)
-                output[key] = newvalue.strip()
-            # extract list of strings from structure. These strings are not 
-            # interpreted
-            elif key in ['ATOM', 'BOND', 'NODE', 'EDGE', 'ALIGN', 'RDM']:
-                # starts with a number that defines number of entries. Let us
-                # get rid of that number and then send a list
-                output[key] = self._interpret_enumeration(output[key])
-            # not interpreted
-            elif key in ['BRACKET', 'COMPONENT', 'SOURCE', 'BRITE', "TARGET",
-                    'CARCINOGEN', 'MARKER']: # do not interpret to keep structure
-                pass
-            else:
+            handler = self._handlers.get(key)
+            if handler is None and key.startswith("ENTRY"):
+                handler = "_interpret_entry_field"
+            if handler is None:
                 self.logging.warning("""Found keyword %s, which has not special
     parsing for now. please report this issue with the KEGG 
     identifier (%s) into github.com/bioservices. Thanks T.C.""" % (key,output['ENTRY']))
-
-
+            elif handler is not False:
+                output[key] = getattr(self, handler)(key, value)
         return output
 
+    # strip only: expecting a single line (string)
+    def _interpret_line(self, key, value):
+        if "\n" in value:
+            # happens in description path:hsa04915
+            value = value.replace("\n", " ")
+        # nothing to do here except strip
+        return value.strip()
+
+    # list : set of lines. Could be split by ; character but we use the
+    # \n instead to be sure. COMMENT is sometimes on several lines
+    def _interpret_lines(self, key, value):
+        return [x.strip() for x in value.split("\n")]
+
+    # list: long string splitted into items and therefore converted to a list
+    def _interpret_items(self, key, value):
+        # RPAIR/rn:R00005 should be a dict if "_" found
+        # REACTION/md:hsa_M00554 should be a dict if '->' found
+        if '->' in value or "_" in value:
+            return self._interpret_key_value(key, value)
+        return value.split()
+
+    # transform to dictionary by splitting lines on the first space
+    def _interpret_key_value(self, key, value, strip_colon=False):
+        kp = {}
+        for line in value.split("\n"):
+            try: # empty orthology in rc:RC00004
+                k, v = line.strip().split(None, 1)
+            except ValueError:
+                k = line.strip()
+                v = ''
+            if strip_colon and k.endswith(":"):
+                k = k.strip().rstrip(":")
+            kp[k] = v
+        return kp
+
+    def _interpret_links(self, key, value):
+        return self._interpret_key_value(key, value, strip_colon=True)
+
+    def _interpret_statistics(self, key, value):
+        data = [x.split(":",1) for x in value.split("\n")]
+        return dict([(x[0].strip(), float(x[1].strip())) for x in data])
+
+    # list of dictionaries
+    def _interpret_list(self, key, value):
+        interpret = getattr(self, self._list_handlers[key])
+        return [interpret(this) for this in self._tolist(value)]
+
+    # dictionary, interpreted as follows
+    # on each line, there is an identifier followed by : character
+    # looks like there is just one line...
+    def _interpret_identifiers(self, key, value):
+        # STRUCTURE PDB can be long and span over several lines. e.g.,
+        # hsa:1525
+        new = {}
+        value = _identifiers_continuation.sub(" ", value)
+        for line in value.split("\n"):
+            thiskey, content = line.split(None, 1)
+            if thiskey.endswith(":"):
+                new[thiskey[:-1]] = content
+            else:
+                self.logging.warning("Could not fully interpret %s " % key )
+        return new
+
+    def _interpret_dblinks(self, key, value):
+        # D01441 for metabolism
+        # DBLINKS for C00624 should work out of the box
+        new = {}
+        value = _dblinks_continuation.sub("\n", value)
+        # Sometimes (e.g. INTERACTION in D00136) values are empty
+        # see issue #85
+        if len(value) == 0:
+            return value
+        for line in value.split("\n"):
+            thiskey, content = line.strip().split(":", 1)
+            new[thiskey] = content.strip()
+        return new
+
+    def _interpret_float(self, key, value):
+        return float(value)
+
+    # get rid of the length
+    def _interpret_seq(self, key, value):
+        return value.split("\n", 1)[1].replace("\n","")
+
+    def _interpret_entry_field(self, key, value):
+        return self._interpret_entry(value).strip()
+
+    # starts with a number that defines number of entries. Let us
+    # get rid of that number and then send a list
+    def _interpret_enumeration_field(self, key, value):
+        return self._interpret_enumeration(value)
+
+    #: method used to interpret each key (False means not interpreted)
+    _handlers = {}
+    for _key in ['POSITION', 'DESCRIPTION', 'ENTRY', 'ORGANISM',
+            'CLASS', 'FORMULA', 'KEYWORDS', 'CATEGORY', 'ANNOTATION',
+            'DATA_SOURCE', 'MASS', 'COMPOSITION', 'DEFINITION',
+            'KO_PATHWAY', 'EQUATION', 'TYPE', 'RCLASS', 'SYSNAME', "HISTORY",
+            "REL_PATHWAY"]:
+        _handlers[_key] = "_interpret_line"
+    for _key in ['NAME', 'REMARK', 'ACTIVITY', 'COMMENT', 'ORIGINAL_DB',
+            "SUBSTRATE", "PRODUCT", "ENV_FACTOR", "PATHOGEN"]:
+        _handlers[_key] = "_interpret_lines"
+    for _key in ['ENZYME', 'REACTION',  'RPAIR', 'RELATEDPAIR', "ALL_REAC"]:
+        _handlers[_key] = "_interpret_items"
+    for _key in ['DRUG', 'ORTHOLOGY', 'COMPOUND', 'RMODULE',
+            'DISEASE', 'PATHWAY_MAP', 'STR_MAP', 'OTHER_MAP',
+            'PATHWAY', 'MODULE', 'GENES']:
+        _handlers[_key] = "_interpret_links"
+    for _key in ['DRUG_TARGET', 'STRUCTURE', 'MOTIF']:
+        _handlers[_key] = "_interpret_identifiers"
+    for _key in ['DBLINKS', 'INTERACTION', 'METABOLISM']:
+        _handlers[_key] = "_interpret_dblinks"
+    for _key in ['EXACT_MASS', 'MOL_WEIGHT']:
+        _handlers[_key] = "_interpret_float"
+    for _key in ['AASEQ', 'NTSEQ']:
+        _handlers[_key] = "_interpret_seq"
+    for _key in ['ATOM', 'BOND', 'NODE', 'EDGE', 'ALIGN', 'RDM']:
+        _handlers[_key] = "_interpret_enumeration_field"
+    # do not interpret to keep structure
+    for _key in ['BRACKET', 'COMPONENT', 'SOURCE', 'BRITE', "TARGET",
+            'CARCINOGEN', 'MARKER']:
+        _handlers[_key] = False
+    _list_handlers = {'REFERENCE': '_interpret_references',
+        'PLASMID': '_interpret_plasmid', 'CHROMOSOME': '_interpret_chromosome',
+        'TAXONOMY': '_interpret_taxonomy', 'SEQUENCE': '_interpret_sequence'}
+    for _key in _list_handlers:
+        _handlers[_key] = "_interpret_list"
+    _handlers['STATISTICS'] = "_interpret_statistics"
+    _handlers['GENE'] = "_interpret_key_value"
+    del _key
+
     def _interpret_enumeration(self, data):
         N = data.strip().split("\n")[0]
         # must be a number
@@ -1558,6 +1778,85 @@ class KEGGParser(object):
 
 
 
+class _ScanStore(object):
+    """Local store of the entries scanned by :class:`KEGGTools`
+
+    Entries are written as they arrive in a JSON Lines file or, if the
+    filename ends with .parquet, in a Parquet dataset: a directory where
+    each batch of entries is written as a new part file with two columns (id
+    and the entry as a JSON string). Part files are renamed into place once
+    complete, so that an interrupted scan only loses the current batch.
+    Entries already stored are read back so that a scan can be resumed.
+    """
+    #: number of entries per Parquet part file
+    batch_size = 100
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.parquet = filename.endswith(".parquet")
+        self._fout = None
+        self._buffer = []
+        self._count = 0
+
+    def _parts(self):
+        return [os.path.join(self.filename, x)
+            for x in sorted(os.listdir(self.filename)) if x.endswith(".parquet")]
+
+    def read(self):
+        if not os.path.exists(self.filename):
+            return
+        if self.parquet:
+            import pyarrow.parquet as pq
+            for part in self._parts():
+                for batch in pq.ParquetFile(part).iter_batches():
+                    for identifier, entry in zip(*batch.to_pydict().values()):
+                        yield identifier, json.loads(entry)
+        else:
+            with open(self.filename) as fin:
+                for line in fin:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # last line may be truncated if a scan was interrupted
+                        continue
+                    yield record["id"], record["entry"]
+
+    def open(self):
+        if self.parquet:
+            os.makedirs(self.filename, exist_ok=True)
+        else:
+            self._fout = open(self.filename, "a")
+
+    def write(self, identifier, entry):
+        if self.parquet:
+            self._buffer.append((identifier, json.dumps(entry)))
+            if len(self._buffer) >= self.batch_size:
+                self._flush()
+        else:
+            self._fout.write(json.dumps({"id": identifier, "entry": entry}) + "\n")
+            self._fout.flush()
+
+    def _flush(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if self._buffer:
+            ids, entries = zip(*self._buffer)
+            # time based names keep the parts of successive runs in order
+            self._count += 1
+            name = os.path.join(self.filename, "part-%016d-%06d.parquet" % (
+                time.time() * 1e6, self._count))
+            pq.write_table(pa.table({"id": list(ids), "entry": list(entries)}),
+                name + ".tmp")
+            os.replace(name + ".tmp", name)
+            self._buffer = []
+
+    def close(self):
+        if self.parquet:
+            self._flush()
+        else:
+            self._fout.close()
+
+
 class KEGGTools(KEGG):
     """Load all genes from the database.
 
@@ -1567,6 +1866,11 @@ class KEGGTools(KEGG):
         k.load_genes("hsa")
         genes = k.scan_genes()
 
+    Genes are retrieved in batches of 10 entries sent concurrently (see
+    :meth:`KEGG.get_many`). For whole genomes, entries can be saved as they
+    arrive in a local file, which also allows to resume an interrupted scan::
+
+        k.scan_genes("hsa_genes.jsonl", in_memory=False)
 
     """
     def __init__(self, verbose=False, organism="hsa"):
@@ -1580,30 +1884,69 @@ class KEGGTools(KEGG):
         self.genes =  [x.split("\t")[0] for x in res.strip().split("\n")]
         return self.genes
 
-    def scan_genes(self):
-        from easydev import progress_bar
-        pb = progress_bar(len(self.genes))
-        import time
-        genes = {}
-        for i, gene in enumerate(self.genes):
-            genes[gene] = self.parser.parse(self.kegg.get(self.genes[i]))
-            pb.animate(i, time.time()-pb.start)
-        return genes
+    def scan_genes(self, filename=None, in_memory=True):
+        """Retrieves and parses all genes (see :meth:`load_genes`)
+
+        :param str filename: optional JSON Lines file (or Parquet dataset
+            directory if the extension is .parquet) where parsed entries are
+            written as they arrive. Entries already in the file are not retrieved again.
+        :param bool in_memory: if False, entries are only written in the
+            file and nothing is returned.
+        :return: dictionary of parsed entries keyed by gene identifiers.
+            Entries that could not be retrieved are missing (and retrieved
+            again if the scan is resumed).
+        """
+        return self._scan(self.genes, filename, in_memory)
 
     def load_reactions(self, organism):
         reactions = self.kegg.list('reaction')
         self.reactions = [x.split()[0] for x in reactions.split("\n") if len(x)]
         return self.reactions
 
-    def scan_reactions(self):
-        from easydev import progress_bar
-        pb = progress_bar(len(self.reactions))
-        import time
-        reactions = {}
-        for i, this in enumerate(self.reactions):
-            reactions[this] = self.parser.parse(self.kegg.get(self.reactions[i]))
-            pb.animate(i, time.time()-pb.start)
-        return reactions
+    def scan_reactions(self, filename=None, in_memory=True):
+        """Retrieves and parses all reactions (see :meth:`load_reactions`)
 
+        See :meth:`scan_genes` for the parameters.
+        """
+        return self._scan(self.reactions, filename, in_memory)
 
+    def _scan(self, identifiers, filename=None, in_memory=True):
+        from easydev import progress_bar
 
+        results = {}
+        done = set()
+        store = _ScanStore(filename) if filename else None
+        if store:
+            for identifier, entry in store.read():
+                done.add(identifier)
+                if in_memory:
+                    results[identifier] = entry
+            if done:
+                self.kegg.logging.info("Skipping %s entries found in %s" % (
+                    len(done), filename))
+        todo = [x for x in identifiers if x not in done]
+        if not todo:
+            return results if in_memory else None
+
+        missing = 0
+        pb = progress_bar(len(todo))
+        if store:
+            store.open()
+        try:
+            for i, (identifier, entry) in enumerate(self.kegg.get_many(todo)):
+                if entry is not None:
+                    entry = self.parser.parse(entry)
+                if not entry:
+                    missing += 1
+                else:
+                    if store:
+                        store.write(identifier, entry)
+                    if in_memory:
+                        results[identifier] = entry
+                pb.animate(i + 1, time.time()-pb.start)
+        finally:
+            if store:
+                store.close()
+        if missing:
+            self.kegg.logging.warning("%s entries could not be retrieved" % missing)
+        return results if in_memory else None
@@ -1,5 +1,6 @@
 import time
-from bioservices import Kegg, UniProt, KeggParser, UniChem, BioDBNet, HGNC
+from bioservices import UniProt, KEGGParser, UniChem, BioDBNet, HGNC, \
+    HGNCDeprecated
 from easydev import Logging
 try:
     import pandas as pd
@@ -42,7 +43,7 @@ class Mapper(Logging):
         self._uniprot_service = UniProt()
 
         self.logging.info("... KEGG")
-        self._kegg_service = KeggParser(verbose=False)
+        self._kegg_service = KEGGParser(verbose=False)
 
         self.logging.info("... HGNC")
         self._hgnc_service = HGNC()
@@ -130,23 +131,30 @@ class HGNCMapper(object):
             'MEROPS', 'Nucleotide', 'OMIM', 'PubMed', 'RefSeq', 'Rfam',
             'Treefam', 'UniProt', 'Vega', 'miRNA', 'snoRNABase']
     def __init__(self, filename=None):
-        self._hgnc_service = HGNC()
-        if filename == None:
-            self.alldata = self.load_all_hgnc()
-            self.df = self.build_dataframe()
+        """
+
+        :param str filename: file where the HGNC cross references are saved
+            (TSV or .parquet). If the file exists, it is loaded instead of
+            fetching the data from HGNC. Otherwise, the data is fetched and
+            saved in this file.
+        """
+        self._hgnc_service = HGNCDeprecated()
+        if filename and os.path.exists(filename):
+            self.alldata = HGNCDeprecated.read_table(filename)
         else:
-            self.read_csv(filename)
+            self.alldata = self.load_all_hgnc(filename)
+        self.df = self.build_dataframe()
 
-    def load_all_hgnc(self):
+    def load_all_hgnc(self, filename=None):
         """keys are unique Gene names"""
         print("Fetching the data from HGNC first. May take a few minutes"),
-        alldata = self._hgnc_service.mapping_all()
+        alldata = self._hgnc_service.mapping_all(filename=filename)
         print("done")
         return alldata
 
     def build_dataframe(self):
         # simplify to get a dictionary of dictionary
-        data = {k1:{k2:v2['xkey'] for k2,v2 in self.alldata[k1].iteritems()} for k1 in self.alldata.keys()}
+        data = {k1:{k2:v2['xkey'] for k2,v2 in self.alldata[k1].items()} for k1 in self.alldata.keys()}
         dfdata = pd.DataFrame(data)
         dfdata = dfdata.transpose()
         # rename to tag with "HGNC"
@@ -162,7 +170,7 @@ class KEGGMapper(object):
     """
     kegg_dblinks  = ["IMGT", "Ensembl", "HGNC", "HPRD", "NCBI-GI", "OMIM", "NCBI-GeneID", "UniProt", "Vega"]
     def __init__(self, verbose=True):
-        self._kegg_service = KeggParser(verbose=verbose)
+        self._kegg_service = KEGGParser(verbose=verbose)
 
         print("Loading all gene identifiers for HSA")
         names = self._kegg_service.list("hsa")
@@ -247,8 +255,8 @@ class KEGGMapper(object):
         #pickle.dump(results, open("kegg_gene.dat","w"))
         
 
-from bioservices import KeggParser
-kegg = KeggParser(verbose=False)
+from bioservices import KEGGParser
+kegg = KEGGParser(verbose=False)
 
 def test_func(names):
     from easydev import MultiProcessing
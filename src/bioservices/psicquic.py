@@ -133,14 +133,44 @@ param           Interaction parameters. Only true or
 
 """
 
-from bioservices import REST, UniProt
+import time
+from collections import namedtuple
+import concurrent.futures
+
+from bioservices import REST, UniProt, BioServicesError
+from bioservices.services import get_executor
 
 
 #http://code.google.com/p/psicquic/wiki/PsicquicSpec_1_3_Rest
 
 #http://www.biocatalogue.org/services/2078#operations
 
-__all__ = ["PSICQUIC"]
+__all__ = ["PSICQUIC", "MITABRecord"]
+
+
+# columns of MITAB 2.5 (15 first columns), 2.6 (36) and 2.7 (42)
+_mitab_columns = ["id_a", "id_b", "alt_ids_a", "alt_ids_b", "aliases_a",
+    "aliases_b", "detection_methods", "first_authors", "publications",
+    "taxid_a", "taxid_b", "interaction_types", "source_databases",
+    "interaction_ids", "confidence",
+    # 2.6
+    "expansion", "bio_role_a", "bio_role_b", "exp_role_a", "exp_role_b",
+    "type_a", "type_b", "xrefs_a", "xrefs_b", "xrefs_interaction",
+    "annotations_a", "annotations_b", "annotations_interaction",
+    "host_organism", "parameters", "creation_date", "update_date",
+    "checksum_a", "checksum_b", "checksum_interaction", "negative",
+    # 2.7
+    "features_a", "features_b", "stoichiometry_a", "stoichiometry_b",
+    "identification_a", "identification_b"]
+
+_mitab_sizes = {"tab25": 15, "tab26": 36, "tab27": 42}
+
+
+#: An interaction in MITAB format (see :meth:`PSICQUIC.iter_query`). Values
+#: are the raw strings of the MITAB columns; columns that are not in the
+#: requested format (e.g. the 2.7 columns of a tab25 query) are None.
+MITABRecord = namedtuple("MITABRecord", _mitab_columns)
+MITABRecord.__new__.__defaults__ = (None,) * len(_mitab_columns)
 
 
 class PSICQUIC(REST):
@@ -422,11 +452,7 @@ class PSICQUIC(REST):
         if service not in self.activeDBs:
             raise ValueError("database %s not in active databases" % service)
 
-        params = {}
-        if output is not None:
-            self.devtools.check_param_in_list(output, self.formats)
-            params['format'] = output
-        else: output="none"
+        params = self._get_query_params(output, firstResult, maxResults)
 
         names = [x.lower() for x in self.registry_names]
         try:
@@ -438,24 +464,196 @@ class PSICQUIC(REST):
         # get the base url according to the service requested
         resturl = self.registry_resturls[index]
 
-        if firstResult is not None:
-            params['firstResult'] = firstResult
-        if maxResults is not None:
-            params['maxResults'] = maxResults
-
         url = resturl  + 'query/' + query
 
+        if output is None:
+            output = "none"
         if "xml" in output:
             res = self.http_get(url, frmt="xml", params=params)
         else:
             res = self.http_get(url, frmt="txt", params=params)
-            res = res.strip().split("\n")
+        return self._parse_query(res, output)
 
+    def _get_query_params(self, output, firstResult=None, maxResults=None):
+        params = {}
+        if output is not None:
+            self.devtools.check_param_in_list(output, self.formats)
+            params['format'] = output
+        if firstResult is not None:
+            params['firstResult'] = firstResult
+        if maxResults is not None:
+            params['maxResults'] = maxResults
+        return params
+
+    def _parse_query(self, res, output):
+        if "xml" in output:
+            return res
+        res = res.strip().split("\n")
         if output.startswith("tab"):
             res = self._convert_tab2dict(res)
-
         return res
 
+    def _query_provider(self, resturl, query, output, params, timeout=None):
+        # single query to a provider that raises an error if it fails
+        frmt = "xml" if "xml" in output else "txt"
+        res = self._http_get_one(resturl + 'query/' + query, frmt=frmt,
+            params=params, timeout=timeout)
+        if res is None or isinstance(res, int):
+            raise BioServicesError("query failed (status {})".format(res))
+        return self._parse_query(res, output)
+
+    def _get_active_resturls(self, databases=None):
+        # REST URL of the databases, checking that they are active
+        actives = self.activeDBs
+        if databases is None:
+            databases = actives
+        for x in databases:
+            if x not in actives:
+                raise ValueError("database %s not in active databases" % x)
+        resturls = dict(zip([x.lower() for x in self.registry_names],
+            self.registry_resturls))
+        return [(name, resturls[name]) for name in databases]
+
+    def _fan_out(self, func, databases, deadline):
+        """Calls func(name, resturl) concurrently for each database
+
+        :param float deadline: time (in seconds) after which the databases
+            that did not answer are reported as failed
+        :return: a tuple with the results and the errors of the databases
+            that failed, both keyed by database name.
+
+        Each request is also limited by its own (HTTP) timeout, which only
+        applies while no data is received; the deadline stops waiting for
+        providers that keep sending data or never close the connection.
+        """
+        executor = get_executor()
+        futures = [(name, executor.submit(func, name, resturl))
+            for name, resturl in databases]
+
+        results, errors = {}, {}
+        end = time.time() + deadline
+        for name, future in futures:
+            try:
+                results[name] = future.result(timeout=max(0, end - time.time()))
+            except concurrent.futures.TimeoutError:
+                # the request keeps running in the background
+                future.cancel()
+                errors[name] = "no answer after {} seconds".format(deadline)
+            except Exception as err:
+                errors[name] = str(err) or err.__class__.__name__
+        for name in sorted(errors):
+            self.logging.warning("%s failed: %s" % (name, errors[name]))
+        return results, errors
+
+    def _iter_page(self, url, params):
+        # streams the lines of one page of results
+        kargs = self._get_headers_kargs("txt", {})
+        res = self._request("get", url, params=params, stream=True,
+            timeout=self.TIMEOUT, proxies=self.proxies, cert=self.cert,
+            headers=kargs['headers'])
+        try:
+            if not res.ok:
+                raise BioServicesError("{} returned {} ({})".format(url,
+                    res.status_code, res.reason))
+            res.encoding = res.encoding or "utf-8"
+            for line in res.iter_lines(decode_unicode=True):
+                if line:
+                    yield line
+        finally:
+            res.close()
+
+    def iter_query(self, service, query, output="tab25", page_size=1000,
+                   limit=None):
+        """Iterates over the interactions found by a query
+
+        :param str service: a registered service. See :attr:`registry_names`.
+        :param str query: a valid query (see :meth:`query`)
+        :param str output: tab25, tab26 or tab27
+        :param int page_size: number of interactions requested at a time
+            (maxResults parameter)
+        :param int limit: maximum number of interactions
+        :return: a generator of :class:`MITABRecord`
+
+        Unlike :meth:`query`, the results are requested page by page using
+        the firstResult and maxResults parameters and each page is read as
+        it is received, so that large results (e.g. a whole species) can be
+        processed without holding them in memory. Responses are not cached::
+
+            >>> s = PSICQUIC()
+            >>> for record in s.iter_query("intact", "zap70"):
+            ...     print(record.id_a, record.id_b, record.publications)
+
+        .. seealso:: :meth:`query_to_file`
+        """
+        self.devtools.check_param_in_list(output, list(_mitab_sizes))
+        url = dict(self._get_active_resturls([service]))[service] + 'query/' + query
+        size = _mitab_sizes[output]
+
+        count = 0
+        first = 0
+        while limit is None or count < limit:
+            maxResults = page_size
+            if limit is not None:
+                maxResults = min(page_size, limit - count)
+            params = self._get_query_params(output, first, maxResults)
+            n = 0
+            for line in self._iter_page(url, params):
+                n += 1
+                yield MITABRecord(*line.split("\t")[:size])
+            count += n
+            if n < maxResults:
+                break
+            first += n
+
+    def query_to_file(self, service, query, filename, output="tab25",
+                      page_size=1000, limit=None, batch_size=10000):
+        """Writes the interactions found by a query into a file
+
+        :param str filename: a TSV file or a Parquet file if the extension
+            is .parquet (requires pyarrow)
+        :param int batch_size: number of rows written at a time in Parquet
+            files
+        :return: number of interactions written
+
+        Other parameters are those of :meth:`iter_query`. The columns are
+        named after the fields of :class:`MITABRecord` and are limited to
+        the columns of the output format.
+        """
+        records = self.iter_query(service, query, output=output,
+            page_size=page_size, limit=limit)
+        columns = _mitab_columns[:_mitab_sizes[output]]
+        count = 0
+
+        if filename.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            schema = pa.schema([(name, pa.string()) for name in columns])
+            with pq.ParquetWriter(filename, schema) as writer:
+                batch = []
+                for record in records:
+                    batch.append(record)
+                    if len(batch) == batch_size:
+                        writer.write_table(self._to_table(batch, columns, schema))
+                        count += len(batch)
+                        batch = []
+                if batch or count == 0:
+                    writer.write_table(self._to_table(batch, columns, schema))
+                    count += len(batch)
+        else:
+            with open(filename, "w") as fout:
+                fout.write("\t".join(columns) + "\n")
+                for record in records:
+                    fout.write("\t".join("-" if x is None else x
+                        for x in record[:len(columns)]) + "\n")
+                    count += 1
+        return count
+
+    def _to_table(self, records, columns, schema):
+        import pyarrow as pa
+        values = list(zip(*records)) if records else [[]] * len(columns)
+        return pa.table(dict((name, list(values[i]))
+            for i, name in enumerate(columns)), schema=schema)
+
     def _convert_tab2dict(self, data):
         """
 
@@ -467,51 +665,75 @@ class PSICQUIC(REST):
 
         return results
 
-    def queryAll(self, query, databases=None, output="tab25", version="current", firstResult=None, maxResults=None):
+    def queryAll(self, query, databases=None, output="tab25", version="current",
+                 firstResult=None, maxResults=None, timeout=None,
+                 return_errors=False, deadline=None):
         """Same as query but runs on all active database
 
         :param list databases: database to query. Queries all active DB if not provided
-        :return: dictionary where keys correspond to databases and values to the output of the query.
-
-        ::
-
-            res = s.queryAll("ZAP70 AND species:9606")
+        :param float timeout: timeout (in seconds) of the request sent to
+            each database (default to the general.timeout setting)
+        :param float deadline: maximum time (in seconds) to wait for all the
+            databases (default to 10 times the timeout)
+        :param bool return_errors: also returns the errors of the databases
+            that failed
+        :return: dictionary where keys correspond to databases and values to
+            the output of the query. If return_errors is True, a tuple with
+            this dictionary and a dictionary of errors keyed by database.
+
+        The databases are queried concurrently, each within the rate limit of
+        its own host. Databases that fail or do not answer in time are not
+        in the returned dictionary::
+
+            res, errors = s.queryAll("ZAP70 AND species:9606", return_errors=True)
+            errors   # e.g. {'mint': 'Read timed out. (read timeout=30)'}
         """
+        databases = self._get_active_resturls(databases)
+        params = self._get_query_params(output, firstResult, maxResults)
+        output = output or "none"
 
-        results = {}
-        if databases is None:
-            databases = [x.lower() for x in self.activeDBs]
-
-        for x in databases:
-            if x not in self.activeDBs:
-                raise ValueError("database %s not in active databases" % x)
-
-
-        for name in databases:
-            self.logging.warning("Querying %s" % name),
-            res = self.query(name, query, output=output, version=version, firstResult=firstResult, maxResults=maxResults)
+        def func(name, resturl):
+            res = self._query_provider(resturl, query, output, params, timeout)
             if output.startswith("tab25"):
-                results[name] = [x for x in res if x!=[""]]
-            else:
-                import copy
-                results[name] = copy.copy(res)
-        for name in databases:
+                res = [x for x in res if x != [""]]
+            return res
+
+        results, errors = self._fan_out(func, databases,
+            deadline or 10 * (timeout or self.TIMEOUT))
+        for name in results:
             self.logging.info("Found %s in %s" % (len(results[name]), name))
+        if return_errors:
+            return results, errors
         return results
 
-    def getInteractionCounter(self, query):
+    def getInteractionCounter(self, query, timeout=None, return_errors=False,
+                              deadline=None):
         """Returns a dictionary with database as key and results as values
 
         :param str query: a valid query
+        :param float timeout: timeout (in seconds) of the request sent to
+            each database (default to the general.timeout setting)
+        :param float deadline: maximum time (in seconds) to wait for all the
+            databases (default to 10 times the timeout)
+        :param bool return_errors: also returns the errors of the databases
+            that failed (see :meth:`queryAll`)
         :return: a dictionary which key as database and value as number of entries
 
-        Consider only the active database.
+        Consider only the active database. As in :meth:`queryAll`, the
+        databases are queried concurrently.
 
         """
-        # get the active names only
-        activeDBs = self.activeDBs[:]
-        res = [(str(name), int(self.query(name, query, output="count")[0])) for name in activeDBs]
-        return dict(res)
+        databases = self._get_active_resturls()
+        params = self._get_query_params("count")
+
+        def func(name, resturl):
+            res = self._query_provider(resturl, query, "count", params, timeout)
+            return int(res[0])
+        results, errors = self._fan_out(func, databases,
+            deadline or 10 * (timeout or self.TIMEOUT))
+        if return_errors:
+            return results, errors
+        return results
 
     def getName(self, data):
         idsA = [x[0] for x in data]
@@ -543,61 +765,49 @@ class PSICQUIC(REST):
 
         """
         self.logging.info("converting data into known names")
-        idsA = [x[0].replace("\"","") for x in data]
-        idsB = [x[1].replace("\"", "") for x in data]
-        # extract the first and second ID but let us check if it is part of a
-        # known uniprot mapping.Otherwise no conversion will be possible.
-        # If so, we set the ID to "unknown"
-        # remove the " character that can be found in a few cases (e.g,
-        # chebi:"CHEBI:29036")
-        #idsA = [x.replace("chebi:CHEBI:","chebi:") for x in idsA]
-        #idsB = [x.replace("chebi:CHEBI:", "chebi:") for x in idsB]
-
-        # special case:
-        # in mint, there is an entry that ends with a | uniprotkb:P17844|
-        idsA = [x.strip("|") for x in idsA]
-        idsB = [x.strip("|") for x in idsB]
-
-
-        # the first ID
-        for i, entry in enumerate(idsA):
-            try:
-                dbs = [x.split(":")[0] for x in entry.split("|")]
-                IDs = [x.split(":")[1] for x in entry.split("|")]
-                valid_dbs = [(db,ID) for db,ID in zip(dbs,IDs) if db in self._mapping_uniprot.keys()]
-                # search for an existing DB
-                if len(valid_dbs)>=1:
-                    idsA[i] = valid_dbs[0][0] + ":" + valid_dbs[0][1]
-                else:
-                    self.logging.debug("none of the DB for this entry (%s) are available" % (entry))
-                    idsA[i] = "?" + dbs[0] + ":" + IDs[0]
-            except:
-                self.logging.info("Could not extract name from %s" % entry)
-                idsA[i] = "??:" + entry  # we add a : so that we are sure that a split(":") will work
-        # the second ID
-        for i, entry in enumerate(idsB):
-            try:
-                dbs = [x.split(":")[0] for x in entry.split("|")]
-                IDs = [x.split(":")[1] for x in entry.split("|")]
-                valid_dbs = [(db,ID) for db,ID in zip(dbs,IDs) if db in self._mapping_uniprot.keys()]
-                # search for an existing DB
-                if len(valid_dbs)>=1:
-                    idsB[i] = valid_dbs[0][0] + ":" + valid_dbs[0][1]
-                else:
-                    self.logging.debug("none of the DB (%s) for this entry are available" % (entry))
-                    idsB[i] = "?" + dbs[0] + ":" + IDs[0]
-            except:
-                self.logging.info("Could not extract name from %s" % entry)
-                idsB[i] = "??:" + entry
+        idsA = self._known_names([x[0] for x in data])
+        idsB = self._known_names([x[1] for x in data])
 
+        unknownA = [x.split(":")[0] for x in set(idsA) if x.startswith("?")]
+        unknownB = [x.split(":")[0] for x in set(idsB) if x.startswith("?")]
         countA = len([x for x in idsA if x.startswith("?")])
         countB = len([x for x in idsB if x.startswith("?")])
         if countA+countB > 0:
             self.logging.warning("%s ids out of %s were not identified" % (countA+countB, len(idsA)*2))
-            print(set([x.split(":")[0] for x in idsA if x.startswith("?")]))
-            print(set([x.split(":")[0] for x in idsB if x.startswith("?")]))
+            print(set(unknownA))
+            print(set(unknownB))
         self.logging.info("knownName done")
-        return idsA, idsB
+        return list(idsA), list(idsB)
+
+    def _known_name(self, entry):
+        # conversion of one entry (see knownName)
+        # remove the " character that can be found in a few cases (e.g,
+        # chebi:"CHEBI:29036") and the trailing | found in mint
+        entry = entry.replace("\"", "").strip("|")
+        try:
+            pairs = [x.split(":") for x in entry.split("|")]
+            dbs = [x[0] for x in pairs]
+            IDs = [x[1] for x in pairs]
+        except IndexError:
+            self.logging.info("Could not extract name from %s" % entry)
+            # we add a : so that we are sure that a split(":") will work
+            return "??:" + entry
+        for db, ID in zip(dbs, IDs):
+            if db in self._mapping_uniprot:
+                return db + ":" + ID
+        self.logging.debug("none of the DB for this entry (%s) are available" % (entry))
+        return "?" + dbs[0] + ":" + IDs[0]
+
+    def _known_names(self, ids):
+        # the conversion is done once per distinct identifier
+        import numpy as np
+        import pandas as pd
+        # missing entries have the code -1, that is the last name
+        codes, uniques = pd.factorize(np.asarray(ids, dtype=object))
+        names = [self._known_name(x) for x in uniques]
+        if (codes == -1).any():
+            names.append(self._known_name(""))
+        return np.array(names, dtype=object)[codes]
 
     def preCleaning(self, data):
         """remove entries ehre IdA or IdB is set to "-"
@@ -627,30 +837,48 @@ class PSICQUIC(REST):
         """Remove entries with a None and keep only those with the keep pattern
 
         """
-        if verbose:print("Before removing anything: ", len(data))
-
-        data = [x for x in data if x[0] is not None and x[1] is not None]
-        if verbose:print("After removing the None: ", len(data))
-
-        data = [x for x in data if x[0].startswith("!")is False and x[1].startswith("!")is False]
-        if verbose:print("After removing the !: ", len(data))
-
+        import pandas as pd
+        # the filters are applied on the columns of interactors A and B
+        # (a DataFrame) and the entries that are kept are selected by index
+        as_frame = isinstance(data, pd.DataFrame)
+        if as_frame:
+            df = data
+        else:
+            data = list(data)
+            df = pd.DataFrame({"A": [x[0] for x in data],
+                "B": [x[1] for x in data]})
+        if verbose:print("Before removing anything: ", len(df))
+        if len(df) == 0:
+            return df if as_frame else []
+        A, B = df.columns[0], df.columns[1]
+
+        df = df[df[A].notna() & df[B].notna()]
+        if verbose:print("After removing the None: ", len(df))
+
+        a, b = df[A].astype(str), df[B].astype(str)
+        keep = ~(a.str.startswith("!") | b.str.startswith("!"))
+        df, a, b = df[keep], a[keep], b[keep]
+        if verbose:print("After removing the !: ", len(df))
 
         for db in remove_db:
-            data = [x for x in data if x[0].startswith(db)is False]
-            data = [x for x in data if x[1].startswith(db)is False]
-            if verbose:print("After removing entries that match %s : " % db, len(data))
+            keep = ~(a.str.startswith(db) | b.str.startswith(db))
+            df, a, b = df[keep], a[keep], b[keep]
+            if verbose:print("After removing entries that match %s : " % db, len(df))
 
-        data = [x for x in data if keep_only in x[0] and keep_only in x[1]]
-        if verbose:print("After removing entries that don't match %s : " % keep_only, len(data))
+        keep = a.str.contains(keep_only, regex=False) & b.str.contains(keep_only, regex=False)
+        df, a, b = df[keep], a[keep], b[keep]
+        if verbose:print("After removing entries that don't match %s : " % keep_only, len(df))
 
         if keep_self_loop is False:
-            data = [x for x in data if x[0]!=x[1]]
-            if verbose:print("After removing self loop : ", len(data))
-
-        data = list(set(data))
+            df = df[a != b]
+            if verbose:print("After removing self loop : ", len(df))
+
+        if as_frame:
+            df = df.drop_duplicates()
+            if verbose:print("After removing identical entries", len(df))
+            return df
+        data = list(dict.fromkeys(data[i] for i in df.index))
         if verbose:print("After removing identical entries", len(data))
-
         return data
 
     def convertAll(self, data):
@@ -661,93 +889,77 @@ class PSICQUIC(REST):
         return results
 
     def convert(self, data, db=None):
+        """Returns the interactors A and B (mapped with :meth:`mappingOneDB`),
+        the score, the interaction type, the reference and the database of
+        each entry
+        """
+        import numpy as np
+        import pandas as pd
         self.logging.debug("converting the database %s" % db)
+        if len(data) == 0:
+            return []
         idsA, idsB = self.knownName(data)
-        mapping = self.mappingOneDB(data)
-        results = []
-        for i, entry in enumerate(data):
-            x = idsA[i].split(":",1)[1]
-            y = idsB[i].split(":",1)[1]
-            xp = mapping[x]
-            yp = mapping[y]
-            try:ref = entry[8]
-            except:ref="?"
-            try:score = entry[14]
-            except:score = "?"
-            try:interaction = entry[11]
-            except:interaction="?"
-            results.append((xp, yp, score, interaction, ref, db))
-        return results
+        mapping = self.mappingOneDB(data, names=(idsA, idsB))
 
-    def mappingOneDB(self, data):
-        query = {}
-        self.logging.debug("converting IDs with proper DB name (knownName function)")
-        entriesA, entriesB = self.knownName(data) # idsA and B contains list of a single identifier of the form db:id
-        # the db is known from _mapping.uniprot otherwise it is called "unknown"
-
-        # get unique DBs to build the query dictionary
-        dbsA = [x.split(":")[0] for x in entriesA]
-        dbsB = [x.split(":")[0] for x in entriesB]
-        for x in set(dbsA):
-            query[x] = set()
-        for x in set(dbsB):
-            query[x] = set()
-        for k in query.keys():
-            if k.startswith("?"):
-                del query[k]
-
-        # the data to store
-        mapping = {}
+        # DB:ID names of A and B are mapped once per distinct name
+        codes, uniques = pd.factorize(np.asarray(idsA + idsB, dtype=object))
+        mapped = np.array([mapping[x.split(":", 1)[1]] for x in uniques],
+            dtype=object)[codes].tolist()
         N = len(data)
 
-        # scan all entries
-        counter = 0
-        for entryA, entryB in zip(entriesA, entriesB):
-            counter += 1
-            dbA, idA = entryA.split(":")
-            try:
-                dbB, idB = entryB.split(":")
-            except:
-                print(entryB)
-            if idA not in mapping.keys():
-                if dbA.startswith("?"):
-                    mapping[idA] = entryA
-                else:
-                    query[dbA].add(idA)
-            if idB not in mapping.keys():
-                if dbB.startswith("?"):
-                    mapping[idB] = entryB
+        def column(index):
+            # missing columns are replaced by ?
+            return [x[index] if len(x) > index else "?" for x in data]
+        return list(zip(mapped[:N], mapped[N:], column(14), column(11),
+            column(8), [db] * N))
+
+    def mappingOneDB(self, data, names=None):
+        """Maps the identifiers of the interactors onto UniProt identifiers
+
+        :param data: MITAB entries
+        :param names: output of :meth:`knownName` if already computed
+        :return: a dictionary with the identifiers found in the entries as
+            keys. Identifiers from known databases are mapped with
+            :meth:`UniProt.mapping`; those that could not be mapped are
+            prefixed with !. Identifiers from unknown databases are kept as
+            DB:ID.
+        """
+        self.logging.debug("converting IDs with proper DB name (knownName function)")
+        if names is None:
+            names = self.knownName(data)
+        # idsA and B contains list of a single identifier of the form db:id
+        # the db is known from _mapping.uniprot otherwise it starts with ?
+        # Distinct names are scanned in the order of the entries (A then B);
+        # the first DB found for an identifier is kept.
+        entries = dict.fromkeys(x for pair in zip(*names) for x in pair)
+        first = {}
+        for entry in entries:
+            db, ID = entry.split(":", 1)
+            if ID not in first:
+                first[ID] = (db, entry)
+
+        mapping = {}
+        query = {}
+        for ID, (db, entry) in first.items():
+            if db.startswith("?"):
+                mapping[ID] = entry
+            else:
+                query.setdefault(db, []).append(ID)
+
+        for k, this_query in query.items():
+            DBname = self._mapping_uniprot[k]
+            if DBname is None:
+                mapping.update((x, k + ":" + x) for x in this_query)
+                continue
+            self.logging.warning("Request sent to uniprot for %s database (%s ids)" % (DBname, len(this_query)))
+            res = self.uniprot.mapping(fr=DBname, to="ID", query=this_query)
+            for x in this_query:
+                if x not in res: #was not found
+                    mapping[x] = "!" + k+":"+x
                 else:
-                    query[dbB].add(idB)
-
-            for k in query.keys():
-                if len(query[k])>2000 or counter == N:
-                    this_query = list(query[k])
-                    DBname = self._mapping_uniprot[k]
-
-                    if DBname is not None:
-                        self.logging.warning("Request sent to uniprot for %s database (%s/%s)" % (DBname, counter, N))
-                        res = self.uniprot.mapping(fr=DBname, to="ID", query=" ".join(this_query))
-                        for x in this_query:
-                            if x not in res: #was not found
-                                mapping[x] = "!" + k+":"+x
-                            else:
-                                # we should be here since the queries are populated
-                                # if not already in the mapping dictionary
-                                if x not in res.keys():
-                                    raise ValueError(x)
-                                if len(res[x])==1:
-                                    mapping[x] = res[x][0]
-                                else:
-                                    self.logging.warning("psicquic mapping found more than 1 id. keep first one")
-                                    mapping[x] = res[x][0]
-                    else:
-                        for x in this_query:
-                            mapping[x] = k + ":" + x
-                    query[k] = set()
-
-        for k in query.keys():
-            assert len(query[k])==0
+                    if len(res[x]) > 1:
+                        self.logging.warning("psicquic mapping found more than 1 id. keep first one")
+                    mapping[x] = res[x][0]
         return mapping
 
 
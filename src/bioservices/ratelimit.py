@@ -0,0 +1,223 @@
+# -*- python -*-
+#
+#  This file is part of bioservices software
+#
+#  Copyright (c) 2013-2014 - EBI-EMBL
+#
+#  File author(s):
+#      https://github.com/cokelaer/bioservices
+#
+#  Distributed under the GPLv3 License.
+#  See accompanying file LICENSE.txt or copy at
+#      http://www.gnu.org/licenses/gpl-3.0.html
+#
+#  source: http://github.com/cokelaer/bioservices
+#  documentation: http://packages.python.org/bioservices
+#
+##############################################################################
+"""Process-wide rate limiters shared by all services hitting the same host
+
+Providers such as KEGG or NCBI limit the number of requests per second and per
+IP address, not per client object. All :class:`~bioservices.services.Service`
+instances therefore share one :class:`TokenBucket` per host, which is safe to
+use from several threads. With the ``ratelimit.interprocess`` option, the state
+of the bucket is stored in a lock file so that several processes (e.g. workers
+of a pipeline) share the same limit as well.
+
+::
+
+    from bioservices.ratelimit import get_rate_limiter_stats
+    from bioservices import KEGG
+    k1, k2 = KEGG(), KEGG()
+    # k1 and k2 share the same limiter
+    get_rate_limiter_stats()["rest.kegg.jp"]
+
+"""
+import os
+import time
+import threading
+
+try:
+    import fcntl
+except ImportError: # pragma: no cover (windows)
+    fcntl = None
+
+__all__ = ["TokenBucket", "get_rate_limiter", "get_rate_limiter_stats"]
+
+
+class TokenBucket(object):
+    """Thread-safe token bucket
+
+    :param float rate: number of tokens (requests) added per second
+    :param int burst: maximum number of tokens that can be accumulated, that
+        is the number of requests that can be sent at once.
+    :param str lock_file: if provided, the state of the bucket is stored in this
+        file and protected by a file lock so that it is shared between processes.
+
+    Callers reserve a token with :meth:`acquire`. If no token is available, the
+    reservation is still made and the caller sleeps until its token is
+    available; the sleep happens outside of the lock so that other threads can
+    make their reservation in the mean time.
+
+    When a server answers that too many requests were sent (HTTP 429),
+    :meth:`backoff` pauses all callers and halves the rate; :meth:`recover`
+    then increases the rate back to its initial value by small steps.
+    """
+    def __init__(self, rate, burst=1, lock_file=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.max_rate = self.rate
+        self.burst = max(1, int(burst))
+        self.lock_file = lock_file
+        # set by get_rate_limiter if the rate was set by the user
+        self._explicit = False
+        self._tokens = float(self.burst)
+        self._timestamp = time.time()
+        self._paused_until = 0.
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.waits = 0
+        self.time_waited = 0.
+        self.max_wait = 0.
+        self.backoffs = 0
+        self.time_backed_off = 0.
+
+    def _reserve(self, tokens, timestamp, now):
+        # refill then consume one token. tokens may become negative, in which
+        # case the caller has to wait for the missing fraction of token.
+        tokens = min(self.burst, tokens + (now - timestamp) * self.rate) - 1
+        delay = -tokens / self.rate if tokens < 0 else 0.
+        return tokens, delay
+
+    def _reserve_shared(self, now):
+        with open(self.lock_file, "a+") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                fh.seek(0)
+                try:
+                    tokens, timestamp = [float(x) for x in fh.read().split()]
+                except ValueError:
+                    tokens, timestamp = float(self.burst), now
+                tokens, delay = self._reserve(tokens, timestamp, now)
+                fh.seek(0)
+                fh.truncate()
+                fh.write("%r %r" % (tokens, now))
+                fh.flush()
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+        return delay
+
+    def acquire(self):
+        """Blocks until a request can be sent and returns the time spent waiting"""
+        with self._lock:
+            now = time.time()
+            if self.lock_file and fcntl is not None:
+                delay = self._reserve_shared(now)
+            else:
+                self._tokens, delay = self._reserve(self._tokens,
+                    self._timestamp, now)
+                self._timestamp = now
+            # pause requested by backoff()
+            delay = max(delay, self._paused_until - now)
+            self.calls += 1
+            if delay > 0:
+                self.waits += 1
+                self.time_waited += delay
+                self.max_wait = max(self.max_wait, delay)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def backoff(self, delay, min_rate_factor=8.):
+        """Pauses all callers for *delay* seconds and halves the rate
+
+        The rate is not decreased below max_rate / min_rate_factor.
+        """
+        with self._lock:
+            now = time.time()
+            self._paused_until = max(self._paused_until, now + delay)
+            self.rate = max(self.max_rate / min_rate_factor, self.rate / 2.)
+            self.backoffs += 1
+            self.time_backed_off += delay
+
+    def recover(self, step=0.05):
+        """Increases the rate (after a backoff) by step * max_rate"""
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + step * self.max_rate)
+
+    def _set_max_rate(self, rate):
+        # the current rate follows the new maximum unless it is lower
+        # because of a backoff (it then recovers up to the new maximum)
+        with self._lock:
+            if self.rate >= self.max_rate or rate < self.rate:
+                self.rate = float(rate)
+            self.max_rate = float(rate)
+
+    def _get_stats(self):
+        with self._lock:
+            return {"rate": self.rate, "max_rate": self.max_rate,
+                "burst": self.burst, "calls": self.calls, "waits": self.waits,
+                "time_waited": self.time_waited, "max_wait": self.max_wait,
+                "backoffs": self.backoffs,
+                "time_backed_off": self.time_backed_off}
+    stats = property(_get_stats,
+        doc="dictionary with number of calls, waits, backoffs and time spent waiting")
+
+    def reset_stats(self):
+        with self._lock:
+            self.calls = 0
+            self.waits = 0
+            self.time_waited = 0.
+            self.max_wait = 0.
+            self.backoffs = 0
+            self.time_backed_off = 0.
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(host, rate, burst=1, lock_dir=None, explicit=False):
+    """Returns the :class:`TokenBucket` shared by all services using this host
+
+    :param str host: the host (e.g., rest.kegg.jp) or any key identifying
+        the limit (e.g., a host and an API key)
+    :param float rate: requests per second
+    :param int burst: maximum number of requests sent at once
+    :param str lock_dir: if provided, the bucket is shared between processes
+        using a lock file stored in this directory
+    :param bool explicit: True if the rate was set by the user (rather than
+        being the default rate of a service)
+
+    If a limiter already exists for the host with a different rate, the most
+    restrictive default rate is kept whereas an explicit rate replaces the
+    rate of the limiter (higher or lower). Once set explicitly, the rate is
+    no longer changed by default rates.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            lock_file = None
+            if lock_dir:
+                lock_file = os.path.join(lock_dir,
+                    "%s.ratelimit" % host.replace(":", "_"))
+            limiter = TokenBucket(rate, burst, lock_file=lock_file)
+            limiter._explicit = explicit
+            _limiters[host] = limiter
+        elif explicit:
+            if rate != limiter.max_rate:
+                limiter._set_max_rate(rate)
+            limiter._explicit = True
+        elif rate < limiter.max_rate and not limiter._explicit:
+            limiter._set_max_rate(rate)
+        return limiter
+
+
+def get_rate_limiter_stats():
+    """Returns the statistics of all rate limiters keyed by host"""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return dict((host, limiter.stats) for host, limiter in limiters.items())
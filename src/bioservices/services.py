@@ -22,10 +22,16 @@ import os
 import sys
 import time
 import socket
+import random
+import asyncio
 import platform
+import functools
+import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 from bioservices.settings import BioServicesConfig
+from bioservices.ratelimit import get_rate_limiter
 
 # fixing compatiblity python 2 and 3 related to merging or urllib and urllib2 in python 3
 try:
@@ -34,6 +40,7 @@ try:
     from urllib.parse import urlparse, urlencode
     from urllib.error import HTTPError
     from urllib.request import Request
+    from email.utils import parsedate_to_datetime
 except:
     from urllib import urlencode
     from urllib2  import urlopen, Request, HTTPError
@@ -51,7 +58,7 @@ from easydev import DevTools
 
 
 __all__ = ["Service", "WSDLService",
-           "BioServicesError", "REST"]
+           "BioServicesError", "REST", "get_session", "close_sessions"]
 
 
 class BioServicesError(Exception):
@@ -62,6 +69,92 @@ class BioServicesError(Exception):
         return repr(self.value)
 
 
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Returns the thread pool shared by the asynchronous methods of all services
+
+    The pool is created on first call with as many workers as the
+    ``general.async_concurrent`` setting.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = BioServicesConfig().CONCURRENT
+            _executor = ThreadPoolExecutor(max_workers=max(1, workers),
+                thread_name_prefix="bioservices")
+    return _executor
+
+
+_async_executor = None
+
+
+def _get_async_executor():
+    # The blocking requests of the coroutines (see REST.http_get_async) run
+    # in their own pool. These threads never wait for other tasks so that
+    # coroutines can be run from threads of get_executor() (e.g. get_async
+    # called within a fan-out) without exhausting that pool.
+    global _async_executor
+    with _executor_lock:
+        if _async_executor is None:
+            workers = BioServicesConfig().CONCURRENT
+            _async_executor = ThreadPoolExecutor(max_workers=max(1, workers),
+                thread_name_prefix="bioservices-async")
+    return _async_executor
+
+
+def run_coroutine(coro):
+    """Runs a coroutine to completion from synchronous code
+
+    If an event loop is already running in this thread (e.g. in a Jupyter
+    notebook), the coroutine is run in its own event loop in a new thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    result = {}
+    def run():
+        try:
+            result["value"] = asyncio.run(coro)
+        except BaseException as err:
+            result["error"] = err
+    thread = threading.Thread(target=run, name="bioservices-loop")
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+_health_cache = {}
+_health_lock = threading.Lock()
+
+
+def check_services_health(services, timeout=None, force=False):
+    """Checks concurrently that the URL of several services can be reached
+
+    :param services: list of :class:`Service` instances
+    :param float timeout: timeout of each probe in seconds
+    :param bool force: ignore the cached status of the hosts
+    :return: a dictionary with the service names as keys and the status
+        (see :meth:`Service.check_health`) as values.
+
+    ::
+
+        from bioservices import KEGG, UniProt, ChEMBL
+        from bioservices.services import check_services_health
+        check_services_health([KEGG(), UniProt(), ChEMBL()])
+
+    """
+    futures = [(service.name, get_executor().submit(service.check_health,
+        timeout=timeout, force=force)) for service in services]
+    return dict((name, future.result()) for name, future in futures)
+
+
 class Service(object):
     """Base class for WSDL and REST classes
 
@@ -91,13 +184,17 @@ class Service(object):
         :param bool verbose: prints informative messages if True (default is
             True)
         :param requests_per_sec: maximum number of requests per seconds
-            are restricted to 3. You can change that value. If you reach the
-            limit, an error is raise. The reason for this limitation is
+            are restricted to 3. If you reach the limit, requests wait
+            for their turn. The reason for this limitation is
             that some services (e.g.., NCBI) may black list you IP.
-            If you need or can do more (e.g., ChEMBL does not seem to have
-            restrictions), change the value. You can also have several instance
-            but again, if you send too many requests at the same, your future
-            requests may be retricted. Currently implemented for REST only
+            The limit is shared by all instances sending requests to the
+            same host (see :attr:`rate_limiter`) and the most restrictive
+            value of the instances is used. If you need or can do more (e.g.,
+            ChEMBL does not seem to have restrictions), set the
+            :attr:`requests_per_sec` attribute of an instance or the
+            ratelimit.rate setting, which replace the rate of the host.
+        :param bool url_defined_later: not used anymore. Constructing a service
+            does not access the network; see :meth:`check_health`.
 
 
         All instances have an attribute called :attr:`~Service.logging` that
@@ -117,17 +214,12 @@ class Service(object):
 
         """
         super(Service, self).__init__()
-        self.requests_per_sec = requests_per_sec
+        self._requests_per_sec = requests_per_sec
         self.name = name
         self.logging = Logging("bioservices:%s" % self.name, verbose)
 
+        # No network access here: see check_health() to probe the URL
         self._url = url
-        try:
-            if self.url is not None:
-                urlopen(self.url)
-        except Exception as err:
-            if url_defined_later is False:
-                self.logging.warning("The URL (%s) provided cannot be reached." % self.url)
         self._easyXMLConversion = True
 
         # used by HGNC where some XML contains non-utf-8 characters !!
@@ -138,24 +230,92 @@ class Service(object):
         self.devtools = DevTools()
         self.settings = BioServicesConfig()
 
-        self._last_call = 0
+        #: name of the rate limiter shared by the services with the same key.
+        #: If None, the host of the URL is used.
+        self.rate_limit_key = None
 
-    def _calls(self):
-        time_lapse = 1. / self.requests_per_sec
-        current_time = time.time()
-        dt = current_time - self._last_call
-        
-        if self._last_call == 0:
-            self._last_call = current_time
-            return
-        else:
-            self._last_call = current_time
-            if dt > time_lapse:
-                return
-            else:
-                time.sleep(time_lapse - dt)
-        
+    def _get_rate_limiter(self, url=None, explicit=False):
+        """Returns the :class:`~bioservices.ratelimit.TokenBucket` of the host of the URL
+
+        The limiter is shared by all services (and threads) sending
+        requests to the same host (or with the same :attr:`rate_limit_key`).
+        The rate is the ``ratelimit.rate`` setting if provided or
+        :attr:`requests_per_sec` otherwise. The setting (or *explicit*)
+        replaces the rate of the limiter; otherwise the most restrictive
+        rate of the services is kept.
+        """
+        url = url or self.url
+        host = urlparse(url).netloc if url else self.name
+        if self.rate_limit_key:
+            host = self.rate_limit_key
+        rate = self.settings.RATE_LIMIT or self.requests_per_sec
+        lock_dir = None
+        if self.settings.RATE_INTERPROCESS:
+            lock_dir = self.settings.user_cache_dir
+        return get_rate_limiter(host, rate, burst=self.settings.RATE_BURST,
+            lock_dir=lock_dir, explicit=bool(self.settings.RATE_LIMIT) or explicit)
+    rate_limiter = property(_get_rate_limiter,
+        doc="rate limiter shared by all services using the host of :attr:`url`")
+
+    def _get_requests_per_sec(self):
+        return self._requests_per_sec
+    def _set_requests_per_sec(self, rate):
+        self._requests_per_sec = rate
+        # an explicit rate replaces the rate of the host (even if higher)
+        self._get_rate_limiter(explicit=True)
+    requests_per_sec = property(_get_requests_per_sec, _set_requests_per_sec,
+        doc="maximum number of requests per second (see :attr:`rate_limiter`)")
+
+    def _calls(self, url=None):
+        # The token bucket is shared by all instances hitting the same host
+        # and is thread-safe. Waiting time is recorded in its stats.
+        self._get_rate_limiter(url).acquire()
+
+    def check_health(self, timeout=None, ttl=None, force=False):
+        """Checks that the URL of the service can be reached
+
+        :param float timeout: timeout of the probe in seconds (default to the
+            general.timeout setting)
+        :param float ttl: the status of a host is cached for ttl seconds
+            (default to the general.health_ttl setting) and shared by all
+            services using this host
+        :param bool force: probe the URL even if the status is in the cache
+        :return: True if the server answered (even with an HTTP error code)
+
+        Constructing a service does not access the network. Use this method
+        (or :func:`check_services_health` for several services at once) to
+        check that the service is available::
+
+            from bioservices import KEGG
+            k = KEGG()
+            k.check_health()
+
+        """
+        if self.url is None:
+            return False
+        timeout = timeout or self.settings.TIMEOUT
+        ttl = self.settings.HEALTH_TTL if ttl is None else ttl
+        host = urlparse(self.url).netloc or self.url
+
+        with _health_lock:
+            cached = _health_cache.get(host)
+        if force is False and cached and time.time() - cached[0] < ttl:
+            return cached[1]
+
+        try:
+            urlopen(self.url, timeout=timeout)
+            status = True
+        except HTTPError:
+            # the server answered
+            status = True
+        except Exception:
+            status = False
+            self.logging.warning("The URL (%s) provided cannot be reached." % self.url)
 
+        with _health_lock:
+            _health_cache[host] = (time.time(), status)
+        return status
+    ping = check_health
 
     def _get_caching(self):
         return self.settings.params['cache.on'][0]
@@ -244,6 +404,23 @@ class Service(object):
             f.write(newres)
 
 
+class _ThrottledService(object):
+    """Wraps a suds service so that each method call goes through the rate limiter"""
+    def __init__(self, service, calls):
+        self._service = service
+        self._calls = calls
+
+    def __getattr__(self, name):
+        attr = getattr(self._service, name)
+        if not callable(attr):
+            return attr
+
+        def method(*args, **kwargs):
+            self._calls()
+            return attr(*args, **kwargs)
+        return method
+
+
 class WSDLService(Service):
     """Class dedicated to the web services based on WSDL/SOAP protocol.
 
@@ -279,8 +456,9 @@ class WSDLService(Service):
                 self.suds = Client(self.url, cache=oc, cachingpolicy=1)
             else:
                 self.suds = Client(self.url)
-            # reference to the service
-            self.serv = self.suds.service
+            # reference to the service. Calls are throttled by the rate
+            # limiter of the host like REST requests
+            self.serv = _ThrottledService(self.suds.service, self._calls)
             self._update_settings()
         except Exception :
             self.logging.error("Could not connect to the service %s " % self.url)
@@ -343,7 +521,18 @@ class RESTbase(Service):
             requests_per_sec=requests_per_sec,
             url_defined_later=url_defined_later)
         self.logging.info("Initialising %s service (REST)" % self.name)
-        self.last_response = None
+        self._local = threading.local()
+
+    def _get_last_response(self):
+        return getattr(self._local, "last_response", None)
+    def _set_last_response(self, response):
+        self._local.last_response = response
+    last_response = property(_get_last_response, _set_last_response,
+        doc="""The last response received by the current thread
+
+    Each thread sees its own last response so that an instance can be
+    shared by several threads (e.g., in a ThreadPoolExecutor) without
+    mixing the status codes or headers of their requests.""")
 
     def http_get(self):
         # should return unicode
@@ -362,11 +551,116 @@ class RESTbase(Service):
 
 import requests         # replacement for urllib2 (2-3 times faster)
 from requests.models import Response
-import requests_cache   # use caching wihh requests
-#import grequests        # use asynchronous requests with gevent
-# Note that grequests should be imported after requests_cache. Otherwise,
-# one should use a session instance when calling grequests.get, which we do
-# here below
+from bioservices.cache import CacheBackend, ResponseCache, get_backend
+
+
+class HTTP2Adapter(requests.adapters.BaseAdapter):
+    """Transport adapter sending the requests of a session with HTTP/2
+
+    :param int max_connections: maximum number of connections per client
+    :param int max_retries: number of retries of failed connections
+
+    Requests to a host are multiplexed over a single connection. This
+    adapter relies on the httpx package (pip install httpx[http2]); an
+    ImportError is raised if it is not installed. Responses are read
+    entirely (even with stream=True) and their cookies are not stored in
+    the session.
+    """
+    def __init__(self, max_connections=None, max_retries=0):
+        super(HTTP2Adapter, self).__init__()
+        import httpx
+        import h2
+        self._httpx = httpx
+        self._limits = httpx.Limits(max_connections=max_connections)
+        self.max_retries = max_retries
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _get_client(self, verify, cert, proxy):
+        # TLS and proxy options are set per client in httpx
+        if isinstance(cert, list):
+            cert = tuple(cert)
+        key = (verify, cert, proxy)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                httpx = self._httpx
+                transport = httpx.HTTPTransport(http2=True, verify=verify,
+                    cert=cert, limits=self._limits, retries=self.max_retries,
+                    proxy=proxy)
+                client = httpx.Client(transport=transport)
+                self._clients[key] = client
+            return client
+
+    def send(self, request, stream=False, timeout=None, verify=True,
+             cert=None, proxies=None):
+        httpx = self._httpx
+        proxy = (proxies or {}).get("https") if isinstance(proxies, dict) else None
+        client = self._get_client(verify, cert, proxy)
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        try:
+            res = client.request(request.method, request.url,
+                headers=dict(request.headers), content=request.body,
+                timeout=timeout)
+        except httpx.TimeoutException as err:
+            raise requests.exceptions.Timeout(err, request=request)
+        except httpx.TransportError as err:
+            raise requests.exceptions.ConnectionError(err, request=request)
+
+        response = Response()
+        response.status_code = res.status_code
+        response.headers = requests.structures.CaseInsensitiveDict(
+            res.headers.items())
+        response.encoding = requests.utils.get_encoding_from_headers(
+            response.headers)
+        response.reason = res.reason_phrase
+        response.url = request.url
+        response.elapsed = res.elapsed
+        response._content = res.content
+        response._content_consumed = True
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(key, factory):
+    """Returns the session registered with this key
+
+    :param key: any hashable object identifying the session (see
+        :meth:`REST._get_session_key`)
+    :param factory: function called without arguments to create the session
+        if none is registered with this key
+
+    Sessions are shared by all services sending requests to the same host
+    with the same connection settings, so that they reuse the same pool of
+    keep-alive connections.
+    """
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = factory()
+            _sessions[key] = session
+        return session
+
+
+def close_sessions():
+    """Closes and forgets all the sessions returned by :func:`get_session`"""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
 
 
 class REST(RESTbase):
@@ -428,6 +722,18 @@ class REST(RESTbase):
     types: application/x-www-form-urlencoded (default, older, simpler) or 
     multipart/form-data (newer, adds support for file uploads)
 
+    Thread safety: an instance can be shared by several threads. The session
+    and its connection pools (:func:`get_session`), the rate limiter, the
+    cache and the :attr:`metrics` are safe for concurrent use, and
+    :attr:`last_response` is stored per thread::
+
+        from concurrent.futures import ThreadPoolExecutor
+        k = KEGG()
+        with ThreadPoolExecutor(8) as pool:
+            entries = list(pool.map(k.get, ["hsa:7535", "hsa:1525"]))
+
+    Note that configuration changes (e.g., :attr:`CACHING` or
+    :attr:`TIMEOUT`) apply to all threads.
     """
     content_types = {
         'bed': 'text/x-bed',
@@ -452,6 +758,15 @@ class REST(RESTbase):
     }
     #special_characters = ['/', '#', '+']
 
+    #: maximum number of simultaneous connections to the host of this
+    #: service (overrides the http.max_connections_per_host option)
+    max_connections = None
+
+    #: list of (pattern, ttl) tuples. The first regular expression found
+    #: in a URL sets the time-to-live (in seconds) of its cached response.
+    #: None means no expiry and 0 disables the caching.
+    cache_policies = []
+
     def __init__(self, name, url=None, verbose=True, cache=False,
         requests_per_sec=3, proxies=[], cert=None, url_defined_later=False):
         super(REST, self).__init__(name, url, verbose=verbose,
@@ -461,31 +776,77 @@ class REST(RESTbase):
         self.cert = cert
 
         bspath = self.settings.user_config_dir
-        self.CACHE_NAME = bspath + os.sep + self.name + "_bioservices_db"
+        # not the name used by requests_cache before 1.8 (different layout)
+        self.CACHE_NAME = bspath + os.sep + self.name + "_bioservices_cache"
 
         self._session = None
-
+        self._cache = None
+        self._cache_lock = threading.Lock()
+        self._mapping_store = None
+
+        self._metrics_lock = threading.Lock()
+        self.reset_metrics()
+
+        # cache can be a boolean or a CacheBackend instance
+        if isinstance(cache, CacheBackend):
+            self._cache = ResponseCache(cache,
+                expire_after=self.settings.CACHE_EXPIRE_AFTER,
+                policies=self.cache_policies)
+            cache = True
         self.settings.params['cache.on'][0] = cache
 
         if self.CACHING:
-            #import requests_cache
             self.logging.info("Using local cache %s" % self.CACHE_NAME)
-            requests_cache.install_cache(self.CACHE_NAME)
+
+    def _get_cache(self):
+        # the lock prevents threads from opening several backends
+        with self._cache_lock:
+            if self._cache is None:
+                max_size = self.settings.CACHE_MAX_SIZE
+                backend = get_backend(self.settings.CACHE_BACKEND,
+                    self.CACHE_NAME,
+                    max_size=int(max_size * 1024 ** 2) if max_size else None)
+                self._cache = ResponseCache(backend,
+                    expire_after=self.settings.CACHE_EXPIRE_AFTER,
+                    policies=self.cache_policies)
+        return self._cache
+    cache = property(_get_cache, doc="""The :class:`~bioservices.cache.ResponseCache` of this service
+
+    Used when :attr:`CACHING` is True. The backend is set by the
+    cache.backend option of the configuration file (memory, sqlite or
+    file) unless a backend instance is provided in the constructor. The
+    time-to-live of the responses are defined by :attr:`cache_policies`
+    (and the cache.expire_after option). See :attr:`cache.stats` for the
+    number of hits and misses.""")
+
+    def _get_mapping_store(self):
+        if self._mapping_store is not None:
+            return self._mapping_store
+        if self.settings.IDMAPPING:
+            from bioservices.idmapping import get_mapping_store
+            return get_mapping_store(self.settings.IDMAPPING_FILENAME,
+                expire_after=self.settings.IDMAPPING_EXPIRE_AFTER)
+        return None
+    def _set_mapping_store(self, store):
+        self._mapping_store = store
+    mapping_store = property(_get_mapping_store, _set_mapping_store,
+        doc="""The :class:`~bioservices.idmapping.IDMappingStore` of this service
+
+    Identifier conversions (e.g. :meth:`UniProt.mapping`) look up this store
+    before sending requests. It is None unless the idmapping.on option is set
+    (the store is then shared by all services) or a store is given.""")
 
     def delete_cache(self):
-        cache_file = self.CACHE_NAME + '.sqlite'
-        if os.path.exists(cache_file):
-            msg = "You are about to delete this bioservices cache: %s. Proceed? (y/[n]) "
-            res = input(msg % cache_file)
-            if res == "y":
-                os.remove(cache_file)
-                self.logging.info("Removed cache")
-            else:
-                self.logging.info("Reply 'y' to delete the file")
+        msg = "You are about to delete this bioservices cache: %s. Proceed? (y/[n]) "
+        res = input(msg % self.CACHE_NAME)
+        if res == "y":
+            self.cache.clear()
+            self.logging.info("Removed cache")
+        else:
+            self.logging.info("Reply 'y' to delete the cache")
 
     def clear_cache(self):
-        from requests_cache import clear
-        clear()
+        self.cache.clear()
 
     def _build_url(self, query):
         url = None
@@ -503,35 +864,62 @@ class REST(RESTbase):
 
     def _get_session(self):
         if self._session is None:
-            if self.CACHING is True:
-                self._session = self._create_cache_session()
-            else:
-                self._session = self._create_session()
+            self._session = get_session(self._get_session_key(),
+                self._create_session)
         return self._session
-    session = property(_get_session)
+    session = property(_get_session, doc="""The requests session of this service
+
+    The session is shared with all services using the same host and the
+    same http.* settings (see :func:`get_session`).""")
+
+    def _get_max_connections(self):
+        # class attribute first, then the configuration
+        return self.max_connections or self.settings.MAX_CONNECTIONS_PER_HOST
+
+    def _get_session_key(self):
+        host = urlparse(self.url).netloc if self.url else self.name
+        settings = self.settings
+        return (host, self._get_max_connections(), settings.POOL_CONNECTIONS,
+            settings.POOL_MAXSIZE, settings.POOL_BLOCK, settings.HTTP2,
+            settings.MAX_RETRIES)
 
     def _create_session(self):
         """Creates a normal session using HTTPAdapter
 
-        max retries is defined in the :attr:`MAX_RETRIES`
-        """
-        self.logging.debug("Creating session (uncached version)")
-        self._session = requests.Session()
-        adapter = requests.adapters.HTTPAdapter(max_retries=self.settings.MAX_RETRIES)
-        #, pool_block=True does not work with asynchronous requests
-        self._session.mount('http://', adapter)
-        self._session.mount('https://', adapter)
-        return self._session
+        max retries is defined in the :attr:`MAX_RETRIES`. Responses with a
+        Retry-After header are not retried here but in :meth:`_request` so
+        that the rate limiter is informed.
 
-    def _create_cache_session(self):
-        """Creates a cached session using requests_cache package"""
-        self.logging.debug("Creating session (cache version)")
-        if not self._session:
-            #import requests_cache
-            self.logging.debug("No cached session created yet. Creating one")
-            self._session = requests_cache.CachedSession(self.CACHE_NAME,
-                         backend='sqlite', fast_save=self.settings.FAST_SAVE)
-        return self._session
+        The size of the connection pools is set by the http.pool_connections
+        and http.pool_maxsize options. If a maximum number of connections is
+        set (:attr:`max_connections` or http.max_connections_per_host), the
+        requests wait for a free connection. With the http.http2 option,
+        https requests use :class:`HTTP2Adapter` if httpx is installed.
+        """
+        from urllib3.util.retry import Retry
+        self.logging.debug("Creating session")
+        settings = self.settings
+        session = requests.Session()
+        retries = Retry(total=settings.MAX_RETRIES, redirect=None,
+            respect_retry_after_header=False)
+
+        maxsize, block = settings.POOL_MAXSIZE, settings.POOL_BLOCK
+        max_connections = self._get_max_connections()
+        if max_connections:
+            maxsize, block = max_connections, True
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=settings.POOL_CONNECTIONS, pool_maxsize=maxsize,
+            pool_block=block, max_retries=retries)
+        session.mount('http://', adapter)
+
+        if settings.HTTP2:
+            try:
+                adapter = HTTP2Adapter(max_connections=max_connections,
+                    max_retries=settings.MAX_RETRIES)
+            except ImportError:
+                self.logging.warning("HTTP/2 requires httpx[http2]. Using HTTP/1.1")
+        session.mount('https://', adapter)
+        return session
 
     def _get_timeout(self):
         return self.settings.TIMEOUT
@@ -568,35 +956,167 @@ class REST(RESTbase):
     def _apply(self, iterable, fn, *args, **kwargs):
         return [fn(x, *args, **kwargs) for x in iterable if x is not None]
 
-    def _get_async(self, keys, frmt='json', params={}):
-        # does not work under pyhon3 so local import
-        import grequests
-        session = self._get_session()
-        try:
-            # build the requests
-            urls = self._get_all_urls(keys, frmt)
-            self.logging.debug("grequests.get processing")
-            rs = (grequests.get(url, session=session, params=params)  for key,url in zip(keys, urls))
-            # execute them
-            self.logging.debug("grequests.map call")
-            ret = grequests.map(rs, size=min(self.settings.CONCURRENT, len(keys)))
-            self.last_response = ret
-            self.logging.debug("grequests.map call done")
-            return ret
-        except Exception as err:
-            self.logging.warning("Error caught in async. " + err.message)
-            return []
-
     def _get_all_urls(self, keys, frmt=None):
         return ('%s/%s' % (self.url, query) for query in keys)
 
     def get_async(self, keys, frmt='json', params={}, **kargs):
-        ret = self._get_async(keys, frmt, params=params, **kargs)
-        return self._apply(ret, self._interpret_returned_request, frmt)
+        """Fetch several queries concurrently and returns results in input order
+
+        This is a synchronous wrapper around :meth:`async_get_many`. Failed
+        queries are reported in the output list as the exception that was
+        raised (see :meth:`async_get_many`).
+        """
+        return run_coroutine(self.async_get_many(keys, frmt=frmt,
+            params=params, **kargs))
 
     def get_sync(self, keys, frmt='json', **kargs):
         return [self.get_one(key, frmt=frmt, **kargs) for key in keys]
 
+    async def http_get_async(self, query, frmt='json', params={}, **kargs):
+        """Coroutine version of :meth:`http_get` for a single query
+
+        The request is sent with the :attr:`session` of this instance (hence
+        one keep-alive pool per host) from a thread of a shared pool, so that
+        :attr:`TIMEOUT`, :attr:`proxies`, :attr:`cert`, the MAX_RETRIES setting
+        and the requests_per_sec throttling are the same as in the synchronous
+        methods. Unlike :meth:`http_get`, network errors are raised.
+
+        ::
+
+            import asyncio
+            from bioservices import KEGG
+            k = KEGG()
+            res = asyncio.run(k.http_get_async("info/kegg", frmt="txt"))
+
+        """
+        loop = asyncio.get_running_loop()
+        func = functools.partial(self._http_get_one, query, frmt=frmt,
+            params=params, **kargs)
+        return await loop.run_in_executor(_get_async_executor(), func)
+
+    async def async_get_many(self, keys, frmt='json', params={}, **kargs):
+        """Coroutine that fetches several queries concurrently
+
+        :param list keys: list of queries (see :meth:`http_get`)
+        :param str frmt: expected format of the responses
+        :param dict params: parameters used for each query, or a list of
+            dictionaries (one per query)
+        :return: list of results in the same order as the input keys. If a
+            query fails, its result is the exception that was raised, so that
+            errors can be inspected per key rather than silently dropped.
+
+        The number of requests in flight is bounded by the
+        ``general.async_concurrent`` setting (:attr:`settings.CONCURRENT`)
+        and by the requests_per_sec throttling of this instance.
+
+        ::
+
+            import asyncio
+            from bioservices import KEGG
+            k = KEGG()
+            keys = ["get/hsa:%s" % x for x in (7535, 1525, 10458)]
+            results = asyncio.run(k.async_get_many(keys, frmt="txt"))
+
+        """
+        semaphore = asyncio.Semaphore(max(1, self.settings.CONCURRENT))
+        if isinstance(params, dict):
+            params = [params] * len(keys)
+
+        async def fetch(key, params):
+            async with semaphore:
+                return await self.http_get_async(key, frmt=frmt,
+                    params=params, **kargs)
+
+        results = await asyncio.gather(*[fetch(key, this)
+            for key, this in zip(keys, params)], return_exceptions=True)
+        for key, result in zip(keys, results):
+            if isinstance(result, Exception):
+                self.logging.warning("Query {} failed: {}".format(key, result))
+        return list(results)
+
+    def _request(self, method, url, **kargs):
+        # Sends a request once allowed by the rate limiter. Responses 429 (Too
+        # Many Requests), and 503 with a Retry-After header, are sent again
+        # after the delay requested by the server (or an exponential backoff)
+        # during which all requests to the host are paused.
+        limiter = self._get_rate_limiter(url)
+        max_retries = self.settings.RATE_MAX_RETRIES
+        for attempt in range(max_retries + 1):
+            limiter.acquire()
+            t0 = time.time()
+            try:
+                res = self.session.request(method, url, **kargs)
+            except Exception:
+                self._update_metrics(time.time() - t0, error=True)
+                raise
+            throttled = res.status_code == 429 or (res.status_code == 503 and
+                "Retry-After" in res.headers)
+            if not throttled:
+                self._update_metrics(time.time() - t0, error=not res.ok)
+                limiter.recover()
+                return res
+
+            delay = self._get_retry_delay(res, attempt)
+            if attempt == max_retries:
+                self._update_metrics(time.time() - t0, throttled=True)
+                break
+            self._update_metrics(time.time() - t0, throttled=True, backoff=delay)
+            self.logging.warning("{} returned {}. Retrying in {:.1f}s".format(
+                url, res.status_code, delay))
+            limiter.backoff(delay)
+        return res
+
+    def _get_retry_delay(self, response, attempt):
+        # delay requested by the server (seconds or HTTP date) otherwise
+        # exponential backoff. Jitter avoids all threads retrying at once.
+        value = response.headers.get("Retry-After")
+        delay = None
+        if value:
+            try:
+                delay = float(value)
+            except ValueError:
+                try:
+                    delay = parsedate_to_datetime(value).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    pass
+        if delay is None:
+            delay = 2 ** attempt
+        delay = min(self.settings.RATE_MAX_BACKOFF, max(0, delay))
+        return delay * random.uniform(1, 1.25)
+
+    def _update_metrics(self, elapsed, error=False, throttled=False, backoff=0):
+        with self._metrics_lock:
+            metrics = self._metrics
+            if metrics['start'] is None:
+                metrics['start'] = time.time() - elapsed
+            metrics['requests'] += 1
+            metrics['errors'] += int(error)
+            metrics['throttled'] += int(throttled)
+            metrics['backoff_time'] += backoff
+            metrics['response_time'] += elapsed
+
+    def reset_metrics(self):
+        """Resets the counters returned by :attr:`metrics`"""
+        with self._metrics_lock:
+            self._metrics = {"start": None, "requests": 0, "errors": 0,
+                "throttled": 0, "backoff_time": 0., "response_time": 0.}
+
+    def _get_metrics(self):
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        start = metrics.pop("start")
+        elapsed = time.time() - start if start else 0
+        metrics['elapsed'] = elapsed
+        metrics['throughput'] = metrics['requests'] / elapsed if elapsed else 0
+        metrics['ratelimit'] = self.rate_limiter.stats
+        return metrics
+    metrics = property(_get_metrics, doc="""Statistics of the requests sent by this instance
+
+        Number of requests, errors, responses 429 (throttled), time spent
+        in backoff and waiting for responses, throughput (requests per
+        second since the first request) and the statistics of the shared
+        rate limiter (see :attr:`rate_limiter`).""")
+
     def http_get(self, query, frmt='json', params={}, **kargs):
         """
 
@@ -618,7 +1138,10 @@ class REST(RESTbase):
         self.logging.debug("Running http_get (single call mode)")
         #return self.get_one(**{'frmt': frmt, 'query': query, 'params':params})
 
+        kargs = self._get_headers_kargs(frmt, kargs)
+        return self.get_one(query, frmt=frmt, params=params,  **kargs)
 
+    def _get_headers_kargs(self, frmt, kargs):
         # if user provide a content, let us use it, otherwise, it will be the
         # same as the frmt provided
         content = kargs.get("content", self.content_types[frmt])
@@ -634,46 +1157,60 @@ class REST(RESTbase):
             else:
                 headers['Accept'] = content
         kargs.update({"headers": headers})
+        return kargs
 
-        return self.get_one(query, frmt=frmt, params=params,  **kargs)
+    def _http_get_one(self, query, frmt='json', params={}, **kargs):
+        # single query of http_get that raises network errors
+        kargs = self._get_headers_kargs(frmt, dict(kargs))
+        return self._get_one(query, frmt=frmt, params=params, **kargs)
 
     def get_one(self, query=None, frmt='json', params={}, **kargs):
         """
 
         if query starts with http:// do not use self.url
         """
-        self._calls()
+        try:
+            return self._get_one(query, frmt=frmt, params=params, **kargs)
+        except Exception as err:
+            self.logging.critical(err)
+            self.logging.critical("""Query unsuccesful. Maybe too slow response.
+    Consider increasing it with settings.TIMEOUT attribute {}""".format(self.settings.TIMEOUT))
+
+    def _get_one(self, query=None, frmt='json', params={}, **kargs):
         url = self._build_url(query)
 
         if url.count('//') >1:
             self.logging.warning("URL of the services contains a double //." +
                 "Check your URL and remove trailing /")
         self.logging.debug(url)
-        try:
-            kargs['params'] = params
-            kargs['timeout'] = self.TIMEOUT
-            kargs['proxies'] = self.proxies
-            kargs['cert'] = self.cert
-            # Used only in biomart with cosmic database
-            # See doc/source/biomart.rst for an example
-            if hasattr(self, 'authentication'):
-                kargs['auth'] = self.authentication
-
-            #res = self.session.get(url, **{'timeout':self.TIMEOUT, 'params':params})
-            res = self.session.get(url, **kargs)
 
-            self.last_response = res
-            res = self._interpret_returned_request(res, frmt)
-            try:
-                # for python 3 compatibility
-                res = res.decode()
-            except:
-                pass
-            return res
-        except Exception as err:
-            self.logging.critical(err)
-            self.logging.critical("""Query unsuccesful. Maybe too slow response.
-    Consider increasing it with settings.TIMEOUT attribute {}""".format(self.settings.TIMEOUT))
+        kargs.pop("content", None)
+        kargs['params'] = params
+        # a timeout can be given per query
+        kargs['timeout'] = kargs.get('timeout') or self.TIMEOUT
+        kargs['proxies'] = self.proxies
+        kargs['cert'] = self.cert
+        # Used only in biomart with cosmic database
+        # See doc/source/biomart.rst for an example
+        if hasattr(self, 'authentication'):
+            kargs['auth'] = self.authentication
+
+        res = None
+        if self.CACHING:
+            res = self.cache.get_response(url, params, kargs.get("headers"))
+        if res is None:
+            res = self._request("get", url, **kargs)
+            if self.CACHING:
+                self.cache.save_response(res, params, kargs.get("headers"), url=url)
+
+        self.last_response = res
+        res = self._interpret_returned_request(res, frmt)
+        try:
+            # for python 3 compatibility
+            res = res.decode()
+        except:
+            pass
+        return res
 
     def http_post(self, query, params=None, data=None,
                     frmt='xml', headers=None, files=None, content=None, **kargs):
@@ -706,7 +1243,6 @@ class REST(RESTbase):
         return self.post_one(**kargs)
 
     def post_one(self, query=None, frmt='json', **kargs):
-        self._calls()
         self.logging.debug("BioServices:: Entering post_one function")
         if query is None:
             url = self.url
@@ -714,7 +1250,7 @@ class REST(RESTbase):
             url = '%s/%s' % (self.url, query)
         self.logging.debug(url)
         try:
-            res = self.session.post(url, **kargs)
+            res = self._request("post", url, **kargs)
             self.last_response = res
             res = self._interpret_returned_request(res, frmt)
             try:
@@ -770,7 +1306,6 @@ class REST(RESTbase):
         return self.delete_one(**kargs)
 
     def delete_one(self, query, frmt='json', **kargs):
-        self._calls()
         self.logging.debug("BioServices:: Entering delete_one function")
         if query is None:
             url = self.url
@@ -778,7 +1313,7 @@ class REST(RESTbase):
             url = '%s/%s' % (self.url, query)
         self.logging.debug(url)
         try:
-            res = self.session.delete(url, **kargs)
+            res = self._request("delete", url, **kargs)
             self.last_response = res
             res = self._interpret_returned_request(res, frmt)
             try:
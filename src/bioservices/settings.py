@@ -24,10 +24,28 @@ defaultParams = {
     'general.timeout': [30, (int,float), ""],
     'general.max_retries': [3, int, ''],
     'general.async_concurrent': [50, int, ''],
+    'general.health_ttl': [300, (int, float), 'number of seconds a host status (see Service.check_health) is cached'],
     'general.async_threshold': [10, int, 'when to switch to asynchronous requests'],
+    'http.pool_connections': [10, int, 'number of hosts whose connections are kept alive by each session'],
+    'http.pool_maxsize': [None, (int, type(None)), 'number of connections kept alive per host (default is general.async_concurrent)'],
+    'http.pool_block': [False, bool, 'wait for a free connection instead of opening (and discarding) extra connections when the pool is full'],
+    'http.max_connections_per_host': [None, (int, type(None)), 'maximum number of simultaneous connections to a host (requests wait for a free connection)'],
+    'http.http2': [False, bool, 'use HTTP/2 (one multiplexed connection per host) for https requests. Requires httpx[http2]'],
     'cache.tag_suffix': ["_bioservices_database",str, 'suffix to append for cache databases'],
     'cache.on': [False, bool, 'CACHING on/off'],
-    'cache.fast': [True, bool, "FAST_SAVE option"],
+    'cache.fast': [True, bool, "not used anymore (kept for compatibility)"],
+    'cache.backend': ["sqlite", str, 'cache backend: memory, sqlite or file'],
+    'cache.max_size': [500, (int, float), 'maximum size of each service cache in Mb'],
+    'cache.expire_after': [None, (int, float, type(None)), 'default time-to-live of cached responses in seconds (None for no expiry)'],
+    'idmapping.on': [False, bool, 'look up identifier conversions (e.g. UniProt.mapping, KEGG.conv) in a local store before sending requests'],
+    'idmapping.filename': [None, (str, type(None)), 'filename of the identifier mapping store (default is idmapping.sqlite in the cache directory)'],
+    'idmapping.expire_after': [2592000, (int, float, type(None)), 'time-to-live of the stored identifier mappings in seconds (None for no expiry)'],
+    'ratelimit.rate': [None, (int, float, type(None)), 'requests per second shared by all services using the same host (default is the value of each service)'],
+    'ratelimit.burst': [1, int, 'number of requests that can be sent at once to a host'],
+    'ratelimit.interprocess': [False, bool, 'share the rate limits between processes using lock files in the cache directory'],
+    'ratelimit.max_retries': [5, int, 'number of retries of a request answered with 429 (Too Many Requests) or 503 with a Retry-After header'],
+    'ratelimit.max_backoff': [60, (int, float), 'maximum number of seconds to wait before retrying a request answered with 429'],
+    'eutils.api_key': [None, (str, type(None)), 'NCBI API key (10 requests per second instead of 3) see https://www.ncbi.nlm.nih.gov/account/settings/'],
     'chemspider.token': [None, (str, type(None)), 'token see http://www.chemspider.com'],
 }
 
@@ -262,6 +280,46 @@ class BioServicesConfig(ConfigReadOnly):
         return self.params['cache.fast'][0]
     FAST_SAVE = property(_get_fast_save)
 
+    def _get_cache_backend(self):
+        return self.params['cache.backend'][0]
+    def _set_cache_backend(self, value):
+        self.params['cache.backend'][0] = value
+    CACHE_BACKEND = property(_get_cache_backend, _set_cache_backend)
+
+    def _get_cache_max_size(self):
+        return self.params['cache.max_size'][0]
+    def _set_cache_max_size(self, value):
+        self.params['cache.max_size'][0] = value
+    CACHE_MAX_SIZE = property(_get_cache_max_size, _set_cache_max_size)
+
+    def _get_cache_expire_after(self):
+        return self.params['cache.expire_after'][0]
+    def _set_cache_expire_after(self, value):
+        self.params['cache.expire_after'][0] = value
+    CACHE_EXPIRE_AFTER = property(_get_cache_expire_after, _set_cache_expire_after)
+
+    def _get_idmapping(self):
+        return self.params['idmapping.on'][0]
+    def _set_idmapping(self, value):
+        self.params['idmapping.on'][0] = value
+    IDMAPPING = property(_get_idmapping, _set_idmapping)
+
+    def _get_idmapping_filename(self):
+        filename = self.params['idmapping.filename'][0]
+        if filename is None:
+            filename = os.sep.join([self.user_cache_dir, "idmapping.sqlite"])
+        return filename
+    def _set_idmapping_filename(self, value):
+        self.params['idmapping.filename'][0] = value
+    IDMAPPING_FILENAME = property(_get_idmapping_filename, _set_idmapping_filename)
+
+    def _get_idmapping_expire_after(self):
+        return self.params['idmapping.expire_after'][0]
+    def _set_idmapping_expire_after(self, value):
+        self.params['idmapping.expire_after'][0] = value
+    IDMAPPING_EXPIRE_AFTER = property(_get_idmapping_expire_after,
+        _set_idmapping_expire_after)
+
     def _get_async_concurrent(self):
         return self.params['general.async_concurrent'][0]
     CONCURRENT = property(_get_async_concurrent)
@@ -270,6 +328,12 @@ class BioServicesConfig(ConfigReadOnly):
         return self.params['general.async_threshold'][0]
     ASYNC_THRESHOLD = property(_get_async_threshold)
 
+    def _get_health_ttl(self):
+        return self.params['general.health_ttl'][0]
+    def _set_health_ttl(self, ttl):
+        self.params['general.health_ttl'][0] = ttl
+    HEALTH_TTL = property(_get_health_ttl, _set_health_ttl)
+
     def _get_timeout(self):
         return self.params['general.timeout'][0]
     def _set_timeout(self, timeout):
@@ -281,3 +345,65 @@ class BioServicesConfig(ConfigReadOnly):
     def _set_max_retries(self, max_retries):
         self.params['general.max_retries'][0] = max_retries
     MAX_RETRIES = property(_get_max_retries, _set_max_retries)
+
+    def _get_pool_connections(self):
+        return self.params['http.pool_connections'][0]
+    def _set_pool_connections(self, value):
+        self.params['http.pool_connections'][0] = value
+    POOL_CONNECTIONS = property(_get_pool_connections, _set_pool_connections)
+
+    def _get_pool_maxsize(self):
+        # enough connections for all concurrent requests by default
+        return self.params['http.pool_maxsize'][0] or max(1, self.CONCURRENT)
+    def _set_pool_maxsize(self, value):
+        self.params['http.pool_maxsize'][0] = value
+    POOL_MAXSIZE = property(_get_pool_maxsize, _set_pool_maxsize)
+
+    def _get_pool_block(self):
+        return self.params['http.pool_block'][0]
+    def _set_pool_block(self, value):
+        self.params['http.pool_block'][0] = value
+    POOL_BLOCK = property(_get_pool_block, _set_pool_block)
+
+    def _get_max_connections_per_host(self):
+        return self.params['http.max_connections_per_host'][0]
+    def _set_max_connections_per_host(self, value):
+        self.params['http.max_connections_per_host'][0] = value
+    MAX_CONNECTIONS_PER_HOST = property(_get_max_connections_per_host,
+        _set_max_connections_per_host)
+
+    def _get_http2(self):
+        return self.params['http.http2'][0]
+    def _set_http2(self, value):
+        self.params['http.http2'][0] = value
+    HTTP2 = property(_get_http2, _set_http2)
+
+    def _get_rate_limit(self):
+        return self.params['ratelimit.rate'][0]
+    def _set_rate_limit(self, rate):
+        self.params['ratelimit.rate'][0] = rate
+    RATE_LIMIT = property(_get_rate_limit, _set_rate_limit)
+
+    def _get_rate_burst(self):
+        return self.params['ratelimit.burst'][0]
+    def _set_rate_burst(self, burst):
+        self.params['ratelimit.burst'][0] = burst
+    RATE_BURST = property(_get_rate_burst, _set_rate_burst)
+
+    def _get_rate_interprocess(self):
+        return self.params['ratelimit.interprocess'][0]
+    def _set_rate_interprocess(self, value):
+        self.params['ratelimit.interprocess'][0] = value
+    RATE_INTERPROCESS = property(_get_rate_interprocess, _set_rate_interprocess)
+
+    def _get_rate_max_retries(self):
+        return self.params['ratelimit.max_retries'][0]
+    def _set_rate_max_retries(self, value):
+        self.params['ratelimit.max_retries'][0] = value
+    RATE_MAX_RETRIES = property(_get_rate_max_retries, _set_rate_max_retries)
+
+    def _get_rate_max_backoff(self):
+        return self.params['ratelimit.max_backoff'][0]
+    def _set_rate_max_backoff(self, value):
+        self.params['ratelimit.max_backoff'][0] = value
+    RATE_MAX_BACKOFF = property(_get_rate_max_backoff, _set_rate_max_backoff)
@@ -218,6 +218,14 @@ class UniChem(REST):
         self.devtools.check_param_in_list(source, list(self.source_ids.keys()))
         self.devtools.check_param_in_list(target, list(self.source_ids.keys()))
 
+        # the whole mapping is kept in the mapping store (if any)
+        store = self.mapping_store
+        if store is not None:
+            mapping = store.get_dump("UniChem:%s" % source, "UniChem:%s" % target)
+            if mapping is not None:
+                return dict((key, values[0]) for key, values in mapping.items()
+                    if values)
+
         query = "mapping/%s/%s/" % (self.source_ids[source], self.source_ids[target])
         res = self.http_get(query, frmt="txt")
         # evaluation the string as a list
@@ -225,6 +233,9 @@ class UniChem(REST):
         # convert to a convenient dictionary
         mapping = [(x[str(self.source_ids[source])], x[str(self.source_ids[target])]) for x in res]
         mapping = dict(mapping)
+        if store is not None:
+            store.import_dump("UniChem:%s" % source, "UniChem:%s" % target,
+                mapping.items())
         return mapping
 
     def get_src_compound_ids_from_inchikey(self, inchikey):
@@ -46,8 +46,9 @@ from __future__ import print_function
 import types
 import io
 import sys
+import gzip
 
-from bioservices.services import REST
+from bioservices.services import REST, BioServicesError
 from bioservices import logger
 logger.name = __name__
 
@@ -282,6 +283,11 @@ class UniProt(REST):
 
         self._database = "uniprot"
 
+        # identifiers not found by the last call to mapping
+        self.unmapped = []
+        # identifiers that could not be sent by the last call to mapping
+        self.failed = []
+
     def _download_flat_files(self):
         """could be used to get all data in flat files (about compressed 500Mb )"""
         url = "ftp://ftp.ebi.ac.uk/pub/databases/uniprot/knowledgebase/uniprot_sprot.dat.gz"
@@ -289,20 +295,22 @@ class UniProt(REST):
         import urllib
         urllib.urlretrieve(url, 'uniprot_sprot.dat.gz')
 
-    def mapping(self, fr="ID", to="KEGG_ID", query="P13368"):
+    def mapping(self, fr="ID", to="KEGG_ID", query="P13368", chunk_size=5000):
         """This is an interface to the UniProt mapping service
 
         :param fr: the source database identifier. See :attr:`_mapping`.
         :param to: the targetted database identifier. See :attr:`_mapping`.
         :param query: a string containing one or more IDs separated by a space
-            It can also be a list of strings.
+            It can also be a list of strings or any iterable.
+        :param int chunk_size: number of IDs sent per request (see
+            :meth:`iter_mapping`).
         :param format: The output being a dictionary, this parameter is
             deprecated and not used anymore
-        :return: a list. The first element is the source database Id. The second
-            is the targetted source identifier. Following elements are alternate
-            of one the entry and its mapped Id. If a query has several mapped
-            Ids, the query is repeated (see example with PDB mapping here below)
-            e.g., ["From:ID", "to:PDB_ID", "P43403"]
+        :return: a dictionary. Keys are the identifiers of the query and values
+            are lists with the mapped identifiers. Identifiers that could not
+            be mapped are stored in the :attr:`unmapped` attribute. Identifiers
+            of requests that failed are stored in the :attr:`failed`
+            attribute (their mapping is unknown).
 
         ::
 
@@ -327,37 +335,102 @@ class UniProt(REST):
             instead of just a string
         .. versionchanged:: 1.3.1:: use http_post instead of http_get. This is 3 times
             faster and allows queries with more than 600 entries in one go.
+        .. versionchanged:: 1.8.0 large queries are split into chunks sent
+            concurrently. Unmapped identifiers are stored in :attr:`unmapped`.
         """
-        url = 'mapping/'  # the slash matters
+        # bug fix based on ticket #19 version 1.1.2
+        # the default dict set empty list for all keys by default
+        from collections import defaultdict
+        result_dict = defaultdict(list)
+
+        self.unmapped = []
+        self.failed = []
+        for key, values in self.iter_mapping(fr, to, query, chunk_size):
+            if values is None:
+                self.failed.append(key)
+            elif values:
+                result_dict[key].extend(values)
+            else:
+                self.unmapped.append(key)
+        if self.unmapped:
+            self.logging.warning("{} identifiers could not be mapped (see "
+                "unmapped attribute)".format(len(self.unmapped)))
+        if self.failed:
+            self.logging.warning("{} identifiers were not mapped because the "
+                "request failed (see failed attribute)".format(len(self.failed)))
+        return result_dict
 
-        query = self.devtools.list2string(query, sep=" ", space=False)
-        # if isinstance(query, list):
-        #    query = " ".join(query)
-        params = {'from': fr, 'to': to, 'format': "tab", 'query': query}
-        result = self.http_post(url, frmt="txt", data=params)
+    def iter_mapping(self, fr="ID", to="KEGG_ID", query="P13368", chunk_size=5000):
+        """Generator version of :meth:`mapping`
 
-        # changes in version 1.1.1 returns a dictionary instead of list
-        try:
-            result = result.split()
-            del result[0]
-            del result[0]
-        except:
-            self.logging.warning("Results seems empty...returning empty dictionary.")
-            return {}
+        :return: tuples made of an identifier of the query and the list of
+            mapped identifiers (empty if the identifier could not be mapped,
+            None if the request failed), in the order of the query.
 
-        if len(result) == 0:
-            return {}
-        else:
-            # bug fix based on ticket #19 version 1.1.2
-            # the default dict set empty list for all keys by default
-            from collections import defaultdict
-            result_dict = defaultdict(list)
-
-            keys = result[0::2]
-            values = result[1::2]
-            for i, key in enumerate(keys):
-                result_dict[key].append(values[i])
-        return result_dict
+        The query is sent in chunks of *chunk_size* identifiers, several chunks
+        (general.async_concurrent) being sent concurrently. The query is
+        consumed chunk by chunk so it can be a large iterable (e.g. a file)::
+
+            with open("ids.txt") as fin:
+                for key, values in u.iter_mapping("ACC", "KEGG_ID", (x.strip() for x in fin)):
+                    ...
+
+        """
+        from itertools import islice
+        from bioservices.services import get_executor
+
+        if isinstance(query, str):
+            query = query.split()
+        query = iter(query)
+        window = max(1, self.settings.CONCURRENT)
+        executor = get_executor()
+
+        while True:
+            chunks = [list(islice(query, chunk_size)) for i in range(window)]
+            chunks = [chunk for chunk in chunks if chunk]
+            if not chunks:
+                break
+            futures = [executor.submit(self._mapping_chunk, fr, to, chunk)
+                for chunk in chunks]
+            for chunk, future in zip(chunks, futures):
+                result = future.result()
+                for key in chunk:
+                    yield key, result.get(key, [])
+
+    def _mapping_chunk(self, fr, to, identifiers):
+        # identifiers already known are not sent (see mapping_store)
+        store = self.mapping_store
+        known = {}
+        if store is not None:
+            source, target = "UniProt:%s" % fr, "UniProt:%s" % to
+            known, identifiers = store.get_many(source, target, identifiers)
+            if not identifiers:
+                return known
+
+        url = 'mapping/'  # the slash matters
+        params = {'from': fr, 'to': to, 'format': "tab",
+                  'query': " ".join(identifiers)}
+        result = self.http_post(url, frmt="txt", data=params)
+
+        mapped = {}
+        if not isinstance(result, str):
+            self.logging.warning("Mapping of {} identifiers failed ({})".format(
+                len(identifiers), result))
+            # None tells the identifiers apart from unmapped ones
+            known.update((x, None) for x in identifiers)
+            return known
+
+        # tabulated output with a header (From To). Values may contain spaces
+        for line in result.split("\n")[1:]:
+            if "\t" in line:
+                key, value = line.split("\t", 1)
+                mapped.setdefault(key, []).append(value.strip())
+
+        if store is not None:
+            store.set_many(source, target, mapped,
+                [x for x in identifiers if x not in mapped])
+            mapped.update(known)
+        return mapped
 
     def searchUniProtId(self, uniprot_id, frmt="xml"):
         self.logging.warning("DEPRECATED SINCE VERSION 1.3.1. use retrieve instead")
@@ -545,6 +618,90 @@ class UniProt(REST):
         res = self.http_get(database + "/", frmt="txt", params=params)
         return res
 
+    def iter_search(self, query, frmt="tab", columns=None, include=False,
+                    sort="score", compress=True, page_size=1000,
+                    database="uniprot"):
+        """Iterates over all the results of a search
+
+        Same as :meth:`search` but all results are retrieved, page by page
+        (*page_size* results per request). The next page is requested while
+        the current one is being consumed.
+
+        :param str frmt: tab, list or fasta.
+        :param bool compress: transfer gzipped pages (uncompressed on the fly)
+        :param int page_size: number of results per request
+        :return: a generator. With the tab format, each result is a dictionary
+            keyed by the column names; with the list format, each result is an
+            identifier; with the fasta format, each result is a tuple made of
+            the header (without >) and the sequence.
+
+        See :meth:`search` for the other parameters.
+
+        ::
+
+            >>> for entry in u.iter_search("organism:9606+and+reviewed:yes",
+            ...     columns="id,entry name,length"):
+            ...     print(entry["Entry"], entry["Length"])
+
+        """
+        from bioservices.services import get_executor
+        if frmt not in ["tab", "list", "fasta"]:
+            raise ValueError("frmt must be one of tab, list or fasta")
+
+        def fetch(offset):
+            res = self.search(query, frmt=frmt, columns=columns, include=include,
+                sort=sort, compress=compress, limit=page_size, offset=offset,
+                database=database)
+            if isinstance(res, bytes) and res[:2] == b"\x1f\x8b":
+                res = gzip.decompress(res)
+            if isinstance(res, bytes):
+                res = res.decode("utf-8")
+            if not isinstance(res, str):
+                raise BioServicesError("UniProt search failed at offset {} "
+                    "(status {})".format(offset, res))
+            # number of results given by the server (last_response is
+            # specific to this thread)
+            total = None
+            response = self.last_response
+            if response is not None and hasattr(response, "headers"):
+                total = response.headers.get("X-Total-Results")
+            return res, int(total) if total else None
+
+        # The number of parsed records may differ from page_size (e.g.
+        # isoforms in fasta pages with include=True) so that paging stops
+        # once the total number of results is reached or on an empty page.
+        executor = get_executor()
+        offset = 0
+        future = executor.submit(fetch, offset)
+        while True:
+            page, total = future.result()
+            records = self._parse_search_page(page, frmt)
+            offset += page_size
+            more = offset < total if total is not None else bool(records)
+            if more:
+                future = executor.submit(fetch, offset)
+            for record in records:
+                yield record
+            if not more:
+                break
+
+    def _parse_search_page(self, page, frmt):
+        page = page.strip()
+        if not page:
+            return []
+        if frmt == "list":
+            return page.split()
+        elif frmt == "fasta":
+            records = []
+            for record in page.lstrip(">").split("\n>"):
+                header, sequence = (record.split("\n", 1) + [""])[0:2]
+                records.append((header, sequence.replace("\n", "")))
+            return records
+        else:
+            lines = page.split("\n")
+            header = lines[0].split("\t")
+            return [dict(zip(header, line.split("\t"))) for line in lines[1:]]
+
     def quick_search(self, query, include=False, sort="score", limit=None):
         """a specialised version of :meth:`search`
 
@@ -606,19 +763,99 @@ class UniProt(REST):
             res = pd.read_csv(io.StringIO(str(res.strip())), sep="\t")
         return res
 
-    def get_df(self, entries, nChunk=100, organism=None, limit=10):
+    # columns made of ;-separated values, converted into lists by get_df
+    _list_columns = ['PubMed ID', 'Comments', u'Domains', 'Protein families',
+                   'Gene names', 'Gene ontology (GO)', 'Gene ontology IDs',
+                   'InterPro', 'Interacts with', 'Keywords',
+                   'Subcellular location']
+
+    def _iter_df_chunks(self, entries, nChunk=100, organism=None, limit=10):
+        # yields the raw dataframe of each chunk of entries. Chunks are
+        # retrieved concurrently (general.async_concurrent at a time)
+        from itertools import islice
+        from bioservices.services import get_executor
+
+        entries = iter(entries)
+        window = max(1, self.settings.CONCURRENT)
+        executor = get_executor()
+        columns = ",".join(self._valid_columns)
+
+        while True:
+            chunks = [list(islice(entries, nChunk)) for i in range(window)]
+            chunks = [chunk for chunk in chunks if chunk]
+            if not chunks:
+                break
+            futures = []
+            for chunk in chunks:
+                query = "+or+".join(chunk)
+                if organism:
+                    query += "+and+" + organism
+                futures.append(executor.submit(self.search, query, frmt="tab",
+                    columns=columns, limit=limit))
+            for chunk, future in zip(chunks, futures):
+                res = future.result()
+                if not isinstance(res, str) or len(res) == 0:
+                    self.logging.warning("some entries %s not found" % chunk)
+                else:
+                    yield pd.read_csv(io.StringIO(res), sep="\t")
+
+    def _clean_df(self, df):
+        # to transform into list:
+        for col in self._list_columns:
+            if col not in df.columns:
+                self.logging.warning("column could not be parsed. %s" % col)
+                continue
+            values = df[col].fillna("").astype(str).str.strip()
+            # a pattern of several characters is a regular expression
+            values = values.str.split(r"\s*;\s*")
+            empty = df[col].isnull() | (df[col].astype(str).str.strip() == "")
+            if empty.any():
+                values[empty] = pd.Series([[] for i in range(empty.sum())],
+                    index=values.index[empty])
+            df[col] = values
+
+        # Sequences are splitted into chunks of 10 characters. let us rmeove
+        # the spaces:
+        if 'Sequence' in df.columns:
+            df['Sequence'] = df['Sequence'].fillna("").astype(str).str.replace(
+                " ", "")
+        for col in ['Length', 'Mass']:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col].astype(str).str.replace(",", ""),
+                    errors="coerce").astype("Int64")
+        return df
+
+    def iter_df(self, entries, nChunk=100, organism=None, limit=10):
+        """Generator version of :meth:`get_df`
+
+        Yields one dataframe per chunk of *nChunk* entries, chunks being
+        retrieved concurrently. Useful for proteome-scale lists of entries::
+
+            for df in u.iter_df(entries):
+                df.to_csv("entries.csv", mode="a")
+
+        """
+        if isinstance(entries, str):
+            entries = [entries]
+        for df in self._iter_df_chunks(entries, nChunk, organism, limit):
+            yield self._clean_df(df.drop_duplicates())
+
+    def get_df(self, entries, nChunk=100, organism=None, limit=10, parquet=None):
         """Given a list of uniprot entries, this method returns a dataframe with all possible columns
 
 
-        :param entries: list of valid entry name. if list is too large (about
-            >200), you need to split the list
-        :param chunk:
+        :param entries: list of valid entry name. The list is split in
+            chunks of *nChunk* entries retrieved concurrently.
+        :param nChunk: number of entries per request
         :param limit: limit number of entries per identifier to 10. You can 
             set it to None to keep all entries but this will be very slow
+        :param parquet: if provided, the dataframe is also saved in this
+            Parquet file (requires pyarrow)
         :return: dataframe with indices being the uniprot id (e.g. DIG1_YEAST)
 
-        .. todo:: cleanup the content of the data frame to replace strings
-            separated by ; into a list of strings. e.g. the Gene Ontology IDs
+        Columns made of strings separated by ; (e.g. the Gene Ontology IDs) are
+        converted into lists of strings. Length and Mass are integers. See
+        :meth:`iter_df` to retrieve the dataframe chunk by chunk.
 
         .. warning:: requires pandas library
         """
@@ -626,55 +863,17 @@ class UniProt(REST):
             entries = [entries]
         else:
             entries = list(set(entries))
-        output = pd.DataFrame()
 
         self.logging.info("fetching information from uniprot for {} entries".format(len(entries)))
 
-        nChunk = min(nChunk, len(entries))
-        N, rest = divmod(len(entries), nChunk)
-        for i in range(0, N + 1):
-            this_entries = entries[i * nChunk:(i + 1) * nChunk]
-            if len(this_entries):
-                self.logging.info("uniprot.get_df {}/{}".format(i + 1, N))
-                query = "+or+".join(this_entries)
-                if organism:
-                    query += "+and+" + organism
-                res = self.search(query, frmt="tab",
-                                  columns=",".join(self._valid_columns),
-                                limit=limit)
-            else:
-                break
-            if len(res) == 0:
-                self.logging.warning("some entries %s not found" % entries)
-            else:
-                try:
-                    # python 2.X
-                    df = pd.read_csv(io.StringIO(unicode(res)), sep="\t")
-                except:
-                    df = pd.read_csv(io.StringIO(str(res)), sep="\t")
-                if isinstance(output, type(None)):
-                    output = df.copy()
-                else:
-                    output = output.append(df, ignore_index=True)
+        dfs = list(self._iter_df_chunks(entries, nChunk, organism, limit))
+        if len(dfs) == 0:
+            return pd.DataFrame()
+        output = pd.concat(dfs, ignore_index=True)
 
         # you may end up with duplicated...
         output.drop_duplicates(inplace=True)
-        # you may have new entries...
-        # output = output[output.Entry.apply(lambda x: x in entries)]
-        # to transform into list:
-        columns = ['PubMed ID', 'Comments', u'Domains', 'Protein families',
-                   'Gene names', 'Gene ontology (GO)', 'Gene ontology IDs',
-                   'InterPro', 'Interacts with', 'Keywords',
-                   'Subcellular location']
-        for col in columns:
-            try:
-                res = output[col].apply(lambda x: [this.strip() for this in str(x).split(";") if this != "nan"])
-                output[col] = res
-            except:
-                self.logging.warning("column could not be parsed. %s" % col)
-        # Sequences are splitted into chunks of 10 characters. let us rmeove
-        # the spaces:
-        output['Sequence'].fillna("", inplace=True)
-        output.Sequence = output['Sequence'].apply(lambda x: x.replace(" ", ""))
-
+        output = self._clean_df(output)
+        if parquet:
+            output.to_parquet(parquet)
         return output
@@ -19,8 +19,7 @@
 #$Id$
 """This module includes common tools to manipulate XML files"""
 from __future__ import print_function
-import xml.etree.ElementTree as ET
-import bs4
+import sys
 
 try:
     from urllib.request import urlopen
@@ -28,13 +27,209 @@ try:
 except:
     from urllib2 import urlopen, HTTPError
 
-__all__ = ["easyXML", "readXML"]
+__all__ = ["easyXML", "readXML", "iterparse", "iter_records", "xml2dict"]
+
+
+def _get_parser(encoding=None):
+    from lxml import etree
+    # comments and processing instructions are dropped to get the same
+    # children as with xml.etree. External DTDs are never fetched.
+    return etree.XMLParser(encoding=encoding, remove_comments=True,
+        remove_pis=True, no_network=True, huge_tree=True)
+
+
+def _fromstring(data):
+    from lxml import etree
+    if isinstance(data, bytes):
+        return etree.fromstring(data, _get_parser())
+    # lxml refuses unicode strings with an encoding declaration
+    return etree.fromstring(data.encode("utf-8"), _get_parser("utf-8"))
+
+
+def _get_source(source):
+    import io
+    if isinstance(source, str) and source.lstrip().startswith("<"):
+        source = source.encode("utf-8")
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    return source
+
+
+def _get_tag(element):
+    # same naming as xmltodict: prefix:tag for namespaced elements. Tags are
+    # interned so that all records share the same keys.
+    tag = element.tag
+    if tag[0] == "{":
+        tag = tag.split("}", 1)[1]
+        if element.prefix:
+            tag = "%s:%s" % (element.prefix, tag)
+    return sys.intern(tag)
+
+
+def _add_child(result, lists, tag, value):
+    # repeated tags are stored in a list
+    if tag in lists:
+        result[tag].append(value)
+    elif tag in result:
+        result[tag] = [result[tag], value]
+        lists.add(tag)
+    else:
+        result[tag] = value
+
+
+def _element_to_dict(element):
+    """Converts an element into a dictionary using the xmltodict conventions
+
+    Attributes are prefixed with @, tags found several times are stored in
+    lists and the text of elements with attributes or children is stored
+    under the #text key. Elements without attributes nor children are
+    converted to their text (None if empty).
+    """
+    result = dict((sys.intern("@" + k), v) for k, v in element.attrib.items())
+    text = [element.text] if element.text else []
+    lists = set()
+    for child in element:
+        _add_child(result, lists, _get_tag(child), _element_to_dict(child))
+        if child.tail:
+            text.append(child.tail)
+    text = "".join(text).strip()
+    if not result:
+        return text or None
+    if text:
+        result["#text"] = text
+    return result
+
+
+def _iter_children(source):
+    # yields the root element first (with its attributes but no children)
+    # then each child of the root once fully parsed. Children are cleared
+    # once processed.
+    from lxml import etree
+    context = etree.iterparse(_get_source(source), events=("start", "end"),
+        remove_comments=True, remove_pis=True, no_network=True,
+        huge_tree=True)
+    depth = 0
+    root = None
+    for event, element in context:
+        if event == "start":
+            depth += 1
+            if depth == 1:
+                root = element
+                yield element
+            continue
+        depth -= 1
+        if depth == 1:
+            yield element
+            element.clear(keep_tail=True)
+            while element.getprevious() is not None:
+                del root[0]
+    del context
+
+
+def iter_records(source):
+    """Iterates over the records of an XML document as dictionaries
+
+    :param source: a filename, a file object opened in binary mode or the
+        document itself (bytes or string)
+    :return: a generator of dictionaries, one per child of the root element
+        (e.g. a PubmedArticle in an EFetch result, a DocSum in an ESummary
+        result or a LinkSet in an ELink result)
+
+    Each record is converted with the same conventions as xmltodict
+    (attributes prefixed with @, repeated tags as lists, text under #text)
+    and is keyed by its tag, so that records of different types can be
+    distinguished. Records are converted once parsed and then removed from
+    the tree so that memory usage does not depend on the number of records::
+
+        from bioservices.xmltools import iter_records
+        for record in iter_records(xml):
+            article = record['PubmedArticle']['MedlineCitation']['Article']
+            print(article['ArticleTitle'])
+
+    """
+    children = _iter_children(source)
+    next(children, None)
+    for element in children:
+        yield {_get_tag(element): _element_to_dict(element)}
+
+
+def xml2dict(source):
+    """Converts an XML document into a dictionary
+
+    :param source: a filename, a file object opened in binary mode or the
+        document itself (bytes or string)
+    :return: a dictionary identical to the output of xmltodict.parse
+        (except that namespace declarations are not reported as attributes)
+
+    The document is parsed incrementally and each child of the root element
+    is converted and released as soon as it is parsed, so that the XML tree
+    of the whole document is never kept in memory. For very large documents,
+    consider :func:`iter_records` instead.
+    """
+    children = _iter_children(source)
+    root = next(children, None)
+    if root is None:
+        raise ValueError("empty XML document")
+
+    result = dict((sys.intern("@" + k), v) for k, v in root.attrib.items())
+    tails = []
+    lists = set()
+    previous = None
+    for child in children:
+        # the tail of a child is parsed after its end event and is read
+        # before the child is released
+        if previous is not None and previous.tail:
+            tails.append(previous.tail)
+        _add_child(result, lists, _get_tag(child), _element_to_dict(child))
+        previous = child
+    if previous is not None and previous.tail:
+        tails.append(previous.tail)
+
+    text = ((root.text or "") + "".join(tails)).strip()
+    if not result:
+        result = text or None
+    elif text:
+        result["#text"] = text
+    return {_get_tag(root): result}
+
+
+def iterparse(source, tag=None):
+    """Iterates over the elements of a large XML document
+
+    :param source: a filename, a file object opened in binary mode or the
+        document itself (bytes or string)
+    :param tag: only elements with this tag are returned. Namespaces can be
+        given with the {namespace}tag notation or ignored with {*}tag.
+    :return: a generator of lxml elements
+
+    Elements are returned once fully parsed and are cleared afterwards
+    (together with their preceding siblings) so that memory usage does not
+    grow with the size of the document. Use the elements (or copy what is
+    needed) before going to the next one::
+
+        from bioservices.xmltools import iterparse
+        for entry in iterparse("uniprot.xml", tag="{*}entry"):
+            print(entry.get("dataset"))
+
+    """
+    from lxml import etree
+    context = etree.iterparse(_get_source(source), events=("end",), tag=tag,
+        remove_comments=True, remove_pis=True, no_network=True,
+        huge_tree=True)
+    for _, element in context:
+        yield element
+        element.clear()
+        parent = element.getparent()
+        if parent is not None:
+            while element.getprevious() is not None:
+                del parent[0]
+    del context
 
 
 class easyXML(object):
     """class to ease the introspection of XML documents.
 
-    This class uses the standard xml module as well as the package BeautifulSoup
+    This class uses the lxml package as well as the package BeautifulSoup
     to help introspecting the XML documents.
 
     ::
@@ -45,7 +240,7 @@ class easyXML(object):
         >>> # You can retreive XML from this instance of easyXML and print the content
         >>> # in a more human-readable way.
         >>> res.soup.findAll('id') # a Beautifulsoup instance is available
-        >>> res.root # and the root using xml.etree.ElementTree
+        >>> res.root # and the root using lxml.etree
 
     There is a getitem so you can type::
 
@@ -57,6 +252,9 @@ class easyXML(object):
 
     There is also aliases findAll and prettify.
 
+    The document is parsed when :attr:`root` or :attr:`soup` is first
+    accessed, so that the BeautifulSoup tree is built only if needed. For large
+    documents, consider :func:`iterparse`.
     """
     def __init__(self, data, encoding="utf-8"):
         """.. rubric:: Constructor
@@ -72,19 +270,19 @@ class easyXML(object):
         have an URL instead, use :class:`readXML`
 
         """
-        #if fixing_unicode:
-        #    x = unicodefix.FixingUnicode(data, verbose=False, encoding=encoding)
-        #    self.data = x.fixed_string.encode("utf-8")
-        #else:
-        self.data = data[:]
-
-        try:
-            self.root = ET.fromstring(self.data)
-        except:
-            self.root = self.data[:]
+        self.data = data
+        self._root = None
         self._soup = None
-        self.prettify = self.soup.prettify
-        self.findAll = self.soup.findAll
+
+    def _get_root(self):
+        if self._root is None:
+            try:
+                self._root = _fromstring(self.data)
+            except Exception:
+                # not a valid XML document
+                self._root = self.data
+        return self._root
+    root = property(_get_root, doc="Returns the root element (lxml)")
 
     def getchildren(self):
         """returns all children of the root XML document
@@ -95,10 +293,19 @@ class easyXML(object):
 
     def _get_soup(self):
         if self._soup is None:
+            import bs4
             self._soup = bs4.BeautifulSoup(self.data, "lxml")
         return self._soup
     soup = property(_get_soup, doc="Returns the beautiful soup instance")
 
+    def findAll(self, *args, **kargs):
+        """Alias to self.soup.findAll"""
+        return self.soup.find_all(*args, **kargs)
+
+    def prettify(self, *args, **kargs):
+        """Alias to self.soup.prettify"""
+        return self.soup.prettify(*args, **kargs)
+
     def __str__(self):
         txt = self.soup.prettify()
         return txt
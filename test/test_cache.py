@@ -0,0 +1,144 @@
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from bioservices.cache import MemoryCache, SQLiteCache, FileCache, ResponseCache
+from bioservices.services import REST
+
+
+@pytest.fixture(params=["memory", "sqlite", "file"])
+def backend(request, tmpdir):
+    if request.param == "memory":
+        return MemoryCache(max_size=100)
+    elif request.param == "sqlite":
+        return SQLiteCache(str(tmpdir.join("cache.sqlite")), max_size=100)
+    else:
+        return FileCache(str(tmpdir.join("cache")), max_size=100)
+
+
+def test_backend(backend):
+    backend.set("a", b"1" * 40)
+    backend.set("b", b"2" * 40)
+    assert backend.get("a")[1] == b"1" * 40
+    assert len(backend) == 2
+    time.sleep(0.01)
+    # b is the least recently used entry and is evicted
+    backend.set("c", b"3" * 40)
+    assert backend.get("b") is None
+    assert backend.get("a")[1] == b"1" * 40
+    assert backend.size <= 100
+    backend.delete("a")
+    assert backend.get("a") is None
+    backend.clear()
+    assert len(backend) == 0
+
+
+def test_file_cache_deduplication(tmpdir):
+    backend = FileCache(str(tmpdir.join("cache")))
+    backend.set("a", b"same")
+    backend.set("b", b"same")
+    assert len(tmpdir.join("cache", "objects").listdir()) == 1
+    assert backend.size == 4
+
+
+def test_sqlite_cache_old_layout(tmpdir):
+    # file written by requests_cache in bioservices < 1.8
+    import sqlite3
+    filename = str(tmpdir.join("cache.sqlite"))
+    connection = sqlite3.connect(filename)
+    connection.execute("CREATE TABLE responses (key PRIMARY KEY, value)")
+    connection.execute("INSERT INTO responses VALUES ('a', 'old')")
+    connection.commit()
+    connection.close()
+
+    backend = SQLiteCache(filename)
+    assert backend.get("a") is None
+    backend.set("a", b"new")
+    assert backend.get("a")[1] == b"new"
+
+
+def _response(url, status_code=200, content=b"entry"):
+    from requests import Response
+    response = Response()
+    response.url = url
+    response.status_code = status_code
+    response._content = content
+    return response
+
+
+def test_response_cache_policies():
+    cache = ResponseCache(MemoryCache(), expire_after=100,
+        policies=[("/nocache/", 0), ("/short/", 0.05), ("/forever/", None)])
+    assert cache.get_ttl("http://host/nocache/1") == 0
+    assert cache.get_ttl("http://host/short/1") == 0.05
+    assert cache.get_ttl("http://host/forever/1") is None
+    assert cache.get_ttl("http://host/get/1") == 100
+
+    for url in ["http://host/get/1", "http://host/nocache/1",
+                "http://host/short/1", "http://host/forever/1"]:
+        cache.save_response(_response(url), params={"a": 1})
+    # failed responses are not cached
+    cache.save_response(_response("http://host/get/2", 500))
+    assert cache.stats['entries'] == 3
+
+    res = cache.get_response("http://host/get/1", params={"a": 1})
+    assert res.content == b"entry" and res.from_cache
+    # parameters and Accept header are part of the key
+    assert cache.get_response("http://host/get/1", params={"a": 2}) is None
+    assert cache.get_response("http://host/get/1", params={"a": 1},
+        headers={"Accept": "application/json"}) is None
+    assert cache.get_response("http://host/nocache/1", params={"a": 1}) is None
+    assert cache.get_response("http://host/get/2") is None
+
+    time.sleep(0.1)
+    assert cache.get_response("http://host/short/1", params={"a": 1}) is None
+    assert cache.get_response("http://host/forever/1", params={"a": 1}) is not None
+    assert cache.stats['expired'] == 1 and cache.stats['entries'] == 2
+    assert cache.stats['hits'] == 2
+
+
+class _CountingHandler(BaseHTTPRequestHandler):
+    calls = 0
+
+    def do_GET(self):
+        _CountingHandler.calls += 1
+        body = b"entry"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_rest_cache():
+    server = HTTPServer(("127.0.0.1", 0), _CountingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:%s" % server.server_port
+
+    class Stub(REST):
+        cache_policies = [("/nocache/", 0), ("/short/", 0.2)]
+
+    s = Stub("test", url, verbose=False, cache=MemoryCache(),
+        requests_per_sec=100)
+    try:
+        for i in range(3):
+            assert s.http_get("get/1", frmt="txt") == "entry"
+        assert _CountingHandler.calls == 1
+        assert s.cache.stats['hits'] == 2
+        assert s.cache.stats['misses'] == 1
+
+        s.http_get("nocache/1", frmt="txt")
+        s.http_get("nocache/1", frmt="txt")
+        assert _CountingHandler.calls == 3
+
+        s.http_get("short/1", frmt="txt")
+        time.sleep(0.3)
+        s.http_get("short/1", frmt="txt")
+        assert _CountingHandler.calls == 5
+        assert s.cache.stats['expired'] == 1
+    finally:
+        server.shutdown()
@@ -1,4 +1,5 @@
 from bioservices.chembl import ChEMBL
+from bioservices import BioServicesError
 import pytest
 import os
 
@@ -250,3 +251,85 @@ def __test_limit(chembl):
 # very very slow 
 def __test_compounds2accession(chembl):
     res = chembl.compounds2accession('CHEMBL4')
+
+
+def _fake_resource(monkeypatch, c, total=2500):
+    calls = []
+
+    def http_get(query, frmt="json", params={}):
+        calls.append(params['offset'])
+        start = params['offset']
+        stop = min(total, start + params['limit'])
+        return {"page_meta": {"total_count": total, "offset": start,
+                              "next": "next" if stop < total else None},
+                "activities": [{"id": i} for i in range(start, stop)]}
+
+    def get_async(keys, frmt="json", params={}):
+        return [http_get(key, params=this) for key, this in zip(keys, params)]
+    monkeypatch.setattr(c, "http_get", http_get)
+    monkeypatch.setattr(c, "get_async", get_async)
+    return calls
+
+
+def test_get_data_pages(monkeypatch):
+    c = ChEMBL()
+    calls = _fake_resource(monkeypatch, c)
+    data = c.get_activity(limit=-1)
+    assert [x['id'] for x in data] == list(range(2500))
+    assert calls == [0, 1000, 2000]
+
+    del calls[:]
+    data = c.get_activity(limit=1500, offset=10)
+    assert [x['id'] for x in data] == list(range(10, 1510))
+    assert calls == [10, 1010]
+
+    del calls[:]
+    records = c.iter_activity(filters="target_chembl_id=CHEMBL240")
+    assert calls == []
+    assert next(records) == {"id": 0}
+    assert len(list(records)) == 2499
+
+
+def test_compounds2accession_offline(monkeypatch):
+    c = ChEMBL()
+    queries = []
+
+    def get_async(keys, frmt="json", params={}):
+        queries.extend(keys)
+        results = []
+        for key, this in zip(keys, params):
+            if key == "activity":
+                compounds = this["molecule_chembl_id__in"].split(",")
+                # 1200 activities per compound (2 pages) on targets T0 and T1
+                acts = [{"molecule_chembl_id": x, "target_chembl_id": "T%s" % (i % 2)}
+                        for x in compounds for i in range(1200)]
+                start = this['offset']
+                results.append({"page_meta": {"total_count": len(acts)},
+                    "activities": acts[start:start + this['limit']]})
+            else:
+                targets = key.split("/")[-1].split(";")
+                results.append({"targets": [{"target_chembl_id": x,
+                    "target_components": [{"accession": "P" + x}]}
+                    for x in targets]})
+        return results
+    monkeypatch.setattr(c, "get_async", get_async)
+
+    res = c.compounds2accession(["C%s" % i for i in range(5)], batch_size=2)
+    assert res == dict(("C%s" % i, {"PT0", "PT1"}) for i in range(5))
+    # 3 first pages, 5 remaining pages and a single target query
+    assert queries == ["activity"] * 8 + ["target/set/T0;T1"]
+
+
+def test_get_async_retry_fails(monkeypatch):
+    c = ChEMBL()
+    _fake_resource(monkeypatch, c)
+    http_get = c.http_get
+
+    # the pages after the first one fail, and so does the retry
+    def failing_get(query, frmt="json", params={}):
+        return http_get(query, params=params) if params['offset'] == 0 else None
+    monkeypatch.setattr(c, "http_get", failing_get)
+    monkeypatch.setattr(c, "get_async", lambda keys, frmt="json", params={}:
+        [None] * len(keys))
+    with pytest.raises(BioServicesError):
+        c.get_activity(limit=-1)
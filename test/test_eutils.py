@@ -161,3 +161,92 @@ def test_efetch_xml(eutils):
 
 
 
+
+
+def test_eutils_parser_offline():
+    from bioservices.xmltools import easyXML
+    xml = ('<?xml version="1.0" encoding="UTF-8" ?>\n<eLinkResult><LinkSet>'
+        '<DbFrom>pubmed</DbFrom><IdList><Id>20210808</Id></IdList>'
+        '<LinkSetDb><Link><Id>1</Id></Link><Link><Id>2</Id></Link></LinkSetDb>'
+        '</LinkSet></eLinkResult>')
+    res = EUtilsParser(xml)
+    assert res.eLinkResult.LinkSet.DbFrom == "pubmed"
+    assert res.eLinkResult.LinkSet.LinkSetDb.Link == [{"Id": "1"}, {"Id": "2"}]
+    assert EUtilsParser(xml.encode("utf-8")) == res
+    assert EUtilsParser(easyXML(xml)) == res
+    assert EUtils(verbose=False, email="test@bioservices").parse_xml(xml) == res
+
+
+def _fake_history(monkeypatch, e, count=1200):
+    requests = []
+    e._databases = ["pubmed", "protein"]
+
+    def http_post(query, data=None, frmt="xml"):
+        requests.append((query, data['id'].count(",") + 1))
+        return ("<ePostResult><QueryKey>1</QueryKey><WebEnv>ENV</WebEnv>"
+                "</ePostResult>")
+
+    def ESearch(db, term, **kargs):
+        requests.append(("esearch", kargs['usehistory']))
+        return {"webenv": "ENV", "querykey": "1", "count": str(count)}
+
+    def get_async(keys, frmt="json", params={}):
+        results = []
+        for key, this in zip(keys, params):
+            assert this['WebEnv'] == "ENV" and this['query_key'] == "1"
+            requests.append((key, this['retstart']))
+            uids = [str(x) for x in range(this['retstart'],
+                min(count, this['retstart'] + this['retmax']))]
+            if key == "efetch.fcgi" and this['retmode'] == "xml":
+                results.append("<PubmedArticleSet>%s</PubmedArticleSet>" %
+                    "".join("<PubmedArticle><PMID>%s</PMID></PubmedArticle>" % x
+                        for x in uids))
+            elif key == "efetch.fcgi":
+                results.append("".join(">%s\n" % x for x in uids))
+            else:
+                result = dict((x, {"uid": x}) for x in uids)
+                result['uids'] = uids
+                results.append({"result": result})
+        return results
+    monkeypatch.setattr(e, "http_post", http_post)
+    monkeypatch.setattr(e, "ESearch", ESearch)
+    monkeypatch.setattr(e, "get_async", get_async)
+    return requests
+
+
+def test_fetch_all(monkeypatch):
+    e = EUtils(verbose=False, email="test@bioservices")
+    requests = _fake_history(monkeypatch, e)
+
+    ids = list(range(1200))
+    batches = list(e.fetch_all("protein", ids=ids, rettype="fasta",
+        retmode="text", batch_size=500))
+    assert requests == [("epost.fcgi", 1200), ("efetch.fcgi", 0),
+        ("efetch.fcgi", 500), ("efetch.fcgi", 1000)]
+    assert [x.count(">") for x in batches] == [500, 500, 200]
+
+    del requests[:]
+    summaries = list(e.fetch_all("pubmed", term="bioservices",
+        method="esummary", batch_size=500))
+    assert requests[0] == ("esearch", "y")
+    assert [x['uid'] for x in summaries] == [str(x) for x in ids]
+
+    articles = list(e.fetch_all("pubmed", ids=ids, retmode="dict"))
+    assert [x['PubmedArticle']['PMID'] for x in articles] == \
+        [str(x) for x in ids]
+
+    with pytest.raises(ValueError):
+        list(e.fetch_all("pubmed"))
+
+
+def test_api_key(monkeypatch):
+    monkeypatch.delenv("NCBI_API_KEY", raising=False)
+    e = EUtils(verbose=False, email="test@bioservices")
+    assert e.requests_per_sec == 3 and 'api_key' not in e._get_params()
+
+    monkeypatch.setenv("NCBI_API_KEY", "secret")
+    e = EUtils(verbose=False, email="test@bioservices")
+    assert e.requests_per_sec == 10
+    assert e._get_params()['api_key'] == "secret"
+    assert e.rate_limiter.rate == 10
+    assert "secret" not in e.rate_limit_key
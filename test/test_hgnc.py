@@ -1,3 +1,5 @@
+import os
+
 from bioservices import HGNC
 
 
@@ -20,3 +22,69 @@ def test_hgnc():
     h.search('symbol', 'ZNF3+OR+ZNF12')
     h.search('symbol', 'ZNF*+NOT+status:Approved')
 
+
+
+def _genes_xml(names):
+    genes = "".join('<gene symbol="%s" acc="HGNC:%s"><xrefs>'
+        '<xref xdb="UniProt" xkey="P%s"><link format="html" '
+        'xlink:href="http://www.uniprot.org/uniprot/P%s"/></xref>'
+        '<xref xdb="EntrezGene" xkey="%s"/></xrefs></gene>' % (
+        name, name[1:], name[1:], name[1:], name[1:]) for name in names)
+    return ('<genes xmlns:xlink="http://www.w3.org/1999/xlink">%s</genes>'
+        % genes).encode()
+
+
+def test_mapping_all_offline(monkeypatch, tmpdir):
+    from bioservices.hgnc import HGNCDeprecated
+    h = HGNCDeprecated()
+    queries = []
+
+    def http_get(query, frmt="xml"):
+        names = query.split("/")[1].split(";")
+        queries.append(names)
+        return _genes_xml(names)
+    monkeypatch.setattr(h, "http_get", http_get)
+
+    entries = [{"xlink:title": "G%s" % i} for i in range(25)]
+    res = list(h.iter_mapping_all(entries, chunk_size=10))
+    assert sorted(len(x) for x in queries) == [5, 10, 10]
+    assert [x[0] for x in res] == ["G%s" % i for i in range(25)]
+    assert res[3][1]["UniProt"]["xkey"] == "P3"
+    assert res[3][1]["EntrezGene"]["xkey"] == "3"
+
+    for name in ["hgnc.tsv", "hgnc.parquet"]:
+        filename = str(tmpdir.join(name))
+        res = h.mapping_all(entries, filename=filename, chunk_size=10)
+        assert len(res) == 25
+        table = HGNCDeprecated.read_table(filename)
+        assert table["G3"] == {"UniProt": {"xkey": "P3"},
+            "EntrezGene": {"xkey": "3"}}
+
+    # HGNCMapper reloads the table instead of fetching the data
+    from bioservices.mapping.mappers import HGNCMapper
+    m = HGNCMapper(filename=filename)
+    assert m.df.loc["G3", "UniProt__HGNC_mapping"] == "P3"
+
+    # a chunk fails: the other chunks are returned but no table is saved
+    def http_get(query, frmt="xml"):
+        names = query.split("/")[1].split(";")
+        if "G12" in names:
+            raise ValueError("connection reset")
+        return _genes_xml(names)
+    monkeypatch.setattr(h, "http_get", http_get)
+    res = list(h.iter_mapping_all(entries, chunk_size=10))
+    assert [x[0] for x in res] == ["G%s" % i for i in range(25)
+        if not 10 <= i < 20]
+    for name in ["failed.tsv", "failed.parquet"]:
+        filename = str(tmpdir.join(name))
+        assert len(h.mapping_all(entries, filename=filename, chunk_size=10)) == 15
+        assert not os.path.exists(filename)
+        assert not os.path.exists(filename + ".tmp")
+
+    # an interrupted run does not leave a partial table
+    filename = str(tmpdir.join("interrupted.tsv"))
+    genes = h._write_table(iter([("G1", {}), ("G2", {})]), filename, [])
+    next(genes)
+    genes.close()
+    assert not os.path.exists(filename)
+    assert not os.path.exists(filename + ".tmp")
@@ -0,0 +1,109 @@
+import gzip
+import time
+
+from bioservices.idmapping import IDMappingStore, import_uniprot_idmapping, \
+    import_kegg_conv
+
+
+def test_store(tmpdir):
+    store = IDMappingStore(str(tmpdir.join("idmapping.sqlite")))
+    store.set_many("UniProt:ACC", "UniProt:KEGG_ID",
+        {"P43403": ["hsa:7535"], "P1": "a"}, ["P2"])
+    found, missing = store.get_many("UniProt:ACC", "UniProt:KEGG_ID",
+        ["P43403", "P1", "P2", "P3"])
+    assert found == {"P43403": ["hsa:7535"], "P1": ["a"], "P2": []}
+    assert missing == ["P3"]
+    # other target
+    found, missing = store.get_many("UniProt:ACC", "UniProt:ID", ["P1"])
+    assert found == {} and missing == ["P1"]
+
+    # values are replaced
+    store.set_many("UniProt:ACC", "UniProt:KEGG_ID", {"P1": ["b", "c"]})
+    assert store.get_many("UniProt:ACC", "UniProt:KEGG_ID", ["P1"])[0] == \
+        {"P1": ["b", "c"]}
+
+    # expiry
+    time.sleep(0.01)
+    found, missing = store.get_many("UniProt:ACC", "UniProt:KEGG_ID",
+        ["P1"], expire_after=0.005)
+    assert missing == ["P1"]
+    store.purge(expire_after=0.005)
+    assert len(store) == 0
+
+
+def test_dumps(tmpdir):
+    store = IDMappingStore()
+    assert store.get_dump("UniChem:chembl", "UniChem:chebi") is None
+    store.import_dump("UniChem:chembl", "UniChem:chebi", {"C1": "1", "C2": ["2", "3"]})
+    assert store.get_dump("UniChem:chembl", "UniChem:chebi") == \
+        {"C1": ["1"], "C2": ["2", "3"]}
+    assert store.get_many("UniChem:chembl", "UniChem:chebi", ["C2"])[0] == \
+        {"C2": ["2", "3"]}
+    # a new import replaces the previous one
+    store.import_dump("UniChem:chembl", "UniChem:chebi", [("C3", "4")])
+    assert store.get_dump("UniChem:chembl", "UniChem:chebi") == {"C3": ["4"]}
+
+    filename = str(tmpdir.join("idmapping.dat.gz"))
+    with gzip.open(filename, "wt") as fout:
+        fout.write("P43403\tUniProtKB-ID\tZAP70_HUMAN\nP43403\tKEGG\thsa:7535\n"
+            "P43403\tGeneID\t7535\nP00958\tKEGG\tsce:YGR264C\n")
+    sizes = import_uniprot_idmapping(store, filename, types=["KEGG", "UniProtKB-ID"])
+    assert sizes == {("UniProt:ACC", "UniProt:ID"): 1,
+        ("UniProt:ACC", "UniProt:KEGG_ID"): 2}
+
+    filename = str(tmpdir.join("hsa_uniprot.list"))
+    with open(filename, "w") as fout:
+        fout.write("hsa:7535\tup:P43403\nhsa:10458\tup:Q9UQB8\n")
+    assert import_kegg_conv(store, filename, "uniprot", "hsa") == 2
+    assert store.get_many("KEGG", "KEGG:uniprot", ["hsa:10458"])[0] == \
+        {"hsa:10458": ["up:Q9UQB8"]}
+
+
+def test_uniprot_mapping_store(monkeypatch):
+    from bioservices import UniProt
+    u = UniProt(verbose=False)
+    u.mapping_store = IDMappingStore()
+    queries = []
+
+    def http_post(url, frmt="txt", data=None):
+        ids = data['query'].split()
+        queries.append(ids)
+        return "From\tTo\n" + "".join("{}\tgene {}\n".format(x, x)
+            for x in ids if int(x[1:]) % 2 == 0)
+    monkeypatch.setattr(u, "http_post", http_post)
+
+    res = u.mapping("ACC", "GENENAME", ["P1", "P2"])
+    assert res == {"P2": ["gene P2"]} and u.unmapped == ["P1"]
+    # only unknown identifiers are sent, unmapped ones are remembered
+    res = u.mapping("ACC", "GENENAME", ["P1", "P2", "P4"])
+    assert queries == [["P1", "P2"], ["P4"]]
+    assert res == {"P2": ["gene P2"], "P4": ["gene P4"]} and u.unmapped == ["P1"]
+    res = u.mapping("ACC", "GENENAME", ["P4"])
+    assert len(queries) == 2
+
+
+def test_kegg_conv_store(monkeypatch):
+    from bioservices import KEGG
+    k = KEGG(verbose=False)
+    k.mapping_store = IDMappingStore()
+    monkeypatch.setattr(k, "isOrganism", lambda org: org == "hsa")
+    queries = []
+
+    def http_get(query, frmt="txt"):
+        queries.append(query)
+        if query == "conv/uniprot/hsa":
+            return "hsa:1\tup:P1\nhsa:2\tup:P2\n"
+        return "".join("%s\tup:X%s\n" % (x, x[4:])
+            for x in query.split("/")[2].split("+") if x != "hsa:9")
+    monkeypatch.setattr(k, "http_get", http_get)
+
+    assert k.conv("uniprot", "hsa:7+hsa:9") == {"hsa:7": "up:X7"}
+    assert k.conv("uniprot", "hsa:7+hsa:8+hsa:9") == {"hsa:7": "up:X7",
+        "hsa:8": "up:X8"}
+    assert queries == ["conv/uniprot/hsa:7+hsa:9", "conv/uniprot/hsa:8"]
+
+    # whole database, then its entries are known
+    assert k.conv("uniprot", "hsa") == {"hsa:1": "up:P1", "hsa:2": "up:P2"}
+    assert k.conv("uniprot", "hsa") == {"hsa:1": "up:P1", "hsa:2": "up:P2"}
+    assert k.conv("uniprot", "hsa:2") == {"hsa:2": "up:P2"}
+    assert len(queries) == 3
@@ -0,0 +1,28 @@
+import sys
+import subprocess
+
+
+def _imported_modules(statement):
+    code = "import sys; {}; print(' '.join(sys.modules))".format(statement)
+    output = subprocess.check_output([sys.executable, "-c", code])
+    return set(output.decode().split())
+
+
+def test_lazy_import():
+    modules = _imported_modules("import bioservices")
+    for name in ["bioservices.kegg", "bioservices.services", "pandas",
+            "bs4", "suds", "requests", "easydev"]:
+        assert name not in modules
+
+    modules = _imported_modules("from bioservices import KEGG")
+    assert "bioservices.kegg" in modules
+    assert "bioservices.chembl" not in modules
+
+
+def test_star_import():
+    import bioservices
+    namespace = {}
+    exec("from bioservices import *", namespace)
+    for name in ["KEGG", "UniProt", "REST", "easyXML", "kegg", "logger"]:
+        assert name in namespace
+    assert bioservices.uniprot.UniProt is namespace["UniProt"]
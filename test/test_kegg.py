@@ -1,4 +1,5 @@
 from bioservices import KEGG, KEGGParser
+from bioservices.kegg import KEGGTools, _ScanStore
 import pytest
 
 
@@ -235,3 +236,145 @@ def test_KEGGParser_parse_invalid(parse_input):
     # Check that an exception is raised for invalid input
     with pytest.raises(ValueError):
         kp.parse(parse_input)
+
+
+def _flat_entry(name):
+    return "ENTRY       %s              CDS       T01001\nNAME        G%s\n///\n" % (name, name)
+
+
+def test_get_many(monkeypatch):
+    k = KEGG()
+    queries = []
+
+    def get_async(keys, frmt="txt"):
+        queries.extend(keys)
+        # entry 13 is missing from KEGG
+        return ["".join(_flat_entry(x.split(":")[1]) for x in key[4:].split("+")
+            if x != "hsa:13") for key in keys]
+    monkeypatch.setattr(k, "get_async", get_async)
+
+    ids = ["hsa:%s" % i for i in range(25)]
+    res = list(k.get_many(iter(ids)))
+    assert len(queries) == 3
+    assert queries[0] == "get/" + "+".join(ids[:10])
+    assert [x[0] for x in res] == ids
+    assert res[13][1] is None
+    assert res[14][1] == _flat_entry("14")
+
+    # failed requests are logged
+    messages = []
+    monkeypatch.setattr(k, "get_async", lambda keys, frmt="txt": [404])
+    monkeypatch.setattr(k.logging, "warning", messages.append)
+    assert list(k.get_many(["hsa:1", "hsa:2"])) == [("hsa:1", None),
+        ("hsa:2", None)]
+    assert messages == ["Could not retrieve hsa:1+hsa:2: 404"]
+
+
+def test_iter_parse():
+    import io
+    entries = "".join(_flat_entry(x) for x in ["1", "2", "3"])
+    parser = KEGGParser()
+    res = list(parser.iter_parse(io.StringIO(entries)))
+    assert [x['ENTRY'] for x in res] == ["%s              CDS       T01001" % i
+        for i in "123"]
+    assert res[0]['NAME'] == ["G1"]
+    assert res == list(parser.iter_parse(entries))
+    assert res[1] == parser.parse(_flat_entry("2"))
+
+
+@pytest.mark.parametrize("extension", ["jsonl", "parquet"])
+def test_scan_genes_resume(monkeypatch, tmpdir, extension):
+    if extension == "parquet":
+        pytest.importorskip("pyarrow")
+    monkeypatch.setattr(KEGGTools, "load_genes", lambda self, organism: None)
+    tools = KEGGTools()
+    tools.genes = ["hsa:%s" % i for i in range(5)]
+    requested = []
+
+    def get_many(ids):
+        for x in ids:
+            requested.append(x)
+            # hsa:3 is unavailable during the first scan
+            if x == "hsa:3" and len(requested) <= 5:
+                yield x, None
+            else:
+                yield x, _flat_entry(x.split(":")[1])
+    monkeypatch.setattr(tools.kegg, "get_many", get_many)
+
+    filename = str(tmpdir.join("genes." + extension))
+    genes = tools.scan_genes(filename)
+    assert sorted(genes) == ["hsa:0", "hsa:1", "hsa:2", "hsa:4"]
+    assert genes["hsa:1"]["NAME"] == ["G1"]
+
+    # resuming only retrieves the missing entry
+    assert tools.scan_genes(filename, in_memory=False) is None
+    assert requested[5:] == ["hsa:3"]
+    genes = tools.scan_genes(filename)
+    assert len(requested) == 6
+    assert sorted(genes) == tools.genes
+    assert genes["hsa:3"] == tools.parser.parse(_flat_entry("3"))
+
+
+def test_scan_store_parquet_interrupted(tmpdir):
+    pytest.importorskip("pyarrow")
+    filename = str(tmpdir.join("genes.parquet"))
+    store = _ScanStore(filename)
+    store.batch_size = 2
+    store.open()
+    for i in range(5):
+        store.write("hsa:%s" % i, {"NAME": ["G%s" % i]})
+    # the scan is interrupted before close(): complete batches are kept
+    store = _ScanStore(filename)
+    assert [x[0] for x in store.read()] == ["hsa:%s" % i for i in range(4)]
+    assert dict(store.read())["hsa:3"] == {"NAME": ["G3"]}
+
+
+_kgml = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE pathway SYSTEM "https://www.kegg.jp/kegg/xml/KGML_v0.7.2_.dtd">
+<pathway name="path:hsa00000" org="hsa" number="00000">
+    <entry id="1" name="hsa:1 hsa:11" type="gene" link="https://www.kegg.jp/">
+        <graphics name="A1, A11" type="rectangle"/>
+    </entry>
+    <entry id="2" name="hsa:2" type="gene" link="https://www.kegg.jp/">
+        <graphics name="A2" type="rectangle"/>
+    </entry>
+    <entry id="3" name="cpd:C00001" type="compound">
+        <graphics name="C00001" type="circle"/>
+    </entry>
+    <relation entry1="1" entry2="2" type="PPrel">
+        <subtype name="activation" value="--&gt;"/>
+        <subtype name="phosphorylation" value="+p"/>
+    </relation>
+    <relation entry1="2" entry2="1" type="PPrel">
+        <subtype name="inhibition" value="--|"/>
+    </relation>
+    <relation entry1="2" entry2="3" type="PCrel">
+        <subtype name="activation" value="--&gt;"/>
+    </relation>
+    <relation entry1="3" entry2="1" type="PCrel"/>
+</pathway>
+"""
+
+
+def test_parse_kgml_pathway_offline(monkeypatch):
+    k = KEGG()
+    res = k.parse_kgml_pathway("hsa00000", res=_kgml)
+    assert [x['id'] for x in res['entries']] == ["1", "2", "3"]
+    assert res.entries_by_id["1"]['gene_names'] == "A1, A11"
+    assert len(res['relations']) == 4
+    assert res['relations'][1] == {'entry1': '1', 'entry2': '2',
+        'link': 'PPrel', 'value': '+p', 'name': 'phosphorylation'}
+    assert [x['entry2'] for x in res.adjacency['PPrel']['1']] == ["2", "2"]
+    assert list(res.adjacency['PCrel']) == ["2"]
+
+    queries = []
+
+    def conv(target, source):
+        queries.append(source)
+        return {"hsa:1": "up:P1", "hsa:2": "up:P2"}
+    monkeypatch.setattr(k, "get", lambda *args: _kgml)
+    monkeypatch.setattr(k, "conv", conv)
+    assert k.pathway2sif("hsa00000") == [["up:P1", 1, "up:P2"],
+        ["up:P2", -1, "up:P1"]]
+    assert queries == ["hsa:1+hsa:2"]
+    assert k.pathway2sif("hsa00000", uniprot=False)[0] == ["hsa:1 hsa:11", 1, "hsa:2"]
@@ -42,3 +42,190 @@ def _test_appsPPI():
     p.queryAll("ZAP70", ["intact"])
     p.summary()
 
+
+
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _ProviderHandler(BaseHTTPRequestHandler):
+    # /good answers, /bad fails and /slow is too slow
+    def do_GET(self):
+        provider = self.path.split("/")[1]
+        if provider == "slow":
+            time.sleep(1)
+        if provider == "bad":
+            self.send_response(500)
+            body = b""
+        elif "format=count" in self.path:
+            self.send_response(200)
+            body = b"2\n"
+        else:
+            self.send_response(200)
+            body = b"uniprotkb:P43403\tuniprotkb:O95169\n" \
+                   b"uniprotkb:P43403\tuniprotkb:P06239\n"
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # the client gave up (timeout)
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def registry():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ProviderHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = "http://127.0.0.1:%s" % server.server_port
+    services = "".join("<service><name>%s</name><active>true</active>"
+        "<resturl>%s/%s/</resturl></service>" % (name, url, name)
+        for name in ("good", "bad", "slow"))
+    yield "<registry>%s</registry>" % services
+    server.shutdown()
+
+
+def test_queryAll_offline(registry):
+    from bioservices.xmltools import easyXML
+    s = PSICQUIC(verbose=False)
+    s.logging.level = "ERROR"
+    # the stub providers share the same host, hence the same rate limit
+    s.requests_per_sec = 1000
+    s._registry = easyXML(registry)
+    assert s.activeDBs == ["good", "bad", "slow"]
+
+    res, errors = s.queryAll("zap70", timeout=0.5, return_errors=True)
+    assert list(res.keys()) == ["good"] and len(res["good"]) == 2
+    assert res["good"][0] == ["uniprotkb:P43403", "uniprotkb:O95169"]
+    assert sorted(errors) == ["bad", "slow"]
+    assert "timed out" in errors["slow"]
+
+    # providers slower than the default timeout are not reported as failed
+    res = s.queryAll("zap70", timeout=2)
+    assert sorted(res) == ["good", "slow"]
+
+    # databases that did not answer before the deadline are reported
+    res, errors = s.queryAll("zap70", timeout=2, deadline=0.3,
+        return_errors=True)
+    assert sorted(res) == ["good"] and sorted(errors) == ["bad", "slow"]
+    assert errors["slow"] == "no answer after 0.3 seconds"
+
+    res, errors = s.getInteractionCounter("zap70", timeout=0.5,
+        return_errors=True)
+    assert res == {"good": 2} and sorted(errors) == ["bad", "slow"]
+
+    with pytest.raises(ValueError):
+        s.queryAll("zap70", databases=["unknown"])
+
+
+class _MITABHandler(BaseHTTPRequestHandler):
+    # 25 interactions in MITAB 2.7, paged with firstResult/maxResults
+    pages = []
+
+    def do_GET(self):
+        from urllib.parse import urlparse, parse_qs
+        params = parse_qs(urlparse(self.path).query)
+        first = int(params['firstResult'][0])
+        size = int(params['maxResults'][0])
+        self.pages.append((first, size))
+        lines = ["\t".join(["uniprotkb:A%s" % i, "uniprotkb:B%s" % i] +
+            ["-"] * 40) for i in range(25)][first:first + size]
+        body = "".join(x + "\n" for x in lines).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_iter_query(tmpdir):
+    import pandas as pd
+    from bioservices.psicquic import MITABRecord
+    from bioservices.xmltools import easyXML
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MITABHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        s = PSICQUIC(verbose=False)
+        s.requests_per_sec = 1000
+        s._registry = easyXML("<registry><service><name>stub</name>"
+            "<active>true</active><resturl>http://127.0.0.1:%s/</resturl>"
+            "</service></registry>" % server.server_port)
+
+        records = list(s.iter_query("stub", "zap70", page_size=10))
+        assert _MITABHandler.pages == [(0, 10), (10, 10), (20, 10)]
+        assert len(records) == 25 and isinstance(records[0], MITABRecord)
+        assert records[3].id_a == "uniprotkb:A3"
+        # 2.5 records: only the 15 first columns are filled
+        assert records[3].confidence == "-" and records[3].expansion is None
+
+        del _MITABHandler.pages[:]
+        records = list(s.iter_query("stub", "zap70", output="tab27",
+            page_size=10, limit=12))
+        assert _MITABHandler.pages == [(0, 10), (10, 2)]
+        assert len(records) == 12 and records[-1].identification_b == "-"
+
+        filename = str(tmpdir.join("zap70.tsv"))
+        assert s.query_to_file("stub", "zap70", filename, page_size=10) == 25
+        df = pd.read_csv(filename, sep="\t")
+        assert df.shape == (25, 15) and df.id_b[24] == "uniprotkb:B24"
+
+        filename = str(tmpdir.join("zap70.parquet"))
+        assert s.query_to_file("stub", "zap70", filename, output="tab26",
+            batch_size=7) == 25
+        df = pd.read_parquet(filename)
+        assert df.shape == (25, 36) and df.id_a[24] == "uniprotkb:A24"
+    finally:
+        server.shutdown()
+
+
+def test_convert_and_clean_offline():
+    import pandas as pd
+
+    class FakeUniProt(object):
+        def mapping(self, fr, to, query):
+            names = {"P1": ["P1_HUMAN"], "P2": ["P2_HUMAN"], "P3": ["P3_MOUSE"]}
+            return dict((x, names[x]) for x in query if x in names)
+
+    def entry(a, b):
+        return [a, b] + ["-"] * 6 + ["pubmed:1", "-", "-", "type", "-", "-",
+            "score:1"]
+    data = [entry("uniprotkb:P1|intact:EBI-1", "uniprotkb:P2"),
+            entry('chebi:"CHEBI:1"', "uniprotkb:P2"),
+            entry("foo:X1", "uniprotkb:P3|"),
+            entry("uniprotkb:P1", "uniprotkb:P1"),
+            entry("garbage", "uniprotkb:P2"),
+            entry("uniprotkb:P1|intact:EBI-1", "uniprotkb:P2"),
+            entry("uniprotkb:P4", "uniprotkb:P2"),
+            ["uniprotkb:P2", "uniprotkb:P1"]]
+
+    s = PSICQUIC(verbose=False)
+    s.uniprot = FakeUniProt()
+    idsA, idsB = s.knownName(data)
+    assert idsA == ["uniprotkb:P1", "chebi:CHEBI", "?foo:X1", "uniprotkb:P1",
+        "??:garbage", "uniprotkb:P1", "uniprotkb:P4", "uniprotkb:P2"]
+    assert idsB[2] == "uniprotkb:P3"
+
+    res = s.convert(data, "intact")
+    assert [x[:2] for x in res] == [("P1_HUMAN", "P2_HUMAN"),
+        ("chebi:CHEBI", "P2_HUMAN"), ("?foo:X1", "P3_MOUSE"),
+        ("P1_HUMAN", "P1_HUMAN"), ("??:garbage", "P2_HUMAN"),
+        ("P1_HUMAN", "P2_HUMAN"), ("!uniprotkb:P4", "P2_HUMAN"),
+        ("P2_HUMAN", "P1_HUMAN")]
+    assert res[0][2:] == ("score:1", "type", "pubmed:1", "intact")
+    assert res[-1][2:] == ("?", "?", "?", "intact")
+
+    expected = [("P1_HUMAN", "P2_HUMAN", "score:1", "type", "pubmed:1", "intact"),
+                ("P2_HUMAN", "P1_HUMAN", "?", "?", "?", "intact")]
+    assert s.postCleaning(res, verbose=False) == expected
+    df = s.postCleaning(pd.DataFrame(res), verbose=False)
+    assert [tuple(x) for x in df.values.tolist()] == expected
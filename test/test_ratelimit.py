@@ -0,0 +1,83 @@
+import time
+import threading
+
+from bioservices.ratelimit import TokenBucket, get_rate_limiter, get_rate_limiter_stats
+from bioservices.services import REST
+
+
+def test_token_bucket():
+    bucket = TokenBucket(20, burst=5)
+    t0 = time.time()
+    for i in range(5):
+        bucket.acquire()
+    # burst is not throttled
+    assert time.time() - t0 < 0.1
+    assert bucket.stats['waits'] == 0
+
+    # the next 4 requests are spaced by 1/20 second
+    for i in range(4):
+        bucket.acquire()
+    assert time.time() - t0 >= 0.15
+    assert bucket.stats['calls'] == 9
+    assert bucket.stats['waits'] == 4
+    assert bucket.stats['time_waited'] > 0
+
+
+def test_token_bucket_threads():
+    bucket = TokenBucket(50, burst=1)
+    t0 = time.time()
+    threads = [threading.Thread(target=bucket.acquire) for i in range(11)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 11 requests with one token available initially need 10 * 1/50 seconds
+    assert time.time() - t0 >= 0.19
+    assert bucket.stats['calls'] == 11
+
+
+def test_token_bucket_interprocess(tmpdir):
+    lock_file = str(tmpdir.join("host.ratelimit"))
+    b1 = TokenBucket(20, burst=1, lock_file=lock_file)
+    b2 = TokenBucket(20, burst=1, lock_file=lock_file)
+    t0 = time.time()
+    for i in range(3):
+        b1.acquire()
+        b2.acquire()
+    assert time.time() - t0 >= 0.2
+
+
+def test_shared_limiter():
+    s1 = REST("test1", "http://localhost:9/a", verbose=False, requests_per_sec=10)
+    s2 = REST("test2", "http://localhost:9/b", verbose=False, requests_per_sec=5)
+    assert s1.rate_limiter is s2.rate_limiter
+    assert s1.rate_limiter.rate == 5
+    assert get_rate_limiter("localhost:9", 10) is s1.rate_limiter
+    assert "localhost:9" in get_rate_limiter_stats()
+
+    # an explicit rate replaces the rate of the host, higher or lower
+    s1.requests_per_sec = 20
+    assert s2.rate_limiter.rate == 20 and s2.rate_limiter.max_rate == 20
+    s3 = REST("test3", "http://localhost:9/c", verbose=False, requests_per_sec=30)
+    assert s3.rate_limiter.rate == 20
+    s3.requests_per_sec = 2
+    assert s1.rate_limiter.rate == 2
+
+    # after a backoff, the rate recovers up to the new maximum
+    s1.rate_limiter.backoff(0)
+    s1.requests_per_sec = 8
+    assert s1.rate_limiter.rate == 1 and s1.rate_limiter.max_rate == 8
+
+
+def test_token_bucket_backoff():
+    bucket = TokenBucket(10, burst=10)
+    bucket.backoff(0.2)
+    assert bucket.rate == 5
+    t0 = time.time()
+    bucket.acquire()
+    assert time.time() - t0 >= 0.15
+    for i in range(20):
+        bucket.recover()
+    assert bucket.rate == bucket.max_rate == 10
+    stats = bucket.stats
+    assert stats['backoffs'] == 1 and stats['time_backed_off'] == 0.2
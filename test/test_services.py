@@ -53,3 +53,244 @@ class test_REST(REST):
 def test_rest():
     this = test_REST()
     this.test_request()
+
+
+import threading
+import requests
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = self.path.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def stub_url():
+    server = HTTPServer(("127.0.0.1", 0), _StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:%s" % server.server_port
+    server.shutdown()
+
+
+def test_async_get_many(stub_url):
+    import asyncio
+    s = REST("test", stub_url, verbose=False, requests_per_sec=100)
+    keys = ["item/%s" % i for i in range(20)]
+    res = asyncio.run(s.async_get_many(keys, frmt="txt"))
+    assert res == ["/" + key for key in keys]
+
+    # errors are returned per key, in input order
+    res = s.get_async(["item/1", "http://127.0.0.1:1/dead", "item/2"], frmt="txt")
+    assert res[0] == "/item/1"
+    assert isinstance(res[1], Exception)
+    assert res[2] == "/item/2"
+
+    # one set of parameters per query
+    res = s.get_async(["item", "item"], frmt="txt",
+        params=[{"offset": 0}, {"offset": 10}])
+    assert res == ["/item?offset=0", "/item?offset=10"]
+
+
+def test_get_async_nested(stub_url, monkeypatch):
+    # get_async called from a thread of a saturated shared pool, or with an
+    # event loop running, must not wait for a worker of that pool
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    from bioservices import services
+    monkeypatch.setattr(services, "_executor", ThreadPoolExecutor(1))
+    s = REST("test", stub_url, verbose=False, requests_per_sec=100)
+
+    future = services.get_executor().submit(s.get_async, ["a", "b"], frmt="txt")
+    assert future.result(timeout=10) == ["/a", "/b"]
+
+    async def main():
+        return s.get_async(["c"], frmt="txt")
+    future = services.get_executor().submit(asyncio.run, main())
+    assert future.result(timeout=10) == ["/c"]
+    services.get_executor().shutdown()
+
+
+def test_no_network_at_construction(monkeypatch):
+    import bioservices.services
+
+    def urlopen(*args, **kargs):
+        raise AssertionError("no network access expected")
+    monkeypatch.setattr(bioservices.services, "urlopen", urlopen)
+    REST("test", "http://localhost:9/unreachable", verbose=False)
+
+
+def test_check_health(stub_url):
+    from bioservices.services import check_services_health
+    s1 = REST("test1", stub_url, verbose=False)
+    s2 = REST("test2", "http://127.0.0.1:1", verbose=False)
+    assert s1.check_health() is True
+    assert s2.ping(timeout=1) is False
+    assert check_services_health([s1, s2]) == {"test1": True, "test2": False}
+
+
+class _ThrottlingHandler(BaseHTTPRequestHandler):
+    # answers 429 to the first two requests of each path
+    counts = {}
+
+    def do_GET(self):
+        count = self.counts.get(self.path, 0)
+        self.counts[self.path] = count + 1
+        if count < 2:
+            self.send_response(429)
+            self.send_header("Retry-After", "0.05")
+            body = b""
+        else:
+            self.send_response(200)
+            body = b"ok"
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_retry_after():
+    server = HTTPServer(("127.0.0.1", 0), _ThrottlingHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        s = REST("test", "http://127.0.0.1:%s" % server.server_port,
+            verbose=False, requests_per_sec=100)
+        s.logging.level = "ERROR"
+        assert s.http_get("a", frmt="txt") == "ok"
+        metrics = s.metrics
+        assert metrics['requests'] == 3 and metrics['throttled'] == 2
+        assert metrics['backoff_time'] >= 0.1
+        assert metrics['ratelimit']['backoffs'] == 2
+
+        # gives up after max_retries
+        s.settings.RATE_MAX_RETRIES = 1
+        s.reset_metrics()
+        assert s.http_get("b", frmt="txt") == 429
+        assert s.metrics['throttled'] == 2
+    finally:
+        server.shutdown()
+
+
+class _KeepAliveHandler(_StubHandler):
+    protocol_version = "HTTP/1.1"
+
+
+def test_session_registry(caplog):
+    import sys
+    import logging
+    from http.server import ThreadingHTTPServer
+    from bioservices.services import close_sessions
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = "http://127.0.0.1:%s" % server.server_port
+    try:
+        s1 = REST("test1", url, verbose=False, requests_per_sec=1000)
+        s2 = REST("test2", url, verbose=False, requests_per_sec=1000)
+        assert s1.session is s2.session
+        adapter = s1.session.get_adapter(url)
+        assert adapter._pool_maxsize == s1.settings.CONCURRENT
+
+        # the pool holds as many connections as concurrent requests
+        with caplog.at_level(logging.WARNING, logger="urllib3.connectionpool"):
+            keys = ["item/%s" % i for i in range(200)]
+            assert s1.get_async(keys, frmt="txt") == ["/" + x for x in keys]
+        assert "Connection pool is full" not in caplog.text
+
+        # per-service cap: requests wait for one of the connections
+        class Capped(REST):
+            max_connections = 2
+        s3 = Capped("test3", url, verbose=False, requests_per_sec=1000)
+        assert s3.session is not s1.session
+        adapter = s3.session.get_adapter(url)
+        assert adapter._pool_maxsize == 2 and adapter._pool_block is True
+        assert s3.get_async(keys[:20], frmt="txt") == ["/" + x for x in keys[:20]]
+
+        # HTTP/2 falls back to HTTP/1.1 if httpx is not installed
+        s3.settings.HTTP2 = True
+        s3._session = None
+        sys.modules["httpx"], httpx = None, sys.modules.get("httpx")
+        try:
+            session = s3.session
+        finally:
+            s3.settings.HTTP2 = False
+            if httpx is None:
+                del sys.modules["httpx"]
+            else:
+                sys.modules["httpx"] = httpx
+        assert isinstance(session.get_adapter("https://x"),
+            requests.adapters.HTTPAdapter)
+    finally:
+        close_sessions()
+        server.shutdown()
+
+
+class _EchoHandler(_KeepAliveHandler):
+    # the status code is given in the path (/<thread>/<status>)
+    def do_GET(self):
+        status = int(self.path.rsplit("/", 1)[1])
+        body = self.path.encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_thread_safety():
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from http.server import ThreadingHTTPServer
+    from bioservices.services import close_sessions
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _EchoHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    s = REST("test", "http://127.0.0.1:%s" % server.server_port,
+        verbose=False, requests_per_sec=2000)
+    s.logging.level = "ERROR"
+    s.reset_metrics()
+
+    # widen the window between storing and reading last_response
+    interpret = s._interpret_returned_request
+    def slow_interpret(res, frmt):
+        time.sleep(0.001)
+        return interpret(res, frmt)
+    s._interpret_returned_request = slow_interpret
+
+    def work(i):
+        # each thread checks that last_response is the one of its request
+        errors = 0
+        for j in range(25):
+            status = 200 if (i + j) % 5 else 404
+            path = "%s/%s/%s" % (i, j, status)
+            res = s.http_get(path, frmt="txt")
+            last = s.last_response
+            if last.status_code != status or not last.url.endswith(path):
+                errors += 1
+            if status == 200 and res != "/" + path:
+                errors += 1
+        return errors
+    try:
+        with ThreadPoolExecutor(16) as pool:
+            assert sum(pool.map(work, range(32))) == 0
+        metrics = s.metrics
+        assert metrics['requests'] == 32 * 25
+        assert metrics['errors'] == 32 * 5
+    finally:
+        close_sessions()
+        server.shutdown()
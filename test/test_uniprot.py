@@ -49,3 +49,106 @@ def test_get_df(uniprot):
 def test_fasta(uniprot):
     "Q9Y617" in uniprot.get_fasta(["Q9Y617-1"])
     "Q9Y617" not in uniprot.get_fasta_sequence(["Q9Y617-1"])
+
+
+def test_mapping_chunks(monkeypatch):
+    u = UniProt(verbose=False)
+    queries = []
+
+    def http_post(url, frmt="txt", data=None):
+        ids = data['query'].split()
+        queries.append(ids)
+        # odd identifiers are not mapped, values may contain spaces
+        return "From\tTo\n" + "".join("{}\tgene {}\n{}\tgene {}b\n".format(x, x, x, x)
+            for x in ids if int(x[1:]) % 2 == 0)
+    monkeypatch.setattr(u, "http_post", http_post)
+
+    ids = ("P%s" % i for i in range(25))
+    res = u.mapping("ACC", "GENENAME", ids, chunk_size=10)
+    assert [len(x) for x in queries] == [10, 10, 5]
+    assert set(res) == set("P%s" % i for i in range(0, 25, 2))
+    assert res["P4"] == ["gene P4", "gene P4b"]
+    assert u.unmapped == ["P%s" % i for i in range(1, 25, 2)]
+
+    res = list(u.iter_mapping("ACC", "GENENAME", "P1 P2"))
+    assert res == [("P1", []), ("P2", ["gene P2", "gene P2b"])]
+
+    # a failed request is not reported as unmapped identifiers
+    def http_post(url, frmt="txt", data=None):
+        ids = data['query'].split()
+        return 500 if "P10" in ids else "From\tTo\n" + "".join(
+            "{}\tgene {}\n".format(x, x) for x in ids if x != "P1")
+    monkeypatch.setattr(u, "http_post", http_post)
+    ids = ["P%s" % i for i in range(25)]
+    res = u.mapping("ACC", "GENENAME", ids, chunk_size=10)
+    assert u.failed == ["P%s" % i for i in range(10, 20)]
+    assert u.unmapped == ["P1"]
+    assert len(res) == 14
+    res = dict(u.iter_mapping("ACC", "GENENAME", ["P1", "P10"], chunk_size=1))
+    assert res == {"P1": [], "P10": None}
+
+
+def test_get_df_chunks(monkeypatch, tmpdir):
+    u = UniProt(verbose=False)
+    queries = []
+
+    def search(query, frmt="tab", columns=None, limit=None):
+        entries = query.split("+or+")
+        queries.append(entries)
+        rows = ["Entry\tLength\tMass\tKeywords\tSequence"]
+        rows += ["{}\t1,200\t12,345\tKW-1; KW-2;\tMKV LLA".format(x) for x in entries
+            if x != "P3"]
+        return "\n".join(rows) + "\n"
+    monkeypatch.setattr(u, "search", search)
+
+    entries = ["P%s" % i for i in range(7)]
+    df = u.get_df(entries, nChunk=3)
+    assert sorted(len(x) for x in queries) == [1, 3, 3]
+    assert sorted(df.Entry) == ["P0", "P1", "P2", "P4", "P5", "P6"]
+    assert df.Keywords.iloc[0] == ["KW-1", "KW-2", ""]
+    assert df.Sequence.iloc[0] == "MKVLLA"
+    assert df.Length.iloc[0] == 1200 and df.Mass.iloc[0] == 12345
+
+    dfs = list(u.iter_df(entries, nChunk=3))
+    assert [len(x) for x in dfs] == [3, 2, 1]
+    assert dfs[1].Keywords.iloc[1] == ["KW-1", "KW-2", ""]
+
+
+def test_iter_search(monkeypatch):
+    import gzip
+    u = UniProt(verbose=False)
+    offsets = []
+    total = 2500
+
+    class Response(object):
+        headers = {"X-Total-Results": str(total)}
+
+    def search(query, frmt="tab", columns=None, include=False, sort="score",
+               compress=False, limit=None, offset=None, database="uniprot"):
+        offsets.append(offset)
+        u.last_response = Response() if frmt == "fasta" else None
+        ids = ["P%s" % i for i in range(offset, min(total, offset + limit))]
+        if frmt == "tab":
+            res = "Entry\tLength\n" + "".join("%s\t10\n" % x for x in ids)
+        elif frmt == "list":
+            res = "".join("%s\n" % x for x in ids)
+        else:
+            # with include=True, isoforms are returned as well
+            res = "".join(">sp|%s\nMKV\nLLA\n>sp|%s-2\nMKV\n" % (x, x)
+                for x in ids)
+        return gzip.compress(res.encode()) if compress else res.encode()
+    monkeypatch.setattr(u, "search", search)
+
+    # without the number of results, paging stops on an empty page
+    rows = list(u.iter_search("organism:9606", columns="id,length"))
+    assert offsets == [0, 1000, 2000, 3000]
+    assert len(rows) == total
+    assert rows[1500] == {"Entry": "P1500", "Length": "10"}
+
+    assert list(u.iter_search("x", frmt="list", page_size=1000,
+        compress=False)) == ["P%s" % i for i in range(total)]
+    del offsets[:]
+    fasta = list(u.iter_search("x", frmt="fasta", page_size=500, include=True))
+    assert offsets == [0, 500, 1000, 1500, 2000]
+    assert len(fasta) == 2 * total
+    assert fasta[-2] == ("sp|P2499", "MKVLLA")
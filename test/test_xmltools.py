@@ -14,3 +14,53 @@ xmldata = """
 def test_easyXML():
     res = easyXML(xmldata)
     res['parameter']
+
+
+def test_easyXML_lazy():
+    res = easyXML(xmldata)
+    assert res._soup is None and res._root is None
+    assert res.root.tag == "xml"
+    assert res._soup is None
+    assert [x.tag for x in res.getchildren()] == ["parameter"]
+    assert res.findAll("value")[0].text == "1"
+    assert "<value>" in res.prettify()
+
+    # encoding declaration in a unicode string
+    res = easyXML('<?xml version="1.0" encoding="ISO-8859-1"?><a><b>é</b></a>')
+    assert res.root[0].text == "é"
+    # not XML
+    assert easyXML("some text").root == "some text"
+
+
+def test_iterparse(tmpdir):
+    from bioservices.xmltools import iterparse
+    doc = "<root xmlns='http://x'>%s</root>" % "".join(
+        "<entry id='%s'><name>N%s</name></entry>" % (i, i) for i in range(5))
+    ids = [(x.get("id"), x[0].text) for x in iterparse(doc, tag="{*}entry")]
+    assert ids == [(str(i), "N%s" % i) for i in range(5)]
+
+    filename = str(tmpdir.join("test.xml"))
+    with open(filename, "w") as fout:
+        fout.write(doc)
+    assert [x.get("id") for x in iterparse(filename, tag="{http://x}entry")] == \
+        [str(i) for i in range(5)]
+
+
+def test_xml2dict():
+    import xmltodict
+    from bioservices.xmltools import xml2dict, iter_records
+    docs = [
+        '<R a="1"><A>foo <i>bar</i> baz</A><B/><B>2</B><C x="y">t</C>'
+        '<D>  </D><E><F>1</F>tail</E></R>',
+        '<R>head<A>1</A>mid<A>2</A>end</R>', '<R/>', '<R a="b">x</R>',
+        '<?xml version="1.0"?><!-- c --><eLinkResult><LinkSet><Id>1</Id>'
+        '</LinkSet><!-- c --><LinkSet><Id>2</Id><Id>3</Id></LinkSet>'
+        '</eLinkResult>']
+    for doc in docs:
+        assert xml2dict(doc) == xmltodict.parse(doc)
+        assert xml2dict(doc.encode("utf-8")) == xmltodict.parse(doc)
+
+    records = iter_records(docs[4])
+    assert next(records) == {"LinkSet": {"Id": "1"}}
+    assert next(records) == {"LinkSet": {"Id": ["2", "3"]}}
+    assert list(records) == []